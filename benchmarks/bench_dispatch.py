@@ -0,0 +1,130 @@
+# benchmarks/bench_dispatch.py
+"""
+Çerçeve çözme ve komut dağıtımı mikro kıyaslamaları.
+Her komut için sunucunun gerçek yolu (handle_message) ölçülür ve saniyedeki mesaj
+sayısı yazdırılır. Ağ kullanılmaz; gönderilen mesajlar sahte bir websocket'e yazılır.
+
+Kullanım (depo kök dizininden):
+    python -m benchmarks.bench_dispatch [--count N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sunucu kayıtları göreli saved_files/ dizinine yazar; depoyu kirletmemek için geçici dizinde çalış
+os.chdir(tempfile.mkdtemp(prefix="bench_dispatch_"))
+
+from shared.messages import (create_message, encode_edits, LOGIN, FILE_CREATE, FILE_JOIN, FILE_UPDATE,
+                             FILE_RESYNC, FILE_PATCH)
+from shared.codec import BINARY_CODEC, FrameDecoder, decode_frame
+from server import server_main
+from server.connection import ClientConnection
+
+DEFAULT_COUNT = 20000
+DOCUMENT_LINES = 200
+
+class NullWebSocket:
+    """Gönderilen çerçeveleri sayan sahte websocket"""
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, data):
+        self.sent += 1
+
+    async def close(self):
+        pass
+
+def legacy(command, *args, body=None):
+    header = ":".join((command,) + args)
+    return header if body is None else header + "\n" + body
+
+def report(name, count, elapsed):
+    print(f"{name:<40} {count / elapsed:>12,.0f} mesaj/sn")
+
+def bench_decode(count):
+    """Eski decode_frame (JSON dene, hata alırsan eski biçim) ile FrameDecoder karşılaştırması"""
+    body = encode_edits([(10, 11, ["merhaba dünya"])])
+    frames = {
+        "json": create_message(FILE_PATCH, "dosya", body=body),
+        "legacy": legacy(FILE_PATCH, "dosya", body=body),
+        "binary": BINARY_CODEC.encode(FILE_PATCH, "dosya", body=body),
+    }
+    print("== Çerçeve çözme ==")
+    for fmt, frame in frames.items():
+        start = time.perf_counter()
+        for _ in range(count):
+            decode_frame(frame)
+        report(f"decode_frame ({fmt})", count, time.perf_counter() - start)
+
+        decoder = FrameDecoder()
+        start = time.perf_counter()
+        for _ in range(count):
+            decoder.decode(frame)
+        report(f"FrameDecoder ({fmt})", count, time.perf_counter() - start)
+
+def dispatch_cases():
+    """(ad, çerçeve üreten fonksiyon) çiftleri; çerçeve iterasyon numarasına bağlı olabilir"""
+    return [
+        ("FILE_PATCH (json)", lambda i: create_message(
+            FILE_PATCH, "bench", body=encode_edits([(i % DOCUMENT_LINES, i % DOCUMENT_LINES + 1, [f"satır {i}"])]))),
+        ("FILE_PATCH (binary)", lambda i: BINARY_CODEC.encode(
+            FILE_PATCH, "bench", body=encode_edits([(i % DOCUMENT_LINES, i % DOCUMENT_LINES + 1, [f"satır {i}"])]))),
+        ("FILE_UPDATE (json)", lambda i: create_message(
+            FILE_UPDATE, "bench", str(i % DOCUMENT_LINES + 1), body=f"satır {i}")),
+        ("FILE_UPDATE (legacy)", lambda i: legacy(
+            FILE_UPDATE, "bench", str(i % DOCUMENT_LINES + 1), body=f"satır {i}")),
+        ("FILE_RESYNC (json)", lambda i: create_message(FILE_RESYNC, "bench")),
+        ("FILE_JOIN (json)", lambda i: create_message(FILE_JOIN, "bench")),
+        ("LOGIN, ad kullanımda (json)", lambda i: create_message(LOGIN, "bench")),
+        ("FILE_UPDATE, geçersiz satır (json)", lambda i: create_message(FILE_UPDATE, "bench", "x")),
+        ("bilinmeyen komut (json)", lambda i: create_message("NOPE")),
+        ("geçersiz JSON", lambda i: "{bozuk"),
+    ]
+
+async def bench_dispatch(count):
+    asyncio.get_running_loop().create_task(server_main.journal.run())
+    websocket = NullWebSocket()
+    # Sınırsız kuyruk: ölçüm taşma politikasını değil dağıtımı ölçsün
+    conn = ClientConnection(websocket, maxsize=0)
+    decoder = FrameDecoder()
+    await server_main.handle_message(conn, decoder, create_message(LOGIN, "bench"))
+    await server_main.handle_message(conn, decoder, create_message(FILE_CREATE, "bench"))
+    await server_main.handle_message(conn, decoder, create_message(FILE_JOIN, "bench"))
+    document = await server_main.files.get("bench")
+    document.apply_edits([(0, 0, [f"satır {i}" for i in range(DOCUMENT_LINES)])])
+
+    print("== Komut dağıtımı (çözme + doğrulama + işleyici) ==")
+    for name, make_frame in dispatch_cases():
+        frames = [make_frame(i) for i in range(count)]
+        # Her durum kendi biçimini koklasın diye yeni çözücü (bağlantı başına bir tane gibi)
+        decoder = FrameDecoder()
+        start = time.perf_counter()
+        for i, frame in enumerate(frames):
+            await server_main.handle_message(conn, decoder, frame)
+            if i % 256 == 0:
+                await asyncio.sleep(0)  # Yazıcı görevi kuyruğu boşaltsın
+        elapsed = time.perf_counter() - start
+        report(name, count, elapsed)
+
+    await conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Komut dağıtımı mikro kıyaslamaları")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Durum başına mesaj sayısı")
+    options = parser.parse_args()
+    # Geçersiz mesaj durumlarının uyarı logları ölçümü bozmasın
+    logging.disable(logging.WARNING)
+
+    bench_decode(options.count)
+    print()
+    asyncio.run(bench_dispatch(options.count))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/headless.py
+"""
+Yük testleri için ekransız (headless) client ve gecikme ölçümü.
+HeadlessEditor, client/client_main.py'deki CLIEditor protokol mantığını aynen kullanır;
+sadece ekrana yazmaz ve gelen düzenlemelerin ne kadar sürede ulaştığını ölçer.
+"""
+
+import math
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.client_main import CLIEditor
+from shared.messages import ERROR, FILE_SYNC, FILE_COMMIT, FILE_PATCH, FILE_BATCH
+
+# Düzenlenen satırlar gönderim anını taşır: "<kullanıcı>@<sıra>@<monotonic_ns>"
+# time.monotonic_ns aynı makinedeki süreçler arasında karşılaştırılabilir (Linux/macOS).
+MARKER_RE = re.compile(r"@(\d{6,})$")
+
+# Logaritmik kovalar: her kova bir öncekinden %2 geniş; yüzdelikler en fazla ~%2 sapar
+# ve histogramlar süreçler arasında sadece sayılar toplanarak birleştirilebilir.
+BUCKET_BASE = 1.02
+
+class LatencyHistogram:
+    """Mikrosaniye cinsinden gecikmeler için birleştirilebilir histogram"""
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})  # kova -> örnek sayısı
+
+    def record(self, latency_us):
+        bucket = int(math.log(max(latency_us, 1.0), BUCKET_BASE))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def percentile(self, p):
+        """p (0-100) yüzdeliği, milisaniye; örnek yoksa None"""
+        total = self.total
+        if not total:
+            return None
+        threshold = total * p / 100.0
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                return BUCKET_BASE ** (bucket + 1) / 1000.0
+        return None
+
+
+class LoadStats:
+    """Bir süreçteki tüm headless clientların sayaçları"""
+    def __init__(self):
+        self.window_start = float("inf")  # Ölçüm penceresi (time.monotonic)
+        self.window_end = float("inf")
+        self.sent = 0  # Penceredeki yerel düzenleme sayısı
+        self.acked = 0  # Penceredeki kendi yankılarımız (sunucuda uygulanan patch)
+        self.received = 0  # Penceredeki başka clientlardan gelen patch
+        self.frames = 0  # Penceredeki FILE_PATCH/FILE_BATCH mesajları (birleştirme sonrası)
+        self.resyncs = 0  # Katılım dışındaki FILE_SYNC sayısı
+        self.errors = 0
+        self.connect_failures = 0
+        self.latency = LatencyHistogram()
+
+    def in_window(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self.window_start <= now < self.window_end
+
+    def to_dict(self):
+        return {
+            "sent": self.sent, "acked": self.acked, "received": self.received, "frames": self.frames,
+            "resyncs": self.resyncs, "errors": self.errors,
+            "connect_failures": self.connect_failures, "latency": self.latency.counts,
+        }
+
+    def merge_dict(self, data):
+        self.sent += data["sent"]
+        self.acked += data["acked"]
+        self.received += data["received"]
+        self.frames += data["frames"]
+        self.resyncs += data["resyncs"]
+        self.errors += data["errors"]
+        self.connect_failures += data["connect_failures"]
+        self.latency.merge(LatencyHistogram(data["latency"]))
+
+
+class HeadlessEditor(CLIEditor):
+    """Ekrana yazmayan ve uçtan uca düzenleme gecikmesini ölçen CLIEditor"""
+    def __init__(self, username, stats):
+        super().__init__()
+        self.username = username
+        self.stats = stats
+        self.sequence = 0
+        self.joined = False  # İlk FILE_SYNC (ya da FILE_COMMIT) geldi mi
+
+    def display_current_file(self):
+        # CLIEditor bunu FILE_SYNC ve uzak düzenlemelerden sonra çağırır
+        pass
+
+    def decode(self, message):
+        command, args, body = super().decode(message)
+        if command in (FILE_SYNC, FILE_COMMIT):
+            if self.joined:
+                self.stats.resyncs += 1
+            self.joined = True
+        elif command == ERROR:
+            self.stats.errors += 1
+        elif command in (FILE_PATCH, FILE_BATCH) and self.stats.in_window():
+            self.stats.frames += 1
+        return command, args, body
+
+    def make_line(self):
+        """Gönderim anını taşıyan yeni satır içeriği"""
+        self.sequence += 1
+        return f"{self.username}@{self.sequence}@{time.monotonic_ns()}"
+
+    async def apply_patch(self, filename, version, author, edits):
+        # Tek FILE_PATCH ya da FILE_BATCH içindeki her kayıt için çağrılır
+        now_ns = time.monotonic_ns()
+        if self.stats.in_window(now_ns / 1e9) and version > self.session.version:
+            if author == self.username:
+                self.stats.acked += 1
+            else:
+                self.stats.received += 1
+                for _, _, lines in edits:
+                    for line in lines:
+                        match = MARKER_RE.search(line)
+                        if match:
+                            self.stats.latency.record((now_ns - int(match.group(1))) / 1000.0)
+        return await super().apply_patch(filename, version, author, edits)
+
+    async def send_edits(self, edits):
+        if self.stats.in_window():
+            self.stats.sent += 1
+        await super().send_edits(edits)
@@ -0,0 +1,427 @@
+# benchmarks/loadgen.py
+"""
+Yük üretimi ve gecikme kıyaslaması.
+Sunucuyu localhost'ta alt süreç olarak (varsayılan) ya da aynı süreçte başlatır,
+N adet HeadlessEditor bağlar, dokümanlara dağıtır ve belirlenen hızda düzenleme yaptırır.
+Sonunda işlem hacmini, uçtan uca düzenleme yayılım gecikmesinin p50/p95/p99 değerlerini,
+sunucunun CPU kullanımını ve bellek (RSS) tüketimini raporlar.
+
+Kullanım (depo kök dizininden):
+    python -m benchmarks.loadgen --clients 50 --docs 5 --rate 2 --duration 20
+    python -m benchmarks.loadgen --clients 500 --client-procs 4 --json sonuc.json
+    python -m benchmarks.loadgen --clients 500 --client-procs 4 --baseline sonuc.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+from client import client_main
+from shared.messages import encode_edits, LOGIN, FILE_CREATE, FILE_JOIN, FILE_PATCH
+from benchmarks.headless import HeadlessEditor, LoadStats
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(REPO_DIR, "server", "server_main.py")
+
+JOIN_SPREAD = "spread"  # Clientlar dokümanlara eşit dağıtılır
+JOIN_HOT = "hot"  # Herkes aynı dokümanda
+JOIN_ZIPF = "zipf"  # i. dokümanın ağırlığı 1/(i+1): birkaç kalabalık, çok sayıda sakin doküman
+
+JOIN_TIMEOUT = 30  # saniye
+
+def doc_name(index):
+    return f"bench-{index}"
+
+def assign_documents(options):
+    """Her client'ın katılacağı doküman adı"""
+    rng = random.Random(options.seed)
+    if options.join == JOIN_HOT:
+        return [doc_name(0)] * options.clients
+    if options.join == JOIN_ZIPF:
+        weights = [1.0 / (i + 1) for i in range(options.docs)]
+        return [doc_name(i) for i in rng.choices(range(options.docs), weights, k=options.clients)]
+    return [doc_name(i % options.docs) for i in range(options.clients)]
+
+# === Sunucu ===
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class ProcessStats:
+    """
+    /proc üzerinden bir sürecin CPU süresi ve bellek kullanımı (sadece Linux).
+    Sunucu işçi süreçleri başlattıysa (--server-workers) alt süreçler de toplanır.
+    """
+    def __init__(self, pid, include_children=False):
+        self.pid = pid
+        self.include_children = include_children
+        self.ticks = os.sysconf("SC_CLK_TCK")
+
+    def pids(self):
+        if not self.include_children:
+            return [self.pid]
+        found, queue = [], [self.pid]
+        while queue:
+            pid = queue.pop()
+            found.append(pid)
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        queue.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+        return found
+
+    def cpu_seconds(self):
+        total = None
+        for pid in self.pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    # comm alanı boşluk içerebilir; sayılar son ')' karakterinden sonra başlar
+                    fields = f.read().rsplit(")", 1)[1].split()
+                total = (total or 0.0) + (int(fields[11]) + int(fields[12])) / self.ticks  # utime + stime
+            except (OSError, IndexError, ValueError):
+                pass
+        return total
+
+    def memory_mb(self):
+        """(güncel RSS, en yüksek RSS) MB cinsinden; alt süreçlerde toplamları"""
+        values = {}
+        for pid in self.pids():
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        key, _, value = line.partition(":")
+                        if key in ("VmRSS", "VmHWM"):
+                            values[key] = values.get(key, 0.0) + int(value.split()[0]) / 1024.0
+            except OSError:
+                pass
+        return values.get("VmRSS"), values.get("VmHWM")
+
+def raise_file_limit():
+    """Binlerce bağlantı için açık dosya sınırını izin verilen en yükseğe çıkarır"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        with contextlib.suppress(ValueError, OSError):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def start_server_process(port, workdir, workers=1):
+    """Sunucuyu boş bir kayıt dizininde alt süreç olarak başlatır"""
+    return subprocess.Popen(
+        [sys.executable, SERVER_SCRIPT, "--port", str(port), "--workers", str(workers)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+async def wait_for_server(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}"):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Sunucu başlatılamadı")
+            await asyncio.sleep(0.1)
+
+async def seed_documents(options, port):
+    """Dokümanları oluşturur ve --doc-lines satırla doldurur"""
+    async with websockets.connect(f"ws://127.0.0.1:{port}") as websocket:
+        await websocket.send(client_main.JSON_CODEC.encode(LOGIN, "bench-seed"))
+        lines = [f"satır {i}" for i in range(options.doc_lines)]
+        for index in range(options.docs):
+            name = doc_name(index)
+            await websocket.send(client_main.JSON_CODEC.encode(FILE_CREATE, name))
+            if lines:
+                await websocket.send(client_main.JSON_CODEC.encode(FILE_PATCH, name, body=encode_edits([(0, 0, lines)])))
+        # Sunucu mesajları sırayla işler: son dokümana katılım tamamlandıysa hepsi hazırdır
+        await websocket.send(client_main.JSON_CODEC.encode(FILE_JOIN, doc_name(options.docs - 1)))
+        while True:
+            message = await websocket.recv()
+            command, args, _ = client_main.decode_frame(message)
+            if command == "FILE_SYNC":
+                return
+
+# === Clientlar ===
+
+async def run_editor(options, username, filename, stats, connect_at, edit_at, stop_at, rng):
+    """Tek bir headless client: bağlan, katıl, düzenle"""
+    await asyncio.sleep(max(0.0, connect_at - time.monotonic()))
+    editor = HeadlessEditor(username, stats)
+    if not await editor.connect_to_server():
+        stats.connect_failures += 1
+        return
+    receiver = asyncio.create_task(editor.receive_messages())
+    try:
+        await editor.send_message(editor.codec.encode(LOGIN, username, options.codec))
+        await editor.send_message(editor.codec.encode(FILE_JOIN, filename))
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        while not editor.joined:
+            if time.monotonic() > deadline or receiver.done():
+                stats.connect_failures += 1
+                return
+            await asyncio.sleep(0.01)
+
+        await asyncio.sleep(max(0.0, edit_at - time.monotonic()))
+        while editor.connected and time.monotonic() < stop_at:
+            if options.rate > 0:
+                await asyncio.sleep(rng.expovariate(options.rate))
+            else:
+                await asyncio.sleep(stop_at - time.monotonic())
+                break
+            content = editor.current_content
+            if content and rng.random() < options.replace_ratio:
+                index = rng.randrange(len(content))
+                edits = [(index, index + 1, [editor.make_line()])]
+            else:
+                index = rng.randint(0, len(content))
+                edits = [(index, index, [editor.make_line()])]
+            await editor.send_edits(edits)
+
+        # Son düzenlemelerin yayılması için bekle
+        await asyncio.sleep(max(0.0, stop_at + options.drain - time.monotonic()))
+    finally:
+        editor.connected = False
+        receiver.cancel()
+        with contextlib.suppress(Exception):
+            await editor.websocket.close()
+
+async def run_clients(options, port, indices, timeline):
+    """indices içindeki clientları bu süreçte çalıştırır. Returns: LoadStats.to_dict()"""
+    client_main.HOST = "127.0.0.1"
+    client_main.PORT = port
+    client_main.COMPRESSION = options.compression
+    stats = LoadStats()
+    stats.window_start = timeline["measure_start"]
+    stats.window_end = timeline["stop"]
+    documents = assign_documents(options)
+    tasks = []
+    for index in indices:
+        rng = random.Random(options.seed * 100003 + index)
+        connect_at = timeline["connect_start"] + options.ramp * index / max(1, options.clients)
+        tasks.append(run_editor(options, f"bench{index}", documents[index], stats, connect_at,
+                                timeline["edit_start"], timeline["stop"], rng))
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats.to_dict()
+
+def client_worker(options, port, indices, timeline):
+    """Ayrı süreçte çalışan client grubu (multiprocessing)"""
+    raise_file_limit()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(run_clients(options, port, indices, timeline))
+
+# === Rapor ===
+
+def build_report(options, stats, elapsed, server_cpu, server_rss, server_peak_rss):
+    latency = stats.latency
+    return {
+        "config": {
+            "clients": options.clients, "docs": options.docs, "join": options.join,
+            "rate": options.rate, "doc_lines": options.doc_lines, "codec": options.codec,
+            "duration": options.duration, "client_procs": options.client_procs,
+            "inprocess": options.inprocess, "server_workers": options.server_workers,
+        },
+        "edits_per_sec": stats.acked / elapsed,
+        "deliveries_per_sec": stats.received / elapsed,
+        "patch_frames_per_sec": stats.frames / elapsed,
+        "sent": stats.sent,
+        "acked": stats.acked,
+        "received": stats.received,
+        "latency_samples": latency.total,
+        "latency_ms": {name: latency.percentile(p) for name, p in
+                       (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+        "resyncs": stats.resyncs,
+        "errors": stats.errors,
+        "connect_failures": stats.connect_failures,
+        "server_cpu_percent": server_cpu,
+        "server_rss_mb": server_rss,
+        "server_peak_rss_mb": server_peak_rss,
+    }
+
+def _format(value, unit=""):
+    if value is None:
+        return "-"
+    return f"{value:,.2f}{unit}" if isinstance(value, float) else f"{value:,}{unit}"
+
+def print_report(report, baseline=None):
+    rows = [
+        ("Düzenleme/sn (sunucuda uygulanan)", "edits_per_sec", ""),
+        ("Teslim/sn (diğer clientlara)", "deliveries_per_sec", ""),
+        ("Düzenleme mesajı/sn (tüm clientlara)", "patch_frames_per_sec", ""),
+        ("Gecikme p50", ("latency_ms", "p50"), " ms"),
+        ("Gecikme p95", ("latency_ms", "p95"), " ms"),
+        ("Gecikme p99", ("latency_ms", "p99"), " ms"),
+        ("Gecikme max", ("latency_ms", "max"), " ms"),
+        ("Sunucu CPU", "server_cpu_percent", " %"),
+        ("Sunucu RSS", "server_rss_mb", " MB"),
+        ("Sunucu en yüksek RSS", "server_peak_rss_mb", " MB"),
+        ("Yeniden senkronizasyon", "resyncs", ""),
+        ("Hata", "errors", ""),
+        ("Bağlanamayan client", "connect_failures", ""),
+    ]
+
+    def lookup(data, key):
+        if isinstance(key, tuple):
+            return data.get(key[0], {}).get(key[1])
+        return data.get(key)
+
+    config = report["config"]
+    print(f"=== {config['clients']} client, {config['docs']} doküman ({config['join']}), "
+          f"{config['rate']} düzenleme/sn/client, {config['duration']} sn ===")
+    for label, key, unit in rows:
+        value = lookup(report, key)
+        line = f"{label:<36} {_format(value, unit):>16}"
+        if baseline is not None:
+            old = lookup(baseline, key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                line += f"   (önceki {_format(old, unit)}, {100.0 * (value - old) / old:+.1f}%)"
+        print(line)
+
+# === Ana Akış ===
+
+async def run_inprocess(options, port, timeline):
+    """Sunucu ve clientlar aynı event loop'ta; CPU/RSS değerleri clientları da içerir"""
+    from server import server_main
+    server_main.PORT = port
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return await _run_inprocess(options, port, timeline, server_main)
+
+async def _run_inprocess(options, port, timeline, server_main):
+    # Referans tutulmazsa bekleyen sunucu görevi çöp toplayıcı tarafından yok edilebilir
+    server_task = asyncio.create_task(server_main.start_websocket_server())
+    try:
+        await wait_for_server(port)
+        await seed_documents(options, port)
+        return await run_clients(options, port, range(options.clients), timeline)
+    finally:
+        # Sunucunun arka plan görevleri (günlük, otomatik kayıt) dahil her şeyi kapat
+        tasks = (asyncio.all_tasks() | {server_task}) - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Çok kullanıcılı editör yük testi")
+    parser.add_argument("--clients", type=int, default=50, help="Headless client sayısı")
+    parser.add_argument("--docs", type=int, default=5, help="Doküman sayısı")
+    parser.add_argument("--join", choices=(JOIN_SPREAD, JOIN_HOT, JOIN_ZIPF), default=JOIN_SPREAD,
+                        help="Clientların dokümanlara dağılımı")
+    parser.add_argument("--rate", type=float, default=1.0, help="Client başına saniyedeki düzenleme")
+    parser.add_argument("--replace-ratio", type=float, default=0.7,
+                        help="Düzenlemelerin satır değiştirme oranı (kalanı satır ekleme)")
+    parser.add_argument("--doc-lines", type=int, default=100, help="Dokümanların başlangıç satır sayısı")
+    parser.add_argument("--codec", choices=("json", "binary"), default="binary")
+    parser.add_argument("--compression", choices=("deflate", "none"), default="deflate")
+    parser.add_argument("--duration", type=float, default=20.0, help="Ölçüm süresi (saniye)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Ölçülmeyen ısınma süresi (saniye)")
+    parser.add_argument("--ramp", type=float, default=None,
+                        help="Bağlantıların yayıldığı süre (varsayılan: client sayısına göre)")
+    parser.add_argument("--drain", type=float, default=2.0, help="Ölçüm sonrası bekleme (saniye)")
+    parser.add_argument("--client-procs", type=int, default=1, help="Clientları çalıştıran süreç sayısı")
+    parser.add_argument("--inprocess", action="store_true", help="Sunucuyu aynı süreçte çalıştır")
+    parser.add_argument("--server-workers", type=int, default=1,
+                        help="Sunucunun dokümanları böleceği işçi süreç sayısı")
+    parser.add_argument("--port", type=int, default=None, help="Varsayılan: boş bir port")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Sonuçları bu dosyaya yaz")
+    parser.add_argument("--baseline", help="Karşılaştırma için önceki --json çıktısı")
+    options = parser.parse_args()
+
+    if options.compression == "none":
+        options.compression = None
+    if options.ramp is None:
+        options.ramp = max(1.0, options.clients / 250.0)
+    if options.inprocess and options.client_procs != 1:
+        parser.error("--inprocess sadece --client-procs 1 ile kullanılabilir")
+    if options.inprocess and options.server_workers != 1:
+        parser.error("--inprocess sadece --server-workers 1 ile kullanılabilir")
+    options.docs = max(1, options.docs)
+    # --inprocess çalışma dizinini değiştirir
+    options.json_path = options.json_path and os.path.abspath(options.json_path)
+    options.baseline = options.baseline and os.path.abspath(options.baseline)
+    raise_file_limit()
+
+    port = options.port or free_port()
+    workdir = tempfile.mkdtemp(prefix="loadgen_")
+    now = time.monotonic()
+    # Zaman çizelgesi: bağlantılar -> ısınma -> ölçüm -> bekleme
+    setup_margin = 3.0 + options.docs * 0.01
+    timeline = {"connect_start": now + setup_margin}
+    timeline["edit_start"] = timeline["connect_start"] + options.ramp + 1.0
+    timeline["measure_start"] = timeline["edit_start"] + options.warmup
+    timeline["stop"] = timeline["measure_start"] + options.duration
+
+    stats = LoadStats()
+    server_cpu = server_rss = server_peak_rss = None
+    if options.inprocess:
+        os.chdir(workdir)
+        process_stats = ProcessStats(os.getpid())
+        loop = asyncio.new_event_loop()
+        cpu_samples = {}
+
+        def sample(name):
+            cpu_samples[name] = process_stats.cpu_seconds()
+
+        loop.call_later(timeline["measure_start"] - time.monotonic(), sample, "start")
+        loop.call_later(timeline["stop"] - time.monotonic(), sample, "stop")
+        try:
+            stats.merge_dict(loop.run_until_complete(run_inprocess(options, port, timeline)))
+        finally:
+            loop.close()
+        if cpu_samples.get("start") is not None and cpu_samples.get("stop") is not None:
+            server_cpu = 100.0 * (cpu_samples["stop"] - cpu_samples["start"]) / options.duration
+        server_rss, server_peak_rss = process_stats.memory_mb()
+    else:
+        server = start_server_process(port, workdir, options.server_workers)
+        try:
+            asyncio.run(wait_for_server(port))
+            asyncio.run(seed_documents(options, port))
+            process_stats = ProcessStats(server.pid, include_children=options.server_workers > 1)
+
+            procs = max(1, options.client_procs)
+            groups = [list(range(i, options.clients, procs)) for i in range(procs)]
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(procs) as pool:
+                results = [pool.apply_async(client_worker, (options, port, group, timeline)) for group in groups]
+
+                time.sleep(max(0.0, timeline["measure_start"] - time.monotonic()))
+                cpu_start = process_stats.cpu_seconds()
+                time.sleep(max(0.0, timeline["stop"] - time.monotonic()))
+                cpu_stop = process_stats.cpu_seconds()
+                server_rss, server_peak_rss = process_stats.memory_mb()
+
+                for result in results:
+                    stats.merge_dict(result.get())
+            if cpu_start is not None and cpu_stop is not None:
+                server_cpu = 100.0 * (cpu_stop - cpu_start) / options.duration
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = build_report(options, stats, options.duration, server_cpu, server_rss, server_peak_rss)
+    baseline = None
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,25 @@
 # client/client_main.py
 
 import asyncio
+import json
+import time
 import websockets
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from shared.messages import parse_message, create_message, USER_LIST, FILE_LIST, FILE_SYNC
+from shared.messages import parse_file_content, apply_edits, encode_edits, decode_edits, decode_patch_batch, decode_presence, USER_LIST, USER_JOINED, USER_LEFT, PRESENCE, FILE_LIST, FILE_SYNC, FILE_RESYNC, FILE_LEAVE, FILE_PATCH, FILE_BATCH, FILE_CHUNK, FILE_COMMIT, SESSION, RESUME, LOGIN, FILE_JOIN, ERROR, HISTORY, FILE_AT_VERSION, SEARCH
+from shared.codec import decode_frame, closed_for_size, JSON_CODEC, BINARY_CODEC, CODEC_BINARY
+from shared.ot import EditSession
 
 # === İstemci Ayarları ===
 HOST = '127.0.0.1'
 PORT = 5000
+CODEC = CODEC_BINARY  # LOGIN'de istenen kodlayıcı; sunucu desteklemezse JSON'da kalınır
+COMPRESSION = "deflate"  # permessage-deflate; kapatmak için None
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024  # Websocket mesaj sınırı; sunucunun MAX_MESSAGE_BYTES'ı ile aynı
+RECONNECT_DELAY = 0.5  # Bağlantı koparsa ilk yeniden deneme gecikmesi (saniye), her denemede iki katına çıkar
+RECONNECT_MAX_DELAY = 5
 
 class CLIEditor:
     def __init__(self):
@@ -19,11 +28,24 @@ class CLIEditor:
         self.username = None
         self.current_file = None
         self.current_content = []
+        self.session = EditSession()  # Sunucu sürümü ve onay bekleyen yerel düzenlemeler
+        self.codec = JSON_CODEC  # Sunucu ikili çerçeve gönderene kadar JSON
+        self.session_token = None  # Sunucunun verdiği oturum anahtarı (RESUME için)
+        self.resume_window = 0  # Sunucunun kopan oturumu koruduğu süre (saniye)
+        self.reconnecting = False
+        self.resuming = False  # RESUME gönderildi, SESSION bekleniyor
+        self.pending_unsent = False  # Onay bekleyen düzenleme bu bağlantıda gönderilmedi
+        self.oversized = False  # Bağlantı çok büyük mesaj yüzünden kapandı (kod 1009)
+        self.loading = None  # Parça parça gelen doküman: (filename, version, satırlar)
+        self.deferred = []  # Yükleme sırasında gelen FILE_PATCH/FILE_BATCH mesajları
+        self.users = []  # Bağlı kullanıcılar (USER_LIST, sonra USER_JOINED/USER_LEFT ile güncellenir)
+        self.presence_file = None  # presence'ın ait olduğu dosya
+        self.presence = {}  # Dosyayı görüntüleyen kullanıcı -> imleç
 
     async def connect_to_server(self):
         """Sunucuya WebSocket bağlantısı kurar"""
         try:
-            self.websocket = await websockets.connect(f'ws://{HOST}:{PORT}')
+            self.websocket = await websockets.connect(f'ws://{HOST}:{PORT}', compression=COMPRESSION, max_size=MAX_MESSAGE_BYTES)
             self.connected = True
             print("[BAĞLANTI] Sunucuya bağlandı")
             return True
@@ -31,37 +53,282 @@ class CLIEditor:
             print(f"[HATA] Bağlantı hatası: {e}")
             return False
 
+    def decode(self, message):
+        """Gelen çerçeveyi çözer; sunucu ikili kodlamayı kabul ettiyse biz de ona geçeriz"""
+        if isinstance(message, bytes) and self.codec is JSON_CODEC:
+            self.codec = BINARY_CODEC
+        return decode_frame(message)
+
+    async def reconnect(self):
+        """
+        Bağlantı koptuğunda, sunucu oturumu koruduğu sürece yeniden bağlanmayı dener
+        ve RESUME ile son görülen sürümü bildirir.
+        Returns: bool - yeniden bağlanıldıysa True
+        """
+        self.connected = False
+        if self.session_token is None:
+            return False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.resume_window
+        delay = RECONNECT_DELAY
+        self.reconnecting = True
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                try:
+                    self.websocket = await websockets.connect(f'ws://{HOST}:{PORT}', compression=COMPRESSION, max_size=MAX_MESSAGE_BYTES)
+                except (OSError, websockets.exceptions.WebSocketException):
+                    continue
+                self.connected = True
+                self.codec = JSON_CODEC
+                self.resuming = True
+                if self.oversized:
+                    # Aynı mesaj yeniden gönderilir ya da yeniden oynatılırsa bağlantı yine kapanır:
+                    # onay bekleyen düzenleme atılır ve dosya tam içerikle (parça parça) yeniden yüklenir
+                    print("[UYARI] Mesaj sunucunun boyut sınırını aştı; onaylanmamış düzenlemeler atıldı, dosya yeniden yükleniyor")
+                    self.session.reset(self.session.version)
+                # Gönderilen düzenleme sunucuya ulaşmamış olabilir: yetişme sonunda onaylanmadıysa yeniden gönderilir
+                self.pending_unsent = self.session.pending is not None
+                # Yarım kalan parçalı yükleme atılır; sunucu görüntülenen dosyayı yeniden gönderir
+                self.loading = None
+                self.deferred = []
+                versions = {self.current_file: self.session.version} if self.current_file and not self.oversized else {}
+                self.oversized = False
+                print("\n[BAĞLANTI] Yeniden bağlandı, oturuma devam ediliyor")
+                return await self.send_message(self.codec.encode(RESUME, self.session_token, CODEC,
+                                                                 body=json.dumps(versions)))
+            return False
+        finally:
+            self.reconnecting = False
+
+    async def handle_session(self, args):
+        """Oturum anahtarı geldi; RESUME sonrasıysa kaçırılanlar uygulanmış demektir"""
+        self.session_token = args[0]
+        self.resume_window = float(args[1]) if len(args) > 1 else 0
+        if not self.resuming:
+            return
+        self.resuming = False
+        print("\n[BAĞLANTI] Oturuma devam edildi")
+        if self.pending_unsent and self.session.pending is not None:
+            await self.send_patch(self.session.pending)
+
+    async def handle_resume_error(self):
+        """Oturum sunucuda bulunamadı: yeniden giriş yapılır ve dosya tam içerikle yüklenir"""
+        self.resuming = False
+        await self.send_message(self.codec.encode(LOGIN, self.username, CODEC))
+        if self.current_file:
+            await self.send_message(self.codec.encode(FILE_JOIN, self.current_file))
+
     async def receive_messages(self):
         """Sunucudan gelen mesajları işler"""
         while self.connected:
             try:
                 message = await self.websocket.recv()
-                command, args, body = parse_message(message)
+                command, args, body = self.decode(message)
 
                 if command == USER_LIST:
+                    self.users = list(args)
                     print("\n[Bağlı Kullanıcılar]", ', '.join(args))
 
+                elif command == USER_JOINED:
+                    if args[0] not in self.users:
+                        self.users.append(args[0])
+                    print(f"\n[BİLGİ] {args[0]} bağlandı")
+
+                elif command == USER_LEFT:
+                    if args[0] in self.users:
+                        self.users.remove(args[0])
+                    print(f"\n[BİLGİ] {args[0]} ayrıldı")
+
+                elif command == PRESENCE:
+                    self.handle_presence(args, body)
+
                 elif command == FILE_LIST:
                     print("\n[Mevcut Dosyalar]", ', '.join(args))
 
                 elif command == FILE_SYNC:
-                    filename = args[0]
-                    self.current_file = filename
-                    self.current_content = body.splitlines() if body else []
-                    print(f"\n[{filename} Güncellendi]")
-                    self.display_current_file()
+                    self.loading = None
+                    self.load_file(args[0], int(args[1]) if len(args) > 1 else 0, parse_file_content(body))
+
+                elif command == FILE_CHUNK:
+                    self.handle_chunk(args, body)
+
+                elif command == FILE_COMMIT:
+                    await self.handle_commit(args)
+
+                elif self.loading is not None and command in (FILE_PATCH, FILE_BATCH) and args[0] == self.loading[0]:
+                    # Yüklenen anlık görüntüden yeni: içerik tamamlanınca uygulanır
+                    self.deferred.append((command, args, body))
 
-                elif command == "ERROR":
+                elif command == FILE_PATCH:
+                    await self.handle_patch(args, body)
+
+                elif command == FILE_BATCH:
+                    await self.handle_batch(args, body)
+
+                elif command == SESSION:
+                    await self.handle_session(args)
+
+                elif command == HISTORY:
+                    self.display_history(args, body)
+
+                elif command == FILE_AT_VERSION:
+                    print(f"\n=== {args[0]} (sürüm {args[1]}) ===")
+                    for i, line in enumerate(parse_file_content(body or ""), 1):
+                        print(f"{i}: {line}")
+
+                elif command == SEARCH:
+                    self.display_search(args, body)
+
+                elif command == ERROR:
                     print(f"\n[HATA] {body}")
+                    if self.resuming:
+                        await self.handle_resume_error()
 
-            except websockets.exceptions.ConnectionClosed:
+            except websockets.exceptions.ConnectionClosed as e:
                 print("\n[BAĞLANTI KOPTU] Sunucu bağlantısı kesildi")
+                self.oversized = closed_for_size(e)
+                if await self.reconnect():
+                    continue
                 self.connected = False
                 break
             except Exception as e:
                 print(f"\n[HATA] Mesaj alınırken hata: {e}")
                 break
 
+    def handle_presence(self, args, body):
+        """Dosyayı görüntüleyenler değişti; imleç güncellemeleri CLI'da gösterilmez"""
+        filename = args[0]
+        users, left = decode_presence(body)
+        if len(args) > 1 and args[1] == "full":
+            self.presence_file, self.presence = filename, {}
+        elif filename != self.presence_file:
+            return
+        viewers = set(self.presence)
+        self.presence.update(users)
+        for username in left:
+            self.presence.pop(username, None)
+        if set(self.presence) != viewers:
+            print(f"\n[{filename} Görüntüleyenler]", ', '.join(sorted(self.presence)))
+
+    def display_history(self, args, body):
+        """Dokümanın kontrol noktalarını listeler"""
+        filename, current = args[0], args[1]
+        versions = json.loads(body) if body else []
+        print(f"\n=== {filename} geçmişi (güncel sürüm {current}) ===")
+        for version, timestamp, authors in versions:
+            print(f"Sürüm {version}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}  {', '.join(authors)}")
+        if versions:
+            print(f"{versions[0][0]} ile {current} arasındaki her sürüm VERSION ile görüntülenebilir")
+
+    def display_search(self, args, body):
+        """Arama sonuçlarını dosya:satır biçiminde listeler"""
+        results = json.loads(body) if body else []
+        print(f"\n=== Arama sonuçları ({args[0] if args else len(results)}) ===")
+        for filename, line_num, text in results:
+            print(f"{filename}:{line_num}: {text}")
+
+    def load_file(self, filename, version, lines):
+        """Dosyanın tam içeriği geldi (FILE_SYNC ya da tamamlanan parçalı gönderim)"""
+        self.current_file = filename
+        self.current_content = lines
+        self.session.reset(version)
+        print(f"\n[{filename} Güncellendi]")
+        self.display_current_file()
+
+    def handle_chunk(self, args, body):
+        """Büyük dokümanın bir parçası; FILE_COMMIT gelene kadar biriktirilir"""
+        filename, version, start = args[0], int(args[1]), int(args[2])
+        if start == 0:
+            self.loading = (filename, version, [])
+            self.deferred = []
+        elif self.loading is None or self.loading[:2] != (filename, version):
+            return  # Yarıda kesilmiş eski gönderim
+        self.loading[2].extend(body.split("\n"))
+
+    async def handle_commit(self, args):
+        """Parçalı gönderim tamamlandı: içerik yüklenir, arada gelen düzenlemeler uygulanır"""
+        filename, version, line_count = args[0], int(args[1]), int(args[2])
+        if self.loading is None or self.loading[:2] != (filename, version):
+            return
+        lines = self.loading[2]
+        deferred, self.loading, self.deferred = self.deferred, None, []
+        if len(lines) != line_count:
+            await self.send_message(self.codec.encode(FILE_RESYNC, filename))
+            return
+        self.load_file(filename, version, lines)
+        for command, args, body in deferred:
+            if command == FILE_PATCH:
+                await self.handle_patch(args, body)
+            else:
+                await self.handle_batch(args, body)
+
+    async def handle_patch(self, args, body):
+        """Gelen aralık düzenlemelerini yerel içeriğe uygular"""
+        filename, version_str, author = args
+        if filename != self.current_file:
+            return
+        if await self.apply_patch(filename, int(version_str), author, decode_edits(body)) and author != self.username:
+            print(f"\n[{filename} Güncellendi] {author}")
+            self.display_current_file()
+
+    async def handle_batch(self, args, body):
+        """Sunucunun birleştirdiği ardışık düzenlemeleri sırayla uygular, sonra bir kez gösterir"""
+        filename = args[0]
+        if filename != self.current_file:
+            return
+        authors = set()
+        for version, author, edits in decode_patch_batch(body):
+            if not await self.apply_patch(filename, version, author, edits):
+                break
+            if author != self.username:
+                authors.add(author)
+        if authors:
+            print(f"\n[{filename} Güncellendi] {', '.join(sorted(authors))}")
+            self.display_current_file()
+
+    async def apply_patch(self, filename, version, author, edits):
+        """
+        Tek bir sürümün düzenlemelerini OT ile uygular.
+        Returns: bool - sonraki sürüm işlenebilirse True (yeniden senkron istendiyse False)
+        """
+        if version <= self.session.version:
+            # FILE_SYNC ile gelen içeriğe zaten dahil
+            return True
+        if version != self.session.version + 1:
+            # Arada kaçırılmış değişiklik var, tam içeriği yeniden iste
+            await self.send_message(self.codec.encode(FILE_RESYNC, filename))
+            return False
+
+        if author == self.username:
+            # Kendi düzenlememizin onayı: yerelde zaten uygulandı, birikenleri gönder
+            edits = self.session.ack(version)
+            if edits is not None:
+                await self.send_patch(edits)
+            return True
+
+        # Onay bekleyen yerel düzenlemelerimize göre kaydırılmış halini uygula
+        apply_edits(self.current_content, self.session.remote(version, edits))
+        return True
+
+    async def send_edits(self, edits):
+        """
+        Düzenlemeleri yerelde hemen uygular ve gönderir. Önceki düzenleme henüz
+        onaylanmadıysa biriktirilir ve onay gelince tek FILE_PATCH olarak gönderilir.
+        """
+        apply_edits(self.current_content, edits)
+        edits = self.session.local(edits)
+        if edits is not None:
+            await self.send_patch(edits)
+
+    async def send_patch(self, edits):
+        """Düzenlemeleri dayandıkları sunucu sürümüyle birlikte gönderir"""
+        msg = self.codec.encode(FILE_PATCH, self.current_file, str(self.session.version), body=encode_edits(edits))
+        sent = await self.send_message(msg)
+        self.pending_unsent = not sent
+        return sent
+
     def display_current_file(self):
         """Mevcut dosyanın içeriğini gösterir"""
         if not self.current_file:
@@ -79,29 +346,44 @@ class CLIEditor:
         try:
             await self.websocket.send(msg)
             return True
-        except:
-            self.connected = False
+        except websockets.exceptions.ConnectionClosed:
+            # connected değiştirilmez: yeniden bağlanma kararı receive_messages'ta verilir,
+            # girdi döngüsü de o zamana kadar çalışmaya devam eder
             print("\n[BAĞLANTI KOPTU] Mesaj gönderilemedi")
             return False
+        except Exception as e:
+            print(f"\n[HATA] Mesaj gönderilemedi: {e}")
+            return False
 
     async def handle_user_input(self):
         """Kullanıcı girdilerini işler"""
-        while self.connected:
+        while self.connected or self.reconnecting:
             try:
-                print("\nKomutlar: CREATE, JOIN, UPDATE, QUIT")
+                print("\nKomutlar: CREATE, JOIN, LEAVE, UPDATE, INSERT, DELETE, HISTORY, VERSION, SEARCH, QUIT")
                 cmd = input("Komut girin: ").strip().upper()
 
                 if cmd == "CREATE":
                     filename = input("Dosya adı: ")
-                    msg = create_message("FILE_CREATE", filename)
+                    msg = self.codec.encode("FILE_CREATE", filename)
                     await self.send_message(msg)
 
                 elif cmd == "JOIN":
                     filename = input("Düzenlenecek dosya: ")
-                    msg = create_message("FILE_JOIN", filename)
+                    msg = self.codec.encode("FILE_JOIN", filename)
                     await self.send_message(msg)
 
-                elif cmd == "UPDATE":
+                elif cmd == "LEAVE":
+                    if not self.current_file:
+                        print("[UYARI] Açık bir dosya yok")
+                        continue
+
+                    msg = self.codec.encode(FILE_LEAVE, self.current_file)
+                    if await self.send_message(msg):
+                        self.current_file = None
+                        self.current_content = []
+                        self.session.reset(0)
+
+                elif cmd in ("UPDATE", "INSERT", "DELETE"):
                     if not self.current_file:
                         print("[UYARI] Önce bir dosya açmalısınız (JOIN)")
                         continue
@@ -110,15 +392,50 @@ class CLIEditor:
                         line_num = int(input("Satır numarası: "))
                         if line_num < 1:
                             raise ValueError
-                        
+
+                        length = len(self.current_content)
+                        if cmd == "DELETE":
+                            if line_num > length:
+                                raise ValueError
+                            await self.send_edits([(line_num - 1, line_num, [])])
+                            continue
+
                         content = input("Yeni içerik: ")
-                        msg = create_message("FILE_UPDATE", self.current_file, str(line_num), body=content)
-                        await self.send_message(msg)
+                        if cmd == "INSERT":
+                            if line_num > length + 1:
+                                raise ValueError
+                            edits = [(line_num - 1, line_num - 1, [content])]
+                        elif line_num <= length:
+                            edits = [(line_num - 1, line_num, [content])]
+                        else:
+                            # Dosya kısaysa araya boş satırlar ekle
+                            edits = [(length, length, [""] * (line_num - 1 - length) + [content])]
+                        await self.send_edits(edits)
                     except ValueError:
                         print("[HATA] Geçersiz satır numarası")
 
+                elif cmd in ("HISTORY", "VERSION"):
+                    if not self.current_file:
+                        print("[UYARI] Önce bir dosya açmalısınız (JOIN)")
+                        continue
+                    if cmd == "HISTORY":
+                        await self.send_message(self.codec.encode(HISTORY, self.current_file))
+                        continue
+                    version = input("Sürüm: ").strip()
+                    if not version.isdigit():
+                        print("[HATA] Geçersiz sürüm numarası")
+                        continue
+                    await self.send_message(self.codec.encode(FILE_AT_VERSION, self.current_file, version))
+
+                elif cmd == "SEARCH":
+                    query = input("Aranacak kelimeler: ").strip()
+                    if not query:
+                        continue
+                    await self.send_message(self.codec.encode(SEARCH, body=query))
+
                 elif cmd == "QUIT":
-                    msg = create_message("QUIT", self.username)
+                    self.session_token = None  # Bilerek çıkılıyor, yeniden bağlanılmaz
+                    msg = self.codec.encode("QUIT", self.username)
                     await self.send_message(msg)
                     break
 
@@ -136,7 +453,7 @@ class CLIEditor:
             return
 
         self.username = input("Kullanıcı adınızı girin: ")
-        login_msg = create_message("LOGIN", self.username)
+        login_msg = self.codec.encode("LOGIN", self.username, CODEC)
         if not await self.send_message(login_msg):
             return
 
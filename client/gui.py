@@ -3,22 +3,55 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 import asyncio
+import queue
+import threading
 import websockets
 import json
 import sys 
 import os 
 import time
-from typing import Optional, Dict, List
+from typing import Optional, List, Union
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from shared.messages import create_message, parse_message, FILE_LIST, FILE_SYNC, USER_LIST, ERROR, LOGIN, FILE_CREATE, FILE_JOIN, FILE_UPDATE, FILE_SYNC, QUIT
+from shared.diff import diff_lines
+from shared.ot import EditSession
+from shared.messages import parse_file_content, apply_edits, encode_edits, decode_edits, decode_patch_batch, decode_presence, encode_cursor, FILE_LIST, FILE_SYNC, USER_LIST, USER_JOINED, USER_LEFT, PRESENCE, CURSOR, HISTORY, FILE_AT_VERSION, SEARCH, ERROR, LOGIN, FILE_CREATE, FILE_JOIN, FILE_RESYNC, FILE_PATCH, FILE_BATCH, FILE_CHUNK, FILE_COMMIT, QUIT, SESSION, RESUME
+from shared.codec import decode_frame, closed_for_size, JSON_CODEC, BINARY_CODEC, CODEC_BINARY
 
 # === İstemci Ayarları ===
 HOST = '127.0.0.1'
 PORT = 5000
+CODEC = CODEC_BINARY  # LOGIN'de istenen kodlayıcı; sunucu desteklemezse JSON'da kalınır
+COMPRESSION = "deflate"  # permessage-deflate; kapatmak için None
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024  # Websocket mesaj sınırı; sunucunun MAX_MESSAGE_BYTES'ı ile aynı
+RECONNECT_DELAY = 0.5  # Bağlantı koparsa ilk yeniden deneme gecikmesi (saniye), her denemede iki katına çıkar
+RECONNECT_MAX_DELAY = 5
+
+# === Gönderim Ayarları ===
+# Yazma durduktan SEND_DELAY_MS sonra son durum gönderilir. Kesintisiz yazarken de
+# ilk değişiklikten en geç SEND_MAX_DELAY_MS sonra gönderilir.
+SEND_DELAY_MS = 150
+SEND_MAX_DELAY_MS = 500
+
+# === Kullanıcı Durumu Ayarları ===
+# İmleç/seçim konumu en fazla CURSOR_INTERVAL_MS'de bir gönderilir. Aynı dosyadaki
+# kullanıcılar listede renkli, imleç ve seçimleri metin alanında kendi renkleriyle gösterilir.
+CURSOR_INTERVAL_MS = 100
+PRESENCE_COLORS = ["#f6c1c1", "#c1e6c1", "#c1d4f6", "#f6e3a8", "#dcc1f6", "#a8e6e3"]
+PRESENCE_FOREGROUND = "#1a5fb4"  # Aynı dosyadaki kullanıcıların listedeki rengi
+
+# Tk ve asyncio ayrı iş parçacıklarında çalışır:
+#   - Tk (ana iş parçacığı): pencere, metin alanı, doküman durumu (OT oturumu, içerik)
+#   - asyncio (arka plan iş parçacığı): websocket bağlantısı, mesaj gönderme ve alma
+# Tk'den ağ tarafına coroutine'ler run_async ile (run_coroutine_threadsafe) verilir.
+# Ağ tarafından gelen işler call_in_tk ile kuyruğa konur ve Tk after_idle ile uyandırılır.
+# İki döngü de iş yokken tamamen bekler; hiçbir tarafta periyodik yoklama yoktur.
 
 class TextEditorClient:
-    def __init__(self, master):
+    def __init__(self, master, loop: asyncio.AbstractEventLoop):
         self.master = master
+        self.loop = loop # Websocket işlerinin çalıştığı arka plan döngüsü
+        self.tk_queue = queue.SimpleQueue() # Tk iş parçacığında çalıştırılacak (callback, args)
+        self.tk_wakeup_pending = False
         self.master.title("Çok Kullanıcılı Metin Editörü")
         
         # WebSocket bağlantısı
@@ -32,14 +65,36 @@ class TextEditorClient:
             return
             
         self.current_file = None
-        self.last_update = 0
+        self.send_timer = None # Bekleyen gönderimin after kimliği
+        self.first_change = 0.0 # Gönderilmemiş ilk değişikliğin zamanı
+        # Metin alanında current_content'ten farklı olabilecek tek satır aralığı:
+        # (start, old_end, new_end) -> current_content[start:old_end] metin alanında
+        # [start, new_end) satırları oldu. Aralık dışındaki satırlar aynıdır.
+        self.dirty = None
+        self.track_edits = True # Uzak düzenlemeler uygulanırken kapatılır
         self.current_content = [] # Client tarafında da dosya içeriğini takip edelim
+        self.session = EditSession() # Sunucu sürümü ve onay bekleyen yerel düzenlemeler (OT)
+        self.codec = JSON_CODEC # Sunucu ikili çerçeve gönderene kadar JSON
+        self.session_token = None # Sunucunun verdiği oturum anahtarı (RESUME için)
+        self.resume_window = 0 # Sunucunun kopan oturumu koruduğu süre (saniye)
+        self.resuming = False # RESUME gönderildi, SESSION bekleniyor
+        self.pending_unsent = False # Onay bekleyen düzenleme bu bağlantıda gönderilmedi
+        self.oversized = False # Bağlantı çok büyük mesaj yüzünden kapandı (kod 1009)
+        self.quitting = False # Kullanıcı çıkıyor: kopan bağlantı yeniden kurulmaz
+        self.loading = None # Parça parça yüklenen doküman: (filename, version)
+        self.deferred = [] # Yükleme sırasında gelen (handler, args, body); yükleme bitince uygulanır
+        self.presence_file = None # presence'ın ait olduğu dosya
+        self.presence = {} # Dosyayı görüntüleyen kullanıcı -> imleç [line, col, end_line, end_col]
+        self.cursor_timer = None # Bekleyen imleç gönderiminin after kimliği
+        self.sent_cursor = None # Son gönderilen (dosya, imleç)
+        self.pending_goto = None # Arama sonucundan açılan dosyada gidilecek (filename, satır)
 
         # GUI bileşenlerini oluştur
         self._create_gui()
         
-        # Sunucuya bağlan ve mesaj alma döngüsünü başlat
-        asyncio.get_event_loop().create_task(self.connect_and_start_receiving())
+        # Sunucuya bağlan ve mesaj alma döngüsünü başlat. Tk döngüsü çalışmaya başladıktan
+        # sonra başlatılır: ağ tarafının Tk'ye yaptığı çağrılar ancak o zaman işlenebilir
+        self.master.after_idle(lambda: self.run_async(self.connect_and_start_receiving()))
 
         # Pencere kapatıldığında temizlik yap
         self.master.protocol("WM_DELETE_WINDOW", self.quit_app_async_wrapper) # Async fonksiyonu wrapper ile çağır
@@ -72,18 +127,27 @@ class TextEditorClient:
         button_frame.pack(fill=tk.X, pady=(0, 5))
         
         # !!! BURADAKİ BUTTON KOMUTLARINI GÜNCELLEDİK !!!
-        tk.Button(button_frame, text="Dosya Oluştur", command=lambda: asyncio.get_event_loop().create_task(self.create_file())).pack(side=tk.LEFT, padx=2)
-        tk.Button(button_frame, text="Dosyayı Aç", command=lambda: asyncio.get_event_loop().create_task(self.join_file())).pack(side=tk.LEFT, padx=2)
-        tk.Button(button_frame, text="Kaydet", command=lambda: asyncio.get_event_loop().create_task(self.update_file())).pack(side=tk.LEFT, padx=2)
-        tk.Button(button_frame, text="Çıkış", command=lambda: asyncio.get_event_loop().create_task(self.quit_app())).pack(side=tk.RIGHT, padx=2)
+        tk.Button(button_frame, text="Dosya Oluştur", command=self.create_file).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame, text="Dosyayı Aç", command=self.join_file).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame, text="Kaydet", command=self.update_file).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame, text="Geçmiş", command=self.request_history).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame, text="Ara", command=self.request_search).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame, text="Çıkış", command=self.quit_app_async_wrapper).pack(side=tk.RIGHT, padx=2)
 
         # Metin editörü
         self.text_area = tk.Text(right_frame, wrap=tk.WORD)
         self.text_area.pack(expand=True, fill=tk.BOTH)
         
-        # Metin değişikliği izleyicisi
-        self.text_area.bind('<<Modified>>', self.on_text_modified)
-        self.text_area.bind('<KeyRelease>', self.on_text_modified) # Her tuş bırakıldığında kontrol et
+        # Metin değişikliği izleyicisi: widget'ın Tcl komutu sarmalanır, böylece yazma,
+        # silme, yapıştırma gibi tüm insert/delete işlemleri satır aralığıyla birlikte görülür
+        widget = str(self.text_area)
+        self.text_area_command = widget + "_orig"
+        self.master.tk.call("rename", widget, self.text_area_command)
+        self.master.tk.createcommand(widget, self._text_command)
+
+        # İmleç hareketleri örneklenip gönderilir (bkz. schedule_cursor)
+        self.text_area.bind("<KeyRelease>", self.schedule_cursor, add="+")
+        self.text_area.bind("<ButtonRelease-1>", self.schedule_cursor, add="+")
 
 
     async def connect_and_start_receiving(self):
@@ -95,48 +159,93 @@ class TextEditorClient:
     async def connect_to_server(self):
         """Sunucuya WebSocket bağlantısı kurar"""
         try:
-            self.websocket = await websockets.connect(f'ws://{HOST}:{PORT}')
+            self.websocket = await websockets.connect(f'ws://{HOST}:{PORT}', compression=COMPRESSION, max_size=MAX_MESSAGE_BYTES)
             self.connected = True
             
             # Giriş mesajını gönder
-            login_msg = create_message(LOGIN, self.username)
+            login_msg = self.codec.encode(LOGIN, self.username, CODEC)
             await self.websocket.send(login_msg)
             
             print(f"[BAĞLANTI] Sunucuya bağlandı: {self.username}")
             return True
         except Exception as e:
-            messagebox.showerror("Bağlantı Hatası", str(e))
-            self.master.destroy()
+            self.call_in_tk(messagebox.showerror, "Bağlantı Hatası", str(e))
+            self.call_in_tk(self.master.destroy)
             return False
 
+    def decode(self, message):
+        """Gelen çerçeveyi çözer; sunucu ikili kodlamayı kabul ettiyse biz de ona geçeriz"""
+        if isinstance(message, bytes) and self.codec is JSON_CODEC:
+            self.codec = BINARY_CODEC
+        return decode_frame(message)
+
     async def receive_messages(self):
         """Sunucudan gelen mesajları işler"""
-        while self.connected:
+        # connected'a bakılmaz: gönderim kopmayı önce fark ederse döngü yine de
+        # ConnectionClosed'a ulaşıp yeniden bağlanmalı
+        while not self.quitting:
             try:
                 message = await self.websocket.recv()
-                command, args, body = parse_message(message)
+                command, args, body = self.decode(message)
 
                 if command == FILE_LIST:
-                    self.master.after(0, self.update_file_list, args)
+                    self.call_in_tk(self.update_file_list, args)
 
                 elif command == FILE_SYNC:
-                    self.current_file = args[0]
-                    self.current_content = body.splitlines() if body else []
-                    self.master.after(0, self.update_text_area, body)
+                    # Doküman durumu sadece Tk callback'lerinde değişir, böylece sürüm,
+                    # OT oturumu ve metin alanı her zaman aynı sırayla güncellenir
+                    version = int(args[1]) if len(args) > 1 else 0
+                    self.call_in_tk(self.load_file, args[0], version, body)
+
+                elif command == FILE_CHUNK:
+                    self.call_in_tk(self.load_chunk, args[0], int(args[1]), int(args[2]), body)
+
+                elif command == FILE_COMMIT:
+                    self.call_in_tk(self.commit_chunks, args[0], int(args[1]), int(args[2]))
+
+                elif command == FILE_PATCH:
+                    self.call_in_tk(self.handle_patch, args, body)
+
+                elif command == FILE_BATCH:
+                    self.call_in_tk(self.handle_batch, args, body)
 
                 elif command == USER_LIST:
-                    self.master.after(0, self.update_user_list, args)
+                    self.call_in_tk(self.update_user_list, args)
+
+                elif command == USER_JOINED:
+                    self.call_in_tk(self.add_user, args[0])
+
+                elif command == USER_LEFT:
+                    self.call_in_tk(self.remove_user, args[0])
+
+                elif command == PRESENCE:
+                    self.call_in_tk(self.handle_presence, args, body)
+
+                elif command == SESSION:
+                    self.call_in_tk(self.handle_session, args)
+
+                elif command == HISTORY:
+                    self.call_in_tk(self.choose_version, args, body)
+
+                elif command == FILE_AT_VERSION:
+                    self.call_in_tk(self.show_version, args, body)
+
+                elif command == SEARCH:
+                    self.call_in_tk(self.show_search_results, args, body)
 
                 elif command == ERROR:
-                    self.master.after(0, messagebox.showerror, "Hata", body)
+                    self.call_in_tk(self.handle_error, body)
                 else:
                     print(f"[GELEN MESAJ] {command} {args} {body}")
 
 
-            except websockets.exceptions.ConnectionClosed:
+            except websockets.exceptions.ConnectionClosed as e:
                 self.connected = False
-                self.master.after(0, messagebox.showerror, "Bağlantı Hatası", "Sunucu bağlantısı koptu!")
-                self.master.after(0, self.master.destroy)
+                self.oversized = closed_for_size(e)
+                if not self.quitting and await self.reconnect():
+                    continue
+                self.call_in_tk(messagebox.showerror, "Bağlantı Hatası", "Sunucu bağlantısı koptu!")
+                self.call_in_tk(self.master.destroy)
                 break
             except json.JSONDecodeError:
                 print(f"[HATA] Geçersiz JSON mesajı alındı: {message}")
@@ -145,6 +254,201 @@ class TextEditorClient:
                 print(f"[HATA] Mesaj alınırken hata: {e}")
                 break
 
+    async def reconnect(self) -> bool:
+        """
+        Sunucu oturumu koruduğu sürece yeniden bağlanmayı dener (ağ iş parçacığında).
+        Bağlanınca RESUME, doküman durumunu okuyabilmek için Tk iş parçacığında gönderilir.
+        """
+        if self.session_token is None:
+            return False
+        print("[BAĞLANTI] Sunucu bağlantısı koptu, yeniden bağlanılıyor...")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.resume_window
+        delay = RECONNECT_DELAY
+        while loop.time() < deadline and not self.quitting:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            try:
+                self.websocket = await websockets.connect(f'ws://{HOST}:{PORT}', compression=COMPRESSION, max_size=MAX_MESSAGE_BYTES)
+            except (OSError, websockets.exceptions.WebSocketException):
+                continue
+            self.codec = JSON_CODEC
+            # SESSION gelene kadar Tk tarafı gönderim yapmaz (bkz. online): yeni bağlantıda
+            # RESUME'dan önce giden mesaj giriş yapılmadığı için reddedilirdi
+            self.resuming = True
+            self.connected = True
+            self.call_in_tk(self.resume_session)
+            return True
+        return False
+
+    def resume_session(self):
+        """Yeni bağlantıda oturuma son görülen sürümden devam edilmesini ister"""
+        oversized, self.oversized = self.oversized, False
+        if oversized:
+            # Aynı mesaj yeniden gönderilir ya da yeniden oynatılırsa bağlantı yine kapanır:
+            # onay bekleyen düzenleme atılır ve dosya tam içerikle (parça parça) yeniden yüklenir
+            print("[UYARI] Mesaj sunucunun boyut sınırını aştı; onaylanmamış düzenlemeler atıldı, dosya yeniden yükleniyor")
+            self.session.reset(self.session.version)
+        # Gönderilen düzenleme sunucuya ulaşmamış olabilir: yetişme sonunda onaylanmadıysa yeniden gönderilir
+        self.pending_unsent = self.session.pending is not None
+        # Yarım yüklenen dokümanın sürümü bildirilmez: sunucu içeriği baştan gönderir
+        versions = ({self.current_file: self.session.version}
+                    if self.current_file and self.loading is None and not oversized else {})
+        self.send_later(self.codec.encode(RESUME, self.session_token, CODEC, body=json.dumps(versions)))
+
+    def handle_session(self, args: List[str]):
+        """Oturum anahtarı geldi; RESUME sonrasıysa kaçırılan düzenlemeler uygulanmış demektir"""
+        self.session_token = args[0]
+        self.resume_window = float(args[1]) if len(args) > 1 else 0
+        if not self.resuming:
+            return
+        self.resuming = False
+        print("[BAĞLANTI] Oturuma devam edildi")
+        if self.pending_unsent and self.session.pending is not None:
+            self.send_patch(self.session.pending)
+        # Bağlantı yokken yapılan düzenlemeler metin alanında bekliyor: hemen gönderilir
+        self.update_content()
+
+    def online(self) -> bool:
+        """Tk tarafından mesaj gönderilebilir mi: bağlı ve RESUME sürmüyor"""
+        return self.connected and not self.resuming
+
+    def handle_error(self, text: Optional[str]):
+        if not self.resuming:
+            messagebox.showerror("Hata", text)
+            return
+        # Oturum sunucuda bulunamadı: yeniden giriş yapılır ve dosya tam içerikle yüklenir
+        self.resuming = False
+        self.send_later(self.codec.encode(LOGIN, self.username, CODEC))
+        if self.current_file:
+            self.send_later(self.codec.encode(FILE_JOIN, self.current_file))
+
+    def load_file(self, filename: str, version: int, content: Optional[str]):
+        """Tam içerik geldi: bekleyen yerel düzenlemeler geçersiz"""
+        if self.loading is not None:
+            # Yarıda kalan parçalı yüklemenin yerini aldı
+            self.loading = None
+            self.deferred = []
+            self.text_area.configure(state=tk.NORMAL)
+        switched = filename != self.current_file
+        self.current_file = filename
+        self.session.reset(version)
+        self.update_text_area(content)
+        if switched:
+            # Başka bir dosya açıldı: imleç ve görünüm başa
+            self.text_area.mark_set(tk.INSERT, "1.0")
+            self.text_area.yview_moveto(0)
+        self.refresh_presence()
+        self.goto_pending_line()
+
+    def load_chunk(self, filename: str, version: int, start: int, body: Optional[str]):
+        """
+        Büyük dokümanın bir parçası geldi. İlk parça hemen gösterilir (ilk ekran), sonrakiler
+        metin alanının sonuna eklenir; imleç ve görünüm yerinde kalır. Yükleme bitene kadar
+        metin alanı salt okunurdur ve gelen düzenlemeler bekletilir.
+        """
+        if start == 0:
+            self.load_file(filename, version, body)
+            self.loading = (filename, version)
+            self.text_area.configure(state=tk.DISABLED)
+            return
+        if self.loading != (filename, version) or start != len(self.current_content):
+            return # Yarıda kesilmiş eski gönderim
+        self.text_area.configure(state=tk.NORMAL) # Salt okunur metin alanı insert'leri yok sayar
+        try:
+            self.apply_edits_to_text_area([(start, start, (body or "").split("\n"))])
+        finally:
+            self.text_area.configure(state=tk.DISABLED)
+
+    def commit_chunks(self, filename: str, version: int, line_count: int):
+        """Parçalı yükleme tamamlandı: metin alanı açılır, bekletilen düzenlemeler uygulanır"""
+        if self.loading != (filename, version):
+            return
+        deferred, self.loading, self.deferred = self.deferred, None, []
+        self.text_area.configure(state=tk.NORMAL)
+        self.refresh_presence() # Yüklenmemiş satırlardaki imleçler artık çizilebilir
+        self.goto_pending_line()
+        if len(self.current_content) != line_count:
+            self.send_later(self.codec.encode(FILE_RESYNC, filename))
+            return
+        for handler, args, body in deferred:
+            handler(args, body)
+
+    def defer_while_loading(self, handler, filename: str, args: List[str], body: Optional[str]) -> bool:
+        """Yüklenen anlık görüntüden yeni düzenlemeler yükleme bitene kadar bekletilir"""
+        if self.loading is None or filename != self.loading[0]:
+            return False
+        self.deferred.append((handler, args, body))
+        return True
+
+    def handle_patch(self, args: List[str], body: Optional[str]):
+        """Gelen aralık düzenlemelerini OT ile dönüştürüp yerel içeriğe ve metin alanına uygular"""
+        filename, version_str, author = args
+        if filename != self.current_file or self.defer_while_loading(self.handle_patch, filename, args, body):
+            return
+        self.apply_patch(filename, int(version_str), author, decode_edits(body))
+
+    def handle_batch(self, args: List[str], body: Optional[str]):
+        """Sunucunun birleştirdiği ardışık düzenlemeleri sırayla uygular"""
+        filename = args[0]
+        if filename != self.current_file or self.defer_while_loading(self.handle_batch, filename, args, body):
+            return
+        for version, author, edits in decode_patch_batch(body):
+            if not self.apply_patch(filename, version, author, edits):
+                break
+
+    def apply_patch(self, filename: str, version: int, author: str, edits) -> bool:
+        """
+        Tek bir sürümün düzenlemelerini uygular.
+        Returns: bool - sonraki sürüm işlenebilirse True (yeniden senkron istendiyse False)
+        """
+        if version <= self.session.version:
+            # FILE_SYNC ile gelen içeriğe zaten dahil
+            return True
+        if version != self.session.version + 1:
+            # Arada kaçırılmış değişiklik var, tam içeriği yeniden iste
+            self.send_later(self.codec.encode(FILE_RESYNC, filename))
+            return False
+
+        if author == self.username:
+            # Kendi düzenlememizin onayı: metin alanında zaten var, birikenleri gönder
+            edits = self.session.ack(version)
+            if edits is not None:
+                self.send_patch(edits)
+            return True
+
+        # Metin alanında henüz gönderilmemiş yazılar varsa önce onları oturuma ekle;
+        # uzak düzenleme onlara göre kaydırılır ve satır numaraları metin alanıyla eşleşir
+        self.capture_local_edits()
+        self.apply_edits_to_text_area(self.session.remote(version, edits))
+        return True
+
+    def apply_edits_to_text_area(self, edits):
+        """Aralık düzenlemelerini yerel içeriğe ve sadece ilgili satırlara uygular"""
+        self.track_edits = False # Bunlar yerel düzenleme değil
+        try:
+            self._apply_edits_to_text_area(edits)
+        finally:
+            self.track_edits = True
+
+    def _apply_edits_to_text_area(self, edits):
+        for start, end, new_lines in edits:
+            line_count = len(self.current_content)
+            if end < line_count:
+                # Aralıktan sonra satır var: satırları sonlarındaki yeni satır karakteriyle değiştir
+                self.text_area.delete(f"{start + 1}.0", f"{end + 1}.0")
+                self.text_area.insert(f"{start + 1}.0", "".join(line + "\n" for line in new_lines))
+            elif start > 0:
+                # Aralık dokümanın sonuna kadar: önceki satırın sonundan itibaren değiştir
+                self.text_area.delete(f"{start}.end", "end-1c")
+                self.text_area.insert(f"{start}.end", "".join("\n" + line for line in new_lines))
+            else:
+                self.text_area.delete("1.0", "end-1c")
+                self.text_area.insert("1.0", "\n".join(new_lines))
+            apply_edits(self.current_content, [(start, end, new_lines)])
+
+        self.text_area.edit_modified(False) # Değişiklik bayrağını temizle
+
     def update_file_list(self, files: List[str]):
         """Dosya listesini günceller"""
         self.file_dropdown['menu'].delete(0, 'end')
@@ -165,67 +469,253 @@ class TextEditorClient:
 
 
     def update_user_list(self, users: List[str]):
-        """Kullanıcı listesini günceller"""
+        """Kullanıcı listesini tamamen yeniler (girişte ve yeniden senkronda)"""
         self.user_listbox.delete(0, tk.END)
         for user in users:
-            self.user_listbox.insert(tk.END, user)
-
-    def update_text_area(self, content: str):
-        """Metin alanını günceller"""
-        self.text_area.delete(1.0, tk.END)
-        if content:
-            self.text_area.insert(tk.END, content)
-        self.current_content = content.splitlines() if content else []
-        self.text_area.edit_modified(False) # Değişiklik bayrağını temizle
-
+            self.add_user(user)
 
-    def on_text_modified(self, event=None):
-        """Metin değişikliğini izler ve güncellemeyi tetikler."""
-        if not self.current_file or not self.connected:
+    def add_user(self, user: str):
+        """Listenin sonuna tek kullanıcı ekler"""
+        if user in self.user_listbox.get(0, tk.END):
             return
-
-        # Çok sık güncelleme yapmamak için 0.5 saniye bekle
-        current_time = time.time()
-        if current_time - self.last_update < 0.5:
-            self.text_area.edit_modified(False) # Reset modified flag
+        self.user_listbox.insert(tk.END, user)
+        self._style_user(user)
+
+    def remove_user(self, user: str):
+        """Listeden tek kullanıcıyı siler"""
+        users = self.user_listbox.get(0, tk.END)
+        if user in users:
+            self.user_listbox.delete(users.index(user))
+
+    def _style_user(self, user: str):
+        """Aynı dosyayı görüntüleyen kullanıcıyı listede renklendirir"""
+        users = self.user_listbox.get(0, tk.END)
+        if user not in users:
             return
+        viewing = user in self.presence and self.presence_file == self.current_file
+        self.user_listbox.itemconfig(users.index(user), foreground=PRESENCE_FOREGROUND if viewing else "")
+
+    def handle_presence(self, args: List[str], body: Optional[str]):
+        """
+        Dosyayı görüntüleyenler ya da imleçleri değişti. "full" önceki durumun yerini alır,
+        diğerleri üzerine uygulanır. Sadece değişen kullanıcılar yeniden çizilir.
+        """
+        filename = args[0]
+        users, left = decode_presence(body)
+        changed = set(users) | set(left)
+        if len(args) > 1 and args[1] == "full":
+            changed |= set(self.presence)
+            self.presence_file, self.presence = filename, {}
+        elif filename != self.presence_file:
+            return
+        self.presence.update(users)
+        for user in left:
+            self.presence.pop(user, None)
+        for user in changed:
+            self._style_user(user)
+            self._draw_cursor(user)
+
+    def refresh_presence(self):
+        """Dosya yüklendikten sonra tüm kullanıcıların rengi ve imleçleri yeniden çizilir"""
+        for user in set(self.user_listbox.get(0, tk.END)) | set(self.presence):
+            self._style_user(user)
+            self._draw_cursor(user)
+
+    def _draw_cursor(self, user: str):
+        """Kullanıcının imlecini/seçimini metin alanında kendi rengiyle işaretler"""
+        tag = "presence-" + user
+        self.text_area.tag_remove(tag, "1.0", tk.END)
+        cursor = self.presence.get(user)
+        if user == self.username or cursor is None or self.presence_file != self.current_file:
+            return
+        self.text_area.tag_configure(tag, background=PRESENCE_COLORS[sum(map(ord, user)) % len(PRESENCE_COLORS)])
+        line, col, end_line, end_col = cursor
+        start, end = f"{line + 1}.{col}", f"{end_line + 1}.{end_col}"
+        if (line, col) == (end_line, end_col):
+            end = start + "+1c" # Seçim yoksa imleçteki karakter
+        self.text_area.tag_add(tag, start, end)
+
+    def schedule_cursor(self, event=None):
+        """İmleç konumunu CURSOR_INTERVAL_MS sonra gönderir; aradaki hareketler tek gönderimde birleşir"""
+        if self.cursor_timer is None:
+            self.cursor_timer = self.master.after(CURSOR_INTERVAL_MS, self.send_cursor)
+
+    def send_cursor(self):
+        self.cursor_timer = None
+        if not self.current_file or self.loading is not None or not self.online():
+            return
+        ranges = self.text_area.tag_ranges(tk.SEL)
+        first, last = (ranges[0], ranges[1]) if ranges else (tk.INSERT, tk.INSERT)
+        line, col = map(int, self.text_area.index(first).split("."))
+        end_line, end_col = map(int, self.text_area.index(last).split("."))
+        cursor = (self.current_file, (line - 1, col, end_line - 1, end_col))
+        if cursor == self.sent_cursor:
+            return
+        self.sent_cursor = cursor
+        self.send_later(self.codec.encode(CURSOR, self.current_file, body=encode_cursor(cursor[1])))
+
+    def update_text_area(self, content: Optional[str]):
+        """
+        Metin alanını verilen içeriğe getirir. Tüm metin silinip yeniden yazılmaz:
+        sadece farklı satırlar değiştirilir, böylece imleç ve kaydırma konumu korunur
+        ve maliyet değişikliğin boyutuyla orantılı kalır.
+        """
+        # Fark metin alanının kendisine göre alınır: henüz gönderilmemiş yazılar da geri alınır
+        self.current_content = parse_file_content(self.text_area.get("1.0", "end-1c"))
+        self.dirty = None
+        self.apply_edits_to_text_area(diff_lines(self.current_content, parse_file_content(content or "")))
+
+
+    def _text_call(self, *args):
+        """Sarmalanmamış Tk metin komutu"""
+        return self.master.tk.call(self.text_area_command, *args)
+
+    def _line_of(self, index) -> int:
+        """Tk indeksinin 1'den başlayan satır numarası"""
+        return int(self._text_call("index", index).split(".")[0])
+
+    def _text_command(self, *args):
+        """
+        Metin alanının Tcl komutu. insert/delete/replace işlemlerinin dokunduğu satırlar
+        kirli aralığa eklenir ve gönderim zamanlanır; diğer alt komutlar aynen geçer.
+        """
+        if not (self.track_edits and args and args[0] in ("insert", "delete", "replace")):
+            return self._text_call(*args)
+
+        if args[0] == "insert":
+            # "end"e ekleme son satır sonundan önceye yapılır
+            first = last = min(self._line_of(args[1]), self._line_of("end-1c"))
+        else:
+            # delete i1 ?i2 ...? / replace i1 i2 metin. Tek indeks tek karakter siler (satır
+            # sonuysa sonraki satırla birleşir); Tk son satır sonunu silmez
+            indices = args[1:] if args[0] == "delete" else args[1:3]
+            if len(indices) % 2:
+                indices += (f"{indices[-1]}+1c",)
+            lines = [self._line_of(index) for index in indices]
+            first, last = min(lines), min(max(lines), self._line_of("end-1c"))
+        line_count = self._line_of("end-1c")
+        result = self._text_call(*args)
+        self.mark_dirty(first - 1, last, self._line_of("end-1c") - line_count)
+        self.on_text_modified()
+        return result
+
+    def mark_dirty(self, start: int, end: int, delta: int):
+        """
+        Metin alanındaki [start, end) satırları değişti ve satır sayısı delta kadar arttı.
+        Args:
+            start (int): Değişiklikten önceki ilk satır (0'dan başlar)
+            end (int): Değişiklikten önceki son satırın bir fazlası
+            delta (int): Satır sayısındaki değişim
+        """
+        if self.dirty is None:
+            self.dirty = (start, end, end + delta)
+            return
+        dirty_start, old_end, new_end = self.dirty
+        # Mevcut aralığın dışında kalan satırlar current_content ile aynıdır:
+        # aralık genişlerken eski içerikteki karşılığı da aynı miktarda genişler
+        if end > new_end:
+            old_end += end - new_end
+            new_end = end
+        self.dirty = (min(start, dirty_start), old_end, new_end + delta)
+
+    def on_text_modified(self):
+        """
+        Gönderimi zamanlar: her değişiklik bekleme süresini yeniler (son tuştan sonra
+        gönderilir), ama ilk değişiklikten SEND_MAX_DELAY_MS'den fazla ertelenmez.
+        """
+        now = time.monotonic()
+        if self.send_timer is None:
+            self.first_change = now
+        else:
+            self.master.after_cancel(self.send_timer)
+        remaining = SEND_MAX_DELAY_MS - (now - self.first_change) * 1000
+        self.send_timer = self.master.after(max(0, int(min(SEND_DELAY_MS, remaining))), self.update_content)
 
-        self.last_update = current_time
-        # Asenkron update_content'i ayrı bir görev olarak başlat
-        asyncio.get_event_loop().create_task(self.update_content())
-        self.text_area.edit_modified(False) # Reset modified flag after scheduling update
-
-
-    async def update_content(self):
+    def update_content(self):
         """Metin alanındaki içeriği sunucuya gönderir."""
-        if not self.current_file or not self.connected:
+        if self.send_timer is not None:
+            self.master.after_cancel(self.send_timer)
+            self.send_timer = None
+        if not self.current_file or not self.online():
             return
+        self.capture_local_edits()
+
+    def capture_local_edits(self):
+        """
+        Metin alanının kirli aralığını son bilinen içerikle karşılaştırır ve farkı OT
+        oturumuna ekler. Sadece değişen satırlar okunur; maliyet düzenlenen bölgeyle orantılıdır.
+        Önceki düzenleme onay beklemiyorsa fark hemen FILE_PATCH olarak gönderilir.
+        """
+        if self.dirty is None:
+            return # No actual change, skip sending
+        start, old_end, new_end = self.dirty
+        self.dirty = None
 
-        # Get current content from text area
-        current_text_area_content = self.text_area.get(1.0, tk.END).strip()
-        new_lines = current_text_area_content.splitlines()
+        if self.master.tk.getboolean(self._text_call("compare", "end-1c", "==", "1.0")):
+            # Metin alanı boş: doküman da boş (tek boş satır değil)
+            start, old_end, new_lines = 0, len(self.current_content), []
+        else:
+            new_lines = self._text_call("get", f"{start + 1}.0", f"{new_end}.end").split("\n")
+        old_end = min(old_end, len(self.current_content))
 
-        # Check if content has actually changed from what we last know
-        if new_lines == self.current_content:
+        # Silinen satırlar da aralık düzenlemesi olarak diğer clientlara ulaşır
+        edits = [(start + edit_start, start + edit_end, lines) for edit_start, edit_end, lines
+                 in diff_lines(self.current_content[start:old_end], new_lines)]
+        if not edits:
             return # No actual change, skip sending
 
-        # Server'a her satırı tek tek gönder
-        # Bu, mevcut protokol yapımıza uygun.
-        for i, line in enumerate(new_lines, 1):
-            msg = create_message(FILE_UPDATE, self.current_file, str(i), body=line)
-            if not await self.send_message(msg):
+        self.current_content[start:old_end] = new_lines
+        edits = self.session.local(edits)
+        if edits is not None:
+            self.send_patch(edits)
+
+    def send_patch(self, edits):
+        """Düzenlemeleri dayandıkları sunucu sürümüyle kodlar ve gönderim için sıraya koyar"""
+        self.pending_unsent = not self.online()
+        if self.pending_unsent:
+            return # Yeniden bağlanınca gönderilir
+        self.send_later(self.codec.encode(FILE_PATCH, self.current_file, str(self.session.version),
+                                          body=encode_edits(edits)))
+
+    def send_later(self, msg: Union[str, bytes]):
+        """Tk callback'lerinden mesaj göndermek için (mesaj çağrı anında kodlanmış olmalı)"""
+        self.run_async(self.send_message(msg))
+
+    def run_async(self, coro):
+        """Coroutine'i ağ iş parçacığının döngüsünde başlatır (Tk iş parçacığından çağrılır)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_in_tk(self, callback, *args):
+        """
+        Ağ iş parçacığından Tk iş parçacığına iş gönderir. İşler geliş sırasıyla çalışır;
+        art arda gelen mesajlar için Tk tek bir after_idle ile uyandırılır.
+        """
+        self.tk_queue.put((callback, args))
+        if self.tk_wakeup_pending:
+            return
+        self.tk_wakeup_pending = True
+        try:
+            self.master.after_idle(self.drain_tk_queue)
+        except (RuntimeError, tk.TclError):
+            pass # Pencere kapandı, Tk döngüsü artık çalışmıyor
+
+    def drain_tk_queue(self):
+        """Kuyruktaki işleri Tk iş parçacığında çalıştırır"""
+        # Bayrak önce temizlenir: boşaltma sırasında gelen iş yeni bir uyandırma planlar
+        self.tk_wakeup_pending = False
+        while True:
+            try:
+                callback, args = self.tk_queue.get_nowait()
+            except queue.Empty:
                 return
-        
-        # Eğer yeni içerik eski içerikten kısaysa, fazla satırları silmek için sunucuya
-        # ek bir bilgi göndermemiz gerekebilir. Mevcut protokol bunu desteklemiyor.
-        # Ancak, server'dan gelen FILE_SYNC mesajı tam içeriği yeniden senkronize ettiği için
-        # bu durum genellikle çözülür.
-
-        # update_content gönderdikten sonra kendi current_content'imizi güncelleyelim
-        self.current_content = new_lines
-
+            try:
+                callback(*args)
+            except tk.TclError:
+                return # Pencere kapatıldı
+            except Exception as e:
+                print(f"[HATA] Mesaj işlenirken hata: {e}")
 
-    async def send_message(self, msg: str) -> bool:
+    async def send_message(self, msg: Union[str, bytes]) -> bool:
         """Güvenli mesaj gönderme fonksiyonu"""
         if not self.connected or not self.websocket:
             return False
@@ -233,90 +723,150 @@ class TextEditorClient:
             await self.websocket.send(msg)
             return True
         except websockets.exceptions.ConnectionClosed:
+            # Yeniden bağlanma kararı receive_messages'ta; gönderilemeyen düzenleme RESUME sonrası yeniden gönderilir
             self.connected = False
-            self.master.after(0, messagebox.showerror, "Bağlantı Hatası", "Sunucu bağlantısı koptu!")
-            self.master.after(0, self.master.destroy)
             return False
         except Exception as e:
             print(f"[HATA] Mesaj gönderilirken hata: {e}")
             return False
 
-    async def create_file(self):
+    def create_file(self):
         """Yeni dosya oluşturur"""
         fname = simpledialog.askstring("Dosya Oluştur", "Yeni dosya adı:")
-        if fname and self.connected:
+        if fname and self.online():
             # Dosya adında boşluk varsa hata verebilir, basit bir kontrol ekleyebiliriz
             if ' ' in fname or ':' in fname or '\\' in fname or '/' in fname:
                 messagebox.showerror("Geçersiz Dosya Adı", "Dosya adı boşluk veya özel karakterler içeremez.")
                 return
 
-            msg = create_message(FILE_CREATE, fname)
-            if not await self.send_message(msg):
-                return
-            # Dosya oluşturulduktan sonra otomatik olarak bu dosyaya katıl
-            self.current_file = fname
-            join_msg = create_message(FILE_JOIN, fname)
-            await self.send_message(join_msg)
+            # Dosya oluşturulduktan sonra otomatik olarak bu dosyaya katıl. Mesajlar sırayla
+            # gönderilir; current_file, içerik FILE_SYNC ile geldiğinde load_file'da değişir
+            self.send_later(self.codec.encode(FILE_CREATE, fname))
+            self.send_later(self.codec.encode(FILE_JOIN, fname))
 
 
-    async def join_file(self):
+    def join_file(self):
         """Dosyaya katılır"""
         fname = self.file_var.get()
-        if fname and fname != "Dosya Seçin" and fname != "Dosya Yok" and self.connected:
-            self.current_file = fname
-            msg = create_message(FILE_JOIN, fname)
-            await self.send_message(msg)
+        if fname and fname != "Dosya Seçin" and fname != "Dosya Yok" and self.online():
+            self.send_later(self.codec.encode(FILE_JOIN, fname))
         else:
             messagebox.showwarning("Uyarı", "Lütfen açmak için geçerli bir dosya seçin.")
 
 
-    async def update_file(self):
+    def update_file(self):
         """Manuel olarak dosya güncellemeyi tetikler."""
-        if not self.current_file or not self.connected:
+        if not self.current_file or not self.online():
             messagebox.showwarning("Uyarı", "Önce bir dosya açmalısınız.")
             return
 
-        await self.update_content() # update_content'i direkt çağır
+        self.update_content() # update_content'i direkt çağır
 
 
+    def request_history(self):
+        """Açık dosyanın sürüm geçmişini ister; yanıt gelince sürüm seçilir (choose_version)"""
+        if not self.current_file or not self.online():
+            messagebox.showwarning("Uyarı", "Önce bir dosya açmalısınız.")
+            return
+        self.send_later(self.codec.encode(HISTORY, self.current_file))
+
+    def choose_version(self, args: List[str], body: Optional[str]):
+        """Kontrol noktalarını gösterip görüntülenecek sürümü sorar"""
+        filename, current = args[0], int(args[1])
+        versions = json.loads(body) if body else []
+        oldest = versions[0][0] if versions else current
+        summary = "\n".join(f"{version}  {time.strftime('%d.%m %H:%M', time.localtime(timestamp))}  {', '.join(authors)}"
+                            for version, timestamp, authors in versions[-10:])
+        version = simpledialog.askinteger("Sürüm Geçmişi", f"{summary}\n\nGörüntülenecek sürüm ({oldest}-{current}):",
+                                          minvalue=oldest, maxvalue=current, initialvalue=current)
+        if version is not None:
+            self.send_later(self.codec.encode(FILE_AT_VERSION, filename, str(version)))
+
+    def show_version(self, args: List[str], body: Optional[str]):
+        """Geçmiş sürümü ayrı, salt okunur pencerede gösterir"""
+        window = tk.Toplevel(self.master)
+        window.title(f"{args[0]} - sürüm {args[1]}")
+        text = tk.Text(window, wrap=tk.WORD)
+        text.insert("1.0", body or "")
+        text.configure(state=tk.DISABLED)
+        text.pack(expand=True, fill=tk.BOTH)
+
+    def request_search(self):
+        """Tüm dosyalarda arar; sonuçlar ayrı pencerede listelenir (show_search_results)"""
+        if not self.online():
+            return
+        query = simpledialog.askstring("Ara", "Aranacak kelimeler:")
+        if query and query.strip():
+            self.send_later(self.codec.encode(SEARCH, body=query.strip()))
+
+    def show_search_results(self, args: List[str], body: Optional[str]):
+        """Sonuçları listeler; çift tıklanan satırın dosyası açılır ve satıra gidilir"""
+        results = json.loads(body) if body else []
+        if not results:
+            messagebox.showinfo("Ara", "Sonuç bulunamadı.")
+            return
+        window = tk.Toplevel(self.master)
+        window.title(f"Arama sonuçları ({len(results)})")
+        listbox = tk.Listbox(window, width=100)
+        for filename, line_num, text in results:
+            listbox.insert(tk.END, f"{filename}:{line_num}: {text}")
+        listbox.pack(expand=True, fill=tk.BOTH)
+
+        def open_result(event):
+            selection = listbox.curselection()
+            if selection:
+                filename, line_num, _ = results[selection[0]]
+                self.pending_goto = (filename, line_num)
+                if filename == self.current_file:
+                    self.goto_pending_line()
+                else:
+                    self.send_later(self.codec.encode(FILE_JOIN, filename))
+        listbox.bind("<Double-Button-1>", open_result)
+
+    def goto_pending_line(self):
+        """Arama sonucundan açılan dosya yüklendiyse imleci sonucun satırına taşır"""
+        if self.pending_goto is None or self.pending_goto[0] != self.current_file:
+            return
+        line_num = self.pending_goto[1]
+        if line_num > len(self.current_content):
+            return # Parçalı yüklemede satır henüz gelmedi; commit_chunks'ta yeniden denenir
+        self.pending_goto = None
+        self.text_area.mark_set(tk.INSERT, f"{line_num}.0")
+        self.text_area.see(tk.INSERT)
+
     async def quit_app(self):
         """Uygulamadan çıkar"""
         if self.connected and self.websocket:
             try:
-                quit_msg = create_message(QUIT, self.username)
+                quit_msg = self.codec.encode(QUIT, self.username)
                 await self.websocket.send(quit_msg)
             except:
                 pass # Already closing or connection broken, no need to error
             finally:
                 if self.websocket: # Ensure websocket object exists before closing
                     await self.websocket.close()
-        self.master.destroy()
+        self.call_in_tk(self.master.destroy)
 
     def quit_app_async_wrapper(self):
         """Tkinter protokol handler için asenkron quit_app sarmalayıcısı"""
-        asyncio.get_event_loop().create_task(self.quit_app())
+        self.quitting = True
+        self.run_async(self.quit_app())
 
 def main():
-    root = tk.Tk()
-    app = TextEditorClient(root)
-    
-    # Tkinter event loop'unu asyncio ile entegre et
-    async def run_tkinter_loop():
-        while True:
-            root.update_idletasks() # Tkinter'ın bekleyen görevlerini işle
-            root.update()          # Tkinter widgetlarını güncelle
-            await asyncio.sleep(0.01) # CPU'yu serbest bırakmak için küçük bir gecikme
+    # Websocket işleri arka planda kendi asyncio döngüsünde, Tk ana iş parçacığında çalışır
+    loop = asyncio.new_event_loop()
+    network = threading.Thread(target=loop.run_forever, name="websocket", daemon=True)
+    network.start()
 
+    root = tk.Tk()
+    app = TextEditorClient(root, loop)
     try:
-        asyncio.get_event_loop().run_until_complete(run_tkinter_loop())
-    except tk.TclError: # Pencere kapatıldığında oluşabilir
-        pass
-    except RuntimeError as e:
-        if "cannot run the event loop while another loop is running" in str(e):
-            print("[HATA] Zaten çalışan bir event döngüsü var. Uygulama kapatılıyor.")
-        else:
-            raise
+        root.mainloop()
+    finally:
+        # Pencere kapandı: ağ döngüsünü durdur
+        loop.call_soon_threadsafe(loop.stop)
+        network.join(timeout=5)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
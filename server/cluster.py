@@ -0,0 +1,215 @@
+# server/cluster.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+import zlib
+
+from shared.codec import Message
+from server.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Çoklu süreç modu: dokümanlar ve kullanıcı adları, adlarının özetine (crc32) göre işçi
+# süreçlere bölünür. Her işçi aynı portu SO_REUSEPORT ile dinler; client hangi işçiye
+# bağlandıysa komutları orada karşılanır, doküman başka işçinindeyse sahibine iletilir.
+#
+# İşçiler birbirine yerel Unix soketleriyle bağlanır (tam örgü, dış aracı yok). Her işçi
+# her komşusuna tek bir giden bağlantı açar ve sadece ona yazar; istekler, yanıtlar ve
+# oda yayınları aynı bağlantıdan gittiği için sıraları korunur. Bu sayede bir işçiye
+# FILE_SYNC'ten sonra gelen düzenlemeler her zaman senkronize edilen sürümden sonradır.
+#
+# Kayıtlar satır başına bir JSON nesnesidir, "t" alanı türünü belirtir:
+#   req   -> {"t": "req", "id": n, "op": ...}  Sahibinden yanıt beklenen istek
+#   res   -> {"t": "res", "id": n, "ok": bool, "m": [mesajlar]}  İsteğin yanıtı
+#   diğer -> {"t": tür, "name": ad, ...}  Yanıtsız olaylar (kullanıcı/dosya listesi, oda yayını)
+
+# === Küme Ayarları ===
+PEER_CONNECT_TIMEOUT = 15  # İşçilerin birbirine bağlanması için beklenecek en uzun süre (saniye)
+PEER_RECORD_LIMIT = 512 * 1024 * 1024  # Tek kaydın en fazla boyutu; iletilen en büyük client mesajı (MAX_MESSAGE_BYTES) yeniden kodlanınca da sığar
+
+def shard_of(name, count):
+    """Adın sahibi işçinin sırası; tüm süreçlerde aynı sonucu verir (hash() tohumludur)"""
+    return zlib.crc32(name.encode("utf-8")) % count
+
+def _encode(record):
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+def pack_message(message):
+    return [message.command, list(message.args), message.body]
+
+def unpack_message(packed):
+    command, args, body = packed
+    return Message(command, *args, body=body)
+
+class Cluster:
+    """
+    Bir işçi sürecinin diğer işçilerle bağlantısı ve doküman sahipliği.
+    İstekler ve olaylar server_main'deki işleyicilere verilir; bu sınıf sadece taşır.
+    """
+    def __init__(self, index, count, socket_dir):
+        """
+        Args:
+            index (int): Bu işçinin sırası (0'dan başlar)
+            count (int): Toplam işçi sayısı
+            socket_dir (str): İşçilerin Unix soketlerinin bulunduğu dizin
+        """
+        self.index = index
+        self.count = count
+        self.socket_dir = socket_dir
+        self.writers = {}  # işçi sırası -> giden bağlantının StreamWriter'ı
+        self.room_peers = {}  # filename -> dokümanı görüntüleyen client'ı olan işçiler (sahibi olduğumuz dokümanlar)
+        self._pending = {}  # istek id -> (Future, deliver)
+        self._next_id = 0
+        self._tasks = set()  # Çalışan istek görevleri (referans tutulmazsa silinebilirler)
+        self._server = None
+        self._ready = asyncio.Event()  # Tüm giden bağlantılar açıldı
+        self._handle_request = None
+        self._handle_event = None
+
+    def socket_path(self, index):
+        return os.path.join(self.socket_dir, f"worker-{index}.sock")
+
+    def owner(self, name):
+        return shard_of(name, self.count)
+
+    def is_local(self, name):
+        return shard_of(name, self.count) == self.index
+
+    async def start(self, handle_request, handle_event):
+        """
+        Bu işçinin soketini açar ve tüm komşulara bağlanır.
+        Args:
+            handle_request: async (işçi, istek) -> (başarılı mı, [Message]) - sahibi olduğumuz ad için istek
+            handle_event: (işçi, olay) -> None - yanıt beklemeyen kayıtlar
+        """
+        self._handle_request = handle_request
+        self._handle_event = handle_event
+        self._server = await asyncio.start_unix_server(self._serve_peer, self.socket_path(self.index),
+                                                       limit=PEER_RECORD_LIMIT)
+        deadline = time.monotonic() + PEER_CONNECT_TIMEOUT
+        for index in range(self.count):
+            if index != self.index:
+                self.writers[index] = await self._connect(index, deadline)
+        self._ready.set()
+        logger.info("[BAŞLATILIYOR] İşçi %d/%d diğer işçilere bağlandı", self.index + 1, self.count)
+
+    async def _connect(self, index, deadline):
+        """Komşunun soketi açılana kadar yeniden dener"""
+        while True:
+            try:
+                _, writer = await asyncio.open_unix_connection(self.socket_path(index))
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"İşçi {index} soketine bağlanılamadı")
+                await asyncio.sleep(0.05)
+        writer.write(_encode({"worker": self.index}))
+        return writer
+
+    async def _serve_peer(self, reader, writer):
+        """Bir komşudan gelen kayıtları sırayla işler"""
+        peer = None
+        try:
+            peer = json.loads(await reader.readline())["worker"]
+            # Komşu bizden önce hazır olup client kabul etmiş olabilir; yanıt verebilmek
+            # için önce bizim de tüm giden bağlantılarımız açılmalı
+            await self._ready.wait()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                record = json.loads(line)
+                kind = record["t"]
+                if kind == "req":
+                    # Her istek ayrı görevde: yavaş bir doküman yüklemesi diğerlerini bekletmez.
+                    # Bir client'ın komutları yine sıralıdır, çünkü client yanıtı bekler.
+                    task = asyncio.create_task(self._run_request(peer, record))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                elif kind == "res":
+                    self._resolve(record)
+                else:
+                    self._handle_event(peer, record)
+        except asyncio.CancelledError:
+            # Kapanırken: görev sessizce biter (akış geri çağrısı iptali hata olarak loglamasın)
+            return
+        except Exception as e:
+            logger.error("[HATA] İşçi %s bağlantı hatası: %s", peer, e)
+        else:
+            logger.warning("[UYARI] İşçi %s bağlantısı kapandı", peer)
+        finally:
+            writer.close()
+
+    async def _run_request(self, peer, request):
+        try:
+            ok, messages = await self._handle_request(peer, request)
+        except Exception as e:
+            logger.exception("[HATA] İşçi %d isteği işlenemedi: %s", peer, e)
+            ok, messages = False, []
+        self.post(peer, {"t": "res", "id": request["id"], "ok": ok,
+                         "m": [pack_message(message) for message in messages]})
+
+    def _resolve(self, response):
+        future, deliver = self._pending.pop(response["id"])
+        # Mesajlar okuyucu görevinde hemen teslim edilir: aynı bağlantıdan sonra gelen
+        # oda yayınları client'a bu mesajlardan (örn. FILE_SYNC) önce ulaşamaz
+        if deliver is not None:
+            deliver([unpack_message(packed) for packed in response["m"]])
+        if not future.done():
+            future.set_result(response["ok"])
+
+    def post(self, index, record):
+        """Kaydı komşunun giden bağlantısına yazar (beklemez)"""
+        writer = self.writers[index]
+        if not writer.is_closing():
+            writer.write(_encode(record))
+
+    def post_all(self, record):
+        data = _encode(record)
+        for writer in self.writers.values():
+            if not writer.is_closing():
+                writer.write(data)
+
+    async def request(self, index, request, deliver=None):
+        """
+        İsteği komşuya gönderir ve yanıtını bekler.
+        Args:
+            index (int): İsteği işleyecek işçi
+            request (dict): "op" ve işleme özel alanlar
+            deliver (callable, optional): Yanıttaki [Message] listesini alır; yanıt gelir gelmez çağrılır
+        Returns:
+            bool: İstek başarılıysa True
+        """
+        self._next_id += 1
+        request["t"] = "req"
+        request["id"] = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = (future, deliver)
+        metrics.inc("peer_requests_total", op=request["op"])
+        with metrics.timer("peer_request_duration_ms", op=request["op"]):
+            self.post(index, request)
+            return await future
+
+    def publish(self, filename, message):
+        """Sahibi olduğumuz dokümanın oda mesajını, odada client'ı olan işçilere iletir"""
+        peers = self.room_peers.get(filename)
+        if peers:
+            # Kayıt bir kez kodlanır, her işçide yerel clientlara ayrıca yayınlanır
+            data = _encode({"t": "room", "name": filename, "m": pack_message(message)})
+            for index in peers:
+                writer = self.writers[index]
+                if not writer.is_closing():
+                    writer.write(data)
+
+    def add_room_peer(self, filename, index):
+        self.room_peers.setdefault(filename, set()).add(index)
+
+    def remove_room_peer(self, filename, index):
+        peers = self.room_peers.get(filename)
+        if peers is not None:
+            peers.discard(index)
+            if not peers:
+                del self.room_peers[filename]
@@ -0,0 +1,157 @@
+# server/connection.py
+
+import asyncio
+import logging
+from websockets.exceptions import ConnectionClosed
+
+from shared.codec import JSON_CODEC
+from server.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# === Bağlantı Ayarları ===
+OUTBOX_SIZE = 1024  # Bağlantı başına bekleyebilecek en fazla giden mesaj
+POLICY_DISCONNECT = "disconnect"  # Geride kalan client'ın bağlantısını kes
+POLICY_RESYNC = "resync"  # Geride kalan client'ın kuyruğunu boşalt ve tam senkron gönder
+STREAM_WINDOW = 8  # Akış (stream) sırasında kuyrukta bekleyebilecek en fazla mesaj
+
+class ClientConnection:
+    """
+    Tek bir websocket bağlantısının giden mesaj kuyruğunu yönetir.
+    Her bağlantının kendi yazıcı görevi olduğu için yavaş bir client diğerlerini bekletmez.
+    """
+    def __init__(self, websocket, maxsize=OUTBOX_SIZE, policy=POLICY_RESYNC, resync_messages=None):
+        """
+        Args:
+            websocket: Bağlantının websocket nesnesi
+            maxsize (int): Giden kuyruğun boyut sınırı
+            policy (str): Kuyruk dolduğunda uygulanacak politika (POLICY_DISCONNECT, POLICY_RESYNC)
+            resync_messages (callable, optional): Bağlantı için tam senkron mesajlarını döndürür
+        """
+        self.websocket = websocket
+        self.username = None
+        self.current_file = None
+        self.codec = JSON_CODEC  # LOGIN sırasında client'ın seçtiği kodlayıcı
+        self.session = None  # Giriş yapınca açılan oturum (bkz. server/session.py)
+        self.done = asyncio.Event()  # Bağlantının işleyicisi bitti ve temizlendi
+        self.stream_task = None  # Süren akış görevi (bkz. stream)
+        self._drained = asyncio.Event()  # Kuyruk STREAM_WINDOW'un altına indi
+        self.policy = policy
+        self.resync_messages = resync_messages
+        self.closed = False
+        self.resyncing = False  # Taşma sonrası güncel durum hazırlanıyor (bkz. _handle_overflow)
+        self.queue = asyncio.Queue(maxsize)
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def send(self, message) -> bool:
+        """
+        Mesajı (shared.codec.Message) beklemeden giden kuyruğa ekler.
+        Kodlama, yazıcı görevinde bağlantının kodlayıcısıyla yapılır.
+        Returns:
+            bool: Mesaj kuyruğa eklendiyse True
+        """
+        if self.closed or self.resyncing:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self._handle_overflow()
+            return False
+
+    def _handle_overflow(self):
+        """Kuyruğu dolan client'a yapılandırılmış politikayı uygular"""
+        metrics.inc("outbox_overflows_total", policy=self.policy)
+        if self.policy == POLICY_RESYNC and self.resync_messages is not None:
+            # Güncel durum kuyruk boşaltılmadan hazırlanır. Hazırlarken bekleyen düzenlemeler
+            # odaya yayınlanır; bu bağlantıya gelenler zaten güncel duruma dahil olduğu için
+            # atlanır (FILE_SYNC'in önüne eski FILE_BATCH girmez, taşma iç içe işlenmez)
+            self.resyncing = True
+            try:
+                messages = self.resync_messages(self)
+            finally:
+                self.resyncing = False
+            # Bekleyen mesajlar artık anlamsız, yerine güncel durumu gönder
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if len(messages) <= self.queue.maxsize:
+                for message in messages:
+                    self.queue.put_nowait(message)
+                logger.warning("[UYARI] %s geride kaldı, yeniden senkronize ediliyor", self.username)
+                return
+
+        logger.warning("[UYARI] %s geride kaldı, bağlantısı kesiliyor", self.username)
+        self.closed = True
+        asyncio.create_task(self.websocket.close())
+
+    async def _writer(self):
+        """Kuyruktaki mesajları sırayla websocket'e yazar"""
+        try:
+            while True:
+                message = await self.queue.get()
+                if self.queue.qsize() <= STREAM_WINDOW:
+                    self._drained.set()
+                data = message.encode(self.codec)
+                await self.websocket.send(data)
+                metrics.inc("messages_out_total")
+                metrics.inc("bytes_out_total", len(data), document=self.current_file or "-")
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error("[HATA] Mesaj gönderilirken hata: %s (Kullanıcı: %s)", e, self.username)
+            await self.websocket.close()
+        finally:
+            self.closed = True
+
+    def stream(self, messages, active=None):
+        """
+        Çok sayıda mesajı (büyük dokümanın parçaları gibi) kuyruğu doldurmadan ayrı görevde
+        sırayla gönderir; mesajlar gerektikçe üretilebilir (generator). Arada gelen diğer
+        mesajlar (oda yayınları) beklemez. Önceki akış varsa iptal edilir.
+        Args:
+            messages (iterable): Gönderilecek mesajlar
+            active (callable, optional): False dönerse akış yarıda bırakılır (örn. client dosyadan ayrıldı)
+        """
+        if self.stream_task is not None:
+            self.stream_task.cancel()
+        self.stream_task = asyncio.create_task(self._stream(messages, active))
+
+    async def _stream(self, messages, active):
+        for message in messages:
+            while self.queue.qsize() > STREAM_WINDOW and not self.closed:
+                self._drained.clear()
+                await self._drained.wait()
+            if self.closed or (active is not None and not active()):
+                return
+            self.send(message)
+
+    async def close(self):
+        """Yazıcı ve akış görevlerini durdurur"""
+        self.closed = True
+        if self.stream_task is not None:
+            self.stream_task.cancel()
+        self.writer_task.cancel()
+        try:
+            await self.writer_task
+        except asyncio.CancelledError:
+            pass
+
+
+class ForwardedConnection:
+    """
+    Çoklu süreç modunda (bkz. server/cluster.py) başka bir işçiye bağlı client adına
+    komut işlerken kullanılır. Gönderilen mesajlar biriktirilir ve yanıtla birlikte
+    client'ın bağlı olduğu işçiye döner; oda yayınları bu nesneye değil işçiye gider.
+    """
+    def __init__(self, username):
+        self.username = username
+        self.current_file = None
+        self.messages = []
+
+    def send(self, message) -> bool:
+        self.messages.append(message)
+        return True
+
+    def stream(self, messages, active=None):
+        # Akış client'ın bağlı olduğu işçide yapılır; burada sadece toplanır
+        self.messages.extend(messages)
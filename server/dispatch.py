@@ -0,0 +1,106 @@
+# server/dispatch.py
+
+from functools import lru_cache
+
+from shared.messages import ERROR
+from shared.codec import Message
+
+# === Komut Kayıt Tablosu ===
+# Her komut bir işleyici (handler) ve argüman doğrulayıcılarıyla kaydedilir.
+# handle_client uzun bir if/elif zinciri yerine komutu bu tablodan bulur.
+
+MAX_FILENAME_LENGTH = 128
+MAX_USERNAME_LENGTH = 64
+STOP = object()  # İşleyici bunu döndürürse bağlantı kapatılır
+
+COMMAND_HANDLERS = {}  # command -> CommandSpec
+
+class CommandError(Exception):
+    """İstemciye ERROR mesajı olarak dönen, beklenen hata (geçersiz argüman, olmayan dosya...)"""
+
+class CommandSpec:
+    __slots__ = ("name", "handler", "validators", "optional", "login_required")
+
+    def __init__(self, name, handler, validators, optional, login_required):
+        self.name = name
+        self.handler = handler
+        self.validators = validators
+        self.optional = optional
+        self.login_required = login_required
+
+def command(name, *validators, optional=(), login_required=True):
+    """
+    İşleyiciyi komut tablosuna kaydeden dekoratör.
+    Args:
+        name (str): Komut adı (örn. FILE_JOIN)
+        *validators: Zorunlu argümanların doğrulayıcıları (değeri döndürür ya da CommandError fırlatır)
+        optional (tuple): İsteğe bağlı argümanların doğrulayıcıları
+        login_required (bool): Komut giriş yapmadan kullanılabilir mi
+    İşleyici imzası: async def handler(conn, body, *args)
+    """
+    def decorator(handler):
+        COMMAND_HANDLERS[name] = CommandSpec(name, handler, validators, optional, login_required)
+        return handler
+    return decorator
+
+async def dispatch(conn, command, args, body):
+    """
+    Komutu doğrular ve işleyicisini çağırır.
+    Returns: işleyicinin dönüş değeri (STOP ise bağlantı kapatılır)
+    Raises:
+        CommandError: Bilinmeyen komut, eksik/geçersiz argüman ya da gövde, giriş yapılmamışsa
+    """
+    # Eşler arası yönlendirilen istekler de buradan geçer: türleri çözücüye güvenmeden denetle
+    if not isinstance(command, str):
+        raise CommandError("Geçersiz komut.")
+    if body is not None and not isinstance(body, str):
+        raise CommandError(f"{command} için gövde geçersiz.")
+    spec = COMMAND_HANDLERS.get(command)
+    if spec is None:
+        raise CommandError(f"Bilinmeyen komut: {command}")
+    if spec.login_required and conn.username is None:
+        raise CommandError("Önce giriş yapmalısınız.")
+
+    required = len(spec.validators)
+    if not required <= len(args) <= required + len(spec.optional):
+        raise CommandError(f"{command} için argüman sayısı geçersiz.")
+    values = [validate(arg) for validate, arg in zip(spec.validators + spec.optional, args)]
+    return await spec.handler(conn, body, *values)
+
+@lru_cache(maxsize=256)
+def error_message(text):
+    """
+    Hata mesajını oluşturur. Aynı hata metni için aynı Message döner,
+    böylece sık görülen hatalar her seferinde yeniden kodlanmaz.
+    """
+    return Message(ERROR, body=text)
+
+# === Argüman Doğrulayıcıları ===
+
+def filename_arg(value):
+    """Dosya adı: boş olamaz, dizin ayırıcı içeremez ve nokta ile başlayamaz (günlük/geçici dosyalar)"""
+    if (not isinstance(value, str) or not value or len(value) > MAX_FILENAME_LENGTH
+            or value.startswith(".") or any(ch in value for ch in "/\\:\0")):
+        raise CommandError("Geçersiz dosya adı.")
+    return value
+
+def username_arg(value):
+    if not isinstance(value, str) or not value.strip() or len(value) > MAX_USERNAME_LENGTH:
+        raise CommandError("Geçersiz kullanıcı adı.")
+    return value
+
+def text_arg(value):
+    if not isinstance(value, str):
+        raise CommandError("Geçersiz argüman.")
+    return value
+
+def line_number_arg(value):
+    """1'den başlayan satır numarası"""
+    if not isinstance(value, str) or not value.isdigit() or int(value) < 1:
+        raise CommandError("Geçersiz satır numarası.")
+    return int(value)
+
+def version_arg(value):
+    if not isinstance(value, str) or not value.isdigit():
+        raise CommandError("Geçersiz sürüm numarası.")
+    return int(value)
@@ -0,0 +1,409 @@
+# server/document.py
+
+import random
+import sys
+from array import array
+from collections import deque
+from itertools import accumulate
+from typing import Iterator, List, Optional
+
+# Doküman satırları kalıcı (persistent) bir örtük treap'te tutulur: her düğüm ardışık
+# satırlardan oluşan bir bloktur, düğümler satır sırasına göre dizilir ve alt ağaç boyutları
+# konumu belirler. Düğümler hiç değiştirilmez; güncellemeler sadece kökten değişen bloğa kadar
+# olan yolu kopyalar. Bu sayede ekleme/silme/değiştirme O(log n), anlık görüntü (snapshot) O(1) olur.
+#
+# Blok satırları ayrı str nesneleri olarak değil, tek bir str (satırlar art arda) ve her satırın
+# bitiş konumunu tutan array('I') olarak saklanır. Satır başına maliyet 4 baytlık konumdur;
+# boş satır başka yer kaplamaz, satırlar sadece okunurken dilimlenir.
+
+# === Satır Deposu Ayarları ===
+BLOCK_LINES = 64  # Bir blokta en fazla satır
+BLOCK_CHARS = 8 * 1024  # Bloğun en fazla karakteri (daha uzun tek satır kendi bloğundadır)
+BLOCK_OVERHEAD = 256  # Blok başına sabit bellek: düğüm, öncelik ve sayaç nesneleri, dizi başlığı
+OFFSET_BYTES = array("I").itemsize
+
+# Eski bir sürüme göre gönderilen düzenlemeleri dönüştürmek (OT) için saklanan son
+# düzenleme listesi sayısı. Daha eski bir sürüme göre gelen düzenleme reddedilir.
+OP_HISTORY_SIZE = 256
+
+class DocumentLimitError(ValueError):
+    """Düzenleme dokümanın satır ya da bellek sınırını aşıyor; doküman değişmedi"""
+
+class _Node:
+    __slots__ = ("text", "ends", "priority", "left", "right", "size", "chars", "nbytes")
+
+    def __init__(self, text, ends, priority, left=None, right=None):
+        self.text = text
+        self.ends = ends
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.size = len(ends) + _size(left) + _size(right)
+        self.chars = len(text) + _chars(left) + _chars(right)
+        self.nbytes = (sys.getsizeof(text) + len(ends) * OFFSET_BYTES + BLOCK_OVERHEAD
+                       + _nbytes(left) + _nbytes(right))
+
+    def line(self, index):
+        start = self.ends[index - 1] if index else 0
+        return self.text[start:self.ends[index]]
+
+    def lines(self):
+        text = self.text
+        start = 0
+        for end in self.ends:
+            yield text[start:end]
+            start = end
+
+def _size(node) -> int:
+    return node.size if node is not None else 0
+
+def _chars(node) -> int:
+    return node.chars if node is not None else 0
+
+def _nbytes(node) -> int:
+    return node.nbytes if node is not None else 0
+
+def _block(lines, priority, left=None, right=None):
+    """Satır listesinden blok düğümü oluşturur"""
+    return _Node("".join(lines), array("I", accumulate(map(len, lines))), priority, left, right)
+
+def _copy(node, left, right):
+    """Düğümü yeni çocuklarıyla kopyalar (orijinal düğüm ve bloğu değişmez, paylaşılır)"""
+    return _Node(node.text, node.ends, node.priority, left, right)
+
+def _chunks(lines):
+    """Satırları eşit boyda, en fazla BLOCK_LINES satır ve BLOCK_CHARS karakterlik bloklara böler"""
+    count = len(lines)
+    if not count:
+        return
+    per_block = -(-count // -(-count // BLOCK_LINES))
+    block, chars = [], 0
+    for line in lines:
+        if block and (len(block) >= per_block or chars + len(line) > BLOCK_CHARS):
+            yield block
+            block, chars = [], 0
+        block.append(line)
+        chars += len(line)
+    yield block
+
+def _split(node, count):
+    """Ağacı ilk `count` satır ve geri kalanı olarak ikiye böler"""
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if count <= left_size:
+        left, right = _split(node.left, count)
+        return left, _copy(node, right, node.right)
+    own = len(node.ends)
+    if count >= left_size + own:
+        left, right = _split(node.right, count - left_size - own)
+        return _copy(node, node.left, left), right
+    # Sınır bloğun içinde: blok aynı öncelikli iki düğüme ayrılır
+    lines = list(node.lines())
+    index = count - left_size
+    return (_block(lines[:index], node.priority, node.left, None),
+            _block(lines[index:], node.priority, None, node.right))
+
+def _merge(left, right):
+    """Sıralı iki ağacı birleştirir (left'in tüm satırları right'tan önce gelir)"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return _copy(left, left.left, _merge(left.right, right))
+    return _copy(right, _merge(left, right.left), right.right)
+
+def _build(blocks, lo, hi, depth):
+    """Blok listesinden dengeli ağaç kurar (O(n))"""
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    # Kurulan düğümlerin önceliği derinlikle azalır ve her zaman rastgele önceliklerden
+    # (0-1 arası) büyüktür; böylece yığın (heap) özelliği korunur.
+    return _block(blocks[mid], 1.0 + 1.0 / (depth + 1),
+                  _build(blocks, lo, mid, depth + 1),
+                  _build(blocks, mid + 1, hi, depth + 1))
+
+def _get(node, index):
+    while node is not None:
+        left_size = _size(node.left)
+        if index < left_size:
+            node = node.left
+            continue
+        index -= left_size
+        if index < len(node.ends):
+            return node.line(index)
+        index -= len(node.ends)
+        node = node.right
+    raise IndexError("Satır numarası doküman dışında")
+
+def _set(node, index, line):
+    """index'teki satırı değiştirilmiş yeni ağacı döndürür (yol kopyalama)"""
+    left_size = _size(node.left)
+    if index < left_size:
+        return _copy(node, _set(node.left, index, line), node.right)
+    own = len(node.ends)
+    if index >= left_size + own:
+        return _copy(node, node.left, _set(node.right, index - left_size - own, line))
+    lines = list(node.lines())
+    lines[index - left_size] = line
+    return _block(lines, node.priority, node.left, node.right)
+
+def _edge_block(node, side):
+    """En soldaki ("left") ya da en sağdaki ("right") bloğun satır sayısı"""
+    while getattr(node, side) is not None:
+        node = getattr(node, side)
+    return len(node.ends)
+
+def _replace_in_block(node, start, end, lines, removed):
+    """
+    Aralık tek bir bloğun içindeyse sadece o blok yeniden kurulur (tek yol kopyası).
+    Returns: yeni ağaç; aralık blok sınırını aşıyorsa ya da blok çok büyüyecekse None
+    """
+    if node is None:
+        return None
+    left_size = _size(node.left)
+    own = len(node.ends)
+    if left_size <= start and end <= left_size + own:
+        block = list(node.lines())
+        old = block[start - left_size:end - left_size]
+        block[start - left_size:end - left_size] = lines
+        if not block or len(block) > 2 * BLOCK_LINES or sum(map(len, block)) > 2 * BLOCK_CHARS:
+            return None
+        if removed is not None:
+            removed.extend(old)
+        return _block(block, node.priority, node.left, node.right)
+    if end <= left_size:
+        left = _replace_in_block(node.left, start, end, lines, removed)
+        return _copy(node, left, node.right) if left is not None else None
+    if start >= left_size + own:
+        right = _replace_in_block(node.right, start - left_size - own, end - left_size - own, lines, removed)
+        return _copy(node, node.left, right) if right is not None else None
+    return None
+
+def _replace_range(root, start, end, new_lines, removed=None):
+    """
+    [start, end) aralığı new_lines ile değiştirilmiş yeni ağacı döndürür.
+    removed verilmişse aralıktaki eski satırlar ona eklenir.
+    """
+    lines = [line if line is not None else "" for line in new_lines]
+    replaced = _replace_in_block(root, start, end, lines, removed)
+    if replaced is not None:
+        return replaced
+    left, rest = _split(root, start)
+    middle, right = _split(rest, end - start)
+    if removed is not None:
+        removed.extend(_iter_lines(middle))
+    # Aralığın iki yanındaki bloklar yeni satırlarla birlikte yeniden bölünür; böylece
+    # küçük düzenlemeler tek satırlık bloklar biriktirmez
+    if left is not None:
+        left, tail = _split(left, _size(left) - _edge_block(left, "right"))
+        lines[:0] = _iter_lines(tail)
+    if right is not None:
+        head, right = _split(right, _edge_block(right, "left"))
+        lines.extend(_iter_lines(head))
+    middle = None
+    for block in _chunks(lines):
+        middle = _merge(middle, _block(block, random.random()))
+    return _merge(_merge(left, middle), right)
+
+def _iter_lines(node) -> Iterator[str]:
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield from node.lines()
+        node = node.right
+
+def _from_lines(lines):
+    lines = [line if line is not None else "" for line in lines]
+    blocks = list(_chunks(lines))
+    return _build(blocks, 0, len(blocks), 0)
+
+
+class DocumentSnapshot:
+    """
+    Dokümanın belirli bir sürümdeki değişmez görüntüsü.
+    Kaydetme ve senkronizasyon gibi işlemler canlı dokümanı kilitlemeden bunu kullanır.
+    """
+    __slots__ = ("_root", "version")
+
+    def __init__(self, root, version):
+        self._root = root
+        self.version = version
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def lines(self) -> List[str]:
+        return list(_iter_lines(self._root))
+
+    def iter_lines(self) -> Iterator[str]:
+        return _iter_lines(self._root)
+
+    @property
+    def chars(self) -> int:
+        """Satırların toplam karakter sayısı (O(1))"""
+        return _chars(self._root)
+
+    def text(self) -> str:
+        return "\n".join(_iter_lines(self._root))
+
+
+class Document:
+    """
+    Satır tabanlı doküman. Her değişiklik sürüm sayacını bir artırır.
+    Satır indeksleri 0'dan başlar (protokoldeki satır numaraları 1'den başlar).
+    """
+    def __init__(self, lines: Optional[List[str]] = None, version: int = 0, saved: bool = True):
+        """
+        Args:
+            lines (List[str], optional): Başlangıç satırları
+            version (int): Başlangıç sürümü
+            saved (bool): İçerik diskteki haliyle aynıysa True; yeni dokümanlar için False
+        """
+        self._root = _from_lines(lines or [])
+        self.version = version
+        self.saved_version = version if saved else None  # Diske yazılmış son sürüm
+        self.history = deque(maxlen=OP_HISTORY_SIZE)  # Son sürümlerin (yazar, düzenlemeler) kayıtları, eskiden yeniye
+
+    @classmethod
+    def from_text(cls, text: str, version: int = 0) -> "Document":
+        # text() ile tam ters: sondaki boş satırlar korunur
+        return cls(text.split("\n") if text else [], version)
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def line(self, index: int) -> str:
+        return _get(self._root, index)
+
+    @property
+    def memory_size(self) -> int:
+        """Dokümanın bellekte kapladığı yaklaşık bayt: blok metinleri, konum dizileri ve düğümler (O(1))"""
+        return _nbytes(self._root)
+
+    def lines(self) -> List[str]:
+        return list(_iter_lines(self._root))
+
+    def text(self) -> str:
+        return "\n".join(_iter_lines(self._root))
+
+    @property
+    def dirty(self) -> bool:
+        """Son kayıttan beri değişiklik var mı"""
+        return self.saved_version != self.version
+
+    def mark_saved(self, version: int):
+        """Verilen sürümün anlık görüntüsü diske yazıldı"""
+        if self.saved_version is None or version > self.saved_version:
+            self.saved_version = version
+
+    def snapshot(self) -> DocumentSnapshot:
+        """O(1): düğümler değişmez olduğu için kök referansı yeterlidir"""
+        return DocumentSnapshot(self._root, self.version)
+
+    def insert(self, index: int, line: str) -> int:
+        """index konumuna yeni satır ekler. Returns: yeni sürüm"""
+        return self.replace_range(index, index, [line])
+
+    def delete(self, index: int) -> int:
+        """index'teki satırı siler. Returns: yeni sürüm"""
+        return self.replace_range(index, index + 1, [])
+
+    def replace(self, index: int, line: str) -> int:
+        """index'teki satırın içeriğini değiştirir. Returns: yeni sürüm"""
+        if not 0 <= index < len(self):
+            raise IndexError("Satır numarası doküman dışında")
+        line = line if line is not None else ""
+        self._root = _set(self._root, index, line)
+        self.history.append((None, [(index, index + 1, [line])]))
+        self.version += 1
+        return self.version
+
+    def set_line(self, index: int, line: str) -> int:
+        """
+        index'teki satırı değiştirir; doküman kısaysa araya boş satırlar eklenir.
+        Returns: yeni sürüm
+        """
+        return self.apply_edits(self.set_line_edits(index, line))
+
+    def set_line_edits(self, index: int, line: str):
+        """set_line ile aynı değişikliği yapan (start, end, lines) düzenlemelerini döndürür"""
+        if index < 0:
+            raise IndexError("Satır numarası doküman dışında")
+        length = len(self)
+        if index < length:
+            return [(index, index + 1, [line])]
+        return [(length, length, [""] * (index - length) + [line])]
+
+    def replace_range(self, start: int, end: int, new_lines: List[str]) -> int:
+        """
+        [start, end) aralığındaki satırları new_lines ile değiştirir (tek sürüm artışı).
+        Returns: yeni sürüm
+        """
+        return self.apply_edits([(start, end, new_lines)])
+
+    def apply_edits(self, edits, author: Optional[str] = None,
+                    max_lines: Optional[int] = None, max_bytes: Optional[int] = None,
+                    removed: Optional[list] = None) -> int:
+        """
+        (start, end, lines) düzenlemelerini sırayla ve atomik olarak uygular:
+        herhangi biri geçersizse doküman değişmez. Tüm liste tek sürüm artışıdır.
+        Args:
+            edits (list): (start, end, lines) düzenlemeleri
+            author (str, optional): Düzenlemeyi yapan kullanıcı (geçmişte saklanır)
+            max_lines (int, optional): Sonuçtaki en fazla satır
+            max_bytes (int, optional): Sonucun en fazla bellek boyutu (bkz. memory_size)
+            removed (list, optional): Her düzenleme için sildiği satırların listesi eklenir
+        Returns: yeni sürüm
+        Raises:
+            IndexError: Aralık doküman dışında
+            DocumentLimitError: Sonuç sınırı aşıyor. Sınırlar sadece büyümeyi engeller;
+                sınırın üstündeki doküman yine küçültülebilir.
+        """
+        root = self._root
+        for start, end, new_lines in edits:
+            if not 0 <= start <= end <= _size(root):
+                raise IndexError("Satır aralığı doküman dışında")
+            replaced = [] if removed is not None else None
+            root = _replace_range(root, start, end, new_lines, replaced)
+            if removed is not None:
+                removed.append(replaced)
+        if max_lines is not None and _size(root) > max(max_lines, len(self)):
+            raise DocumentLimitError(f"Doküman en fazla {max_lines} satır olabilir.")
+        if max_bytes is not None and _nbytes(root) > max(max_bytes, self.memory_size):
+            raise DocumentLimitError(f"Düzenleme bellek kotasını aşıyor ({max(max_bytes, 0) // 1024} KB).")
+        self._root = root
+        self.history.append((author, edits))
+        self.version += 1
+        return self.version
+
+    def edits_since(self, version: int):
+        """
+        Verilen sürümden sonra uygulanan düzenlemeler, sırayla tek liste halinde.
+        Returns: list; sürüm geçmişin dışındaysa None
+        """
+        count = self.version - version
+        if count < 0 or count > len(self.history):
+            return None
+        return [edit for index in range(len(self.history) - count, len(self.history))
+                for edit in self.history[index][1]]
+
+    def records_since(self, version: int):
+        """
+        Verilen sürümden sonraki her sürümün kaydı (kopan client'ın kaçırdıkları).
+        Returns: (version, author, edits) listesi; sürüm geçmişin dışındaysa None
+        """
+        count = self.version - version
+        if count < 0 or count > len(self.history):
+            return None
+        records = []
+        for index in range(len(self.history) - count, len(self.history)):
+            version += 1
+            author, edits = self.history[index]
+            records.append((version, author or "", edits))
+        return records
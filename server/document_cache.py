@@ -0,0 +1,143 @@
+# server/document_cache.py
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+from server.document import Document
+from server.file_manager import SAVE_DIR
+from server.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# === Önbellek Ayarları ===
+MAX_RESIDENT_DOCUMENTS = 256  # Bellekte tutulacak en fazla doküman
+MAX_RESIDENT_BYTES = 256 * 1024 * 1024  # Bellekteki dokümanların toplam yaklaşık boyutu
+
+class DocumentCache:
+    """
+    handle_client ile disk arasındaki doküman katmanı.
+    Başlangıçta sadece dosya adları taranır; dokümanlar ilk ihtiyaçta yüklenir ve
+    bütçe aşıldığında abonesi olmayanlar (en uzun süre kullanılmayandan başlayarak)
+    kaydedilip bellekten çıkarılır.
+    """
+    def __init__(self, journal, is_subscribed, max_documents=MAX_RESIDENT_DOCUMENTS,
+                 max_bytes=MAX_RESIDENT_BYTES):
+        """
+        Args:
+            journal (Journal): Yükleme (kurtarma) ve kaydetme için işlem günlüğü
+            is_subscribed (callable): filename -> dokümanı görüntüleyen client var mı
+            max_documents (int): Bellekteki doküman sayısı sınırı
+            max_bytes (int): Bellekteki dokümanların toplam boyut sınırı
+        """
+        self.journal = journal
+        self.is_subscribed = is_subscribed
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.names = set()  # Bilinen tüm dokümanlar (diskte veya bellekte)
+        self.resident = OrderedDict()  # filename -> Document, en son kullanılan sonda
+        self._resident_bytes = 0  # Bellekteki dokümanların memory_size toplamı (bkz. resized)
+        self._loading = {}  # filename -> yükleme Future'ı (aynı doküman iki kez yüklenmesin)
+        self._eviction_task = None
+
+    def scan(self):
+        """saved_files/ ve günlük dizinindeki dosya adlarını okur (içerik okunmaz)"""
+        if os.path.isdir(SAVE_DIR):
+            for entry in os.scandir(SAVE_DIR):
+                # Nokta ile başlayanlar günlük dizini ve geçici dosyalardır
+                if entry.is_file() and not entry.name.startswith("."):
+                    self.names.add(entry.name)
+        self.names.update(self.journal.names())
+
+    def __contains__(self, filename):
+        return filename in self.names
+
+    def list_names(self):
+        return sorted(self.names)
+
+    def documents(self):
+        """Bellekteki dokümanlar: {filename: Document}"""
+        return self.resident
+
+    def peek(self, filename):
+        """Doküman bellekteyse döndürür, değilse None (yükleme yapmaz)"""
+        return self.resident.get(filename)
+
+    def create(self, filename):
+        """Yeni ve boş bir doküman oluşturur"""
+        document = Document(saved=False)
+        self.names.add(filename)
+        self.resident[filename] = document
+        self._resident_bytes += document.memory_size
+        self.maybe_evict()
+        return document
+
+    async def get(self, filename):
+        """
+        Dokümanı döndürür; bellekte değilse son anlık görüntü ve günlükten yükler.
+        Raises:
+            KeyError: Doküman yoksa
+        """
+        while True:
+            # Bellekteki doküman bekleme olmadan döndürülür; çağıran kod dokümanı
+            # kullanmadan önce araya çıkarma (eviction) giremez
+            document = self.resident.get(filename)
+            if document is not None:
+                self.resident.move_to_end(filename)
+                return document
+            if filename not in self.names:
+                raise KeyError(filename)
+
+            if filename not in self._loading:
+                self._loading[filename] = asyncio.ensure_future(self._load(filename))
+            await asyncio.shield(self._loading[filename])
+
+    async def _load(self, filename):
+        try:
+            document = await self.journal.recover_async(filename)
+            self.resident[filename] = document
+            self._resident_bytes += document.memory_size
+            logger.info("[ÖNBELLEK] %s yüklendi (%d satır)", filename, len(document))
+        finally:
+            del self._loading[filename]
+
+    def resident_bytes(self):
+        """Bellekteki dokümanların toplam boyutu (O(1))"""
+        return self._resident_bytes
+
+    def resized(self, delta):
+        """Bellekteki bir doküman düzenlendi: boyutu delta bayt değişti"""
+        self._resident_bytes += delta
+
+    def over_budget(self):
+        return len(self.resident) > self.max_documents or self.resident_bytes() > self.max_bytes
+
+    def maybe_evict(self):
+        """Bütçe aşıldıysa arka planda boşta kalan dokümanları çıkarır"""
+        if self.over_budget() and (self._eviction_task is None or self._eviction_task.done()):
+            self._eviction_task = asyncio.ensure_future(self.evict_idle())
+
+    async def evict_idle(self):
+        """Abonesi olmayan dokümanları LRU sırasıyla kaydedip bellekten çıkarır"""
+        for filename in list(self.resident):
+            if not self.over_budget():
+                break
+            document = self.resident.get(filename)
+            if document is None or self.is_subscribed(filename):
+                continue
+
+            if document.dirty:
+                snapshot = document.snapshot()
+                saved = await self.journal.checkpoint({filename: snapshot})
+                if filename not in saved:
+                    continue
+                document.mark_saved(snapshot.version)
+
+            # Kaydederken doküman değişmiş ya da yeniden açılmış olabilir
+            if document.dirty or self.is_subscribed(filename) or self.resident.get(filename) is not document:
+                continue
+            del self.resident[filename]
+            self._resident_bytes -= document.memory_size
+            metrics.forget(document=filename)
+            logger.info("[ÖNBELLEK] %s bellekten çıkarıldı", filename)
@@ -1,40 +1,111 @@
 # server/file_manager.py
 
+import asyncio
+import logging
 import os
-import threading
-import time
+import stat
+import tempfile
+
+from server.document import Document
+from server.metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 SAVE_INTERVAL = 10  # saniye
 SAVE_DIR = "saved_files"
 
-# filename -> list of lines
-documents = {}  # bu aslında server_main'deki files ile senkronize edilmeli
-lock = threading.Lock()
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# mkstemp dosyayı 0600 ile açar; yeni dosyalar open(path, "w") gibi umask'a göre izin alır.
+# umask içe aktarılırken okunur: os.umask süreç genelidir, kayıt thread'inde çağrılmamalı
+NEW_FILE_MODE = 0o666 & ~_umask()
 
 def ensure_save_dir():
-    if not os.path.exists(SAVE_DIR):
-        os.makedirs(SAVE_DIR)
+    # Çoklu süreç modunda birden fazla işçi aynı anda oluşturmaya çalışabilir
+    os.makedirs(SAVE_DIR, exist_ok=True)
 
-def save_file(filename, lines):
+def save_file(filename, document):
+    """
+    document: Document veya DocumentSnapshot
+    Önce geçici dosyaya yazar, sonra os.replace ile yerine koyar;
+    yazma yarıda kesilse bile diskte eski ya da yeni içerik eksiksiz kalır.
+    """
     ensure_save_dir()
     path = os.path.join(SAVE_DIR, filename)
-    # None değerleri boş string ile değiştir
-    lines = [line if line is not None else "" for line in lines]
-    with open(path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    fd, tmp_path = tempfile.mkstemp(dir=SAVE_DIR, prefix=f".{filename}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(document.text())
+            f.flush()
+            os.fsync(f.fileno())
+        # Var olan dosyanın izinleri korunur
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-def background_auto_save(get_all_documents_func):
+def read_file(filename):
     """
-    get_all_documents_func: callable that returns {filename: [lines]}
+    Kaydedilmiş dosyanın metnini döndürür; dosya yoksa None.
     """
-    while True:
-        time.sleep(SAVE_INTERVAL)
+    path = os.path.join(SAVE_DIR, filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def load_file(filename):
+    """
+    Kaydedilmiş dosyayı Document olarak yükler.
+    """
+    return Document.from_text(read_file(filename) or "")
+
+def save_snapshots(snapshots):
+    """
+    snapshots: {filename: DocumentSnapshot}
+    Kayıt thread'inde çalışır. Returns: başarıyla kaydedilen dosya adları
+    """
+    saved = []
+    for fname, snapshot in snapshots.items():
         try:
-            all_docs = get_all_documents_func()
-            with lock:
-                for fname, lines in all_docs.items():
-                    if lines is not None:  # None kontrolü ekle
-                        save_file(fname, lines)
-            print("[OTOMATİK KAYIT] Tüm dosyalar kaydedildi.")
+            save_file(fname, snapshot)
+            saved.append(fname)
         except Exception as e:
-            print(f"[KAYIT HATASI] {e}")
+            logger.error("[KAYIT HATASI] %s: %s", fname, e)
+    return saved
+
+async def background_auto_save(get_all_documents_func, journal=None):
+    """
+    get_all_documents_func: callable that returns {filename: Document}
+    journal: verilirse kayıt, işlem günlüğünü de sıkıştıran kontrol noktası olarak yapılır
+    Sadece değişmiş (dirty) dokümanları kaydeder; boşta diske hiç yazılmaz.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(SAVE_INTERVAL)
+        # Anlık görüntüler event loop üzerinde alınır, bu sırada dokümanlar değişemez.
+        # Görüntüler değişmez olduğu için yazma işlemi ayrı thread'de güvenle yapılabilir.
+        snapshots = {fname: document.snapshot()
+                     for fname, document in get_all_documents_func().items() if document.dirty}
+        if not snapshots:
+            continue
+
+        with metrics.timer("autosave_duration_ms"):
+            if journal is not None:
+                saved = await journal.checkpoint(snapshots)
+            else:
+                saved = await loop.run_in_executor(None, save_snapshots, snapshots)
+        metrics.inc("autosave_documents_total", len(saved))
+        documents = get_all_documents_func()
+        for fname in saved:
+            if fname in documents:
+                documents[fname].mark_saved(snapshots[fname].version)
+        logger.info("[OTOMATİK KAYIT] %d dosya kaydedildi.", len(saved))
@@ -0,0 +1,200 @@
+# server/history.py
+
+import json
+import logging
+import os
+import time
+import zlib
+
+from server.document import Document
+from server.file_manager import SAVE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Sürüm geçmişi: günlük (journal) her kontrol noktasında sıkıştırılırken silinen kayıtlar
+# burada saklanır. Doküman başına saved_files/.history/<dosya>/ dizininde:
+#   index.jsonl       -> satır başına bir bölüm kaydı (JSON)
+#     {"k": "s", "v": sürüm, "c": zincir, "o": konum, "l": uzunluk, "t": zaman, "n": satır sayısı}
+#     {"k": "d", "f": başlangıç sürümü, "v": bitiş sürümü, "c", "o", "l", "t", "a": yazarlar}
+#   <zincir>.bin      -> zlib ile sıkıştırılmış bölümler (ardışık)
+# Bir zincir tam bir anlık görüntüyle ("s") başlar, ardından kontrol noktası başına bir fark
+# ("d": o aralıkta uygulanan [sürüm, yazar, düzenlemeler] kayıtları) gelir. Herhangi bir sürüm,
+# önündeki en yakın anlık görüntüye en fazla HISTORY_SNAPSHOT_VERSIONS sürüm uygulanarak kurulur.
+
+# === Geçmiş Ayarları ===
+HISTORY_DIR = os.path.join(SAVE_DIR, ".history")
+HISTORY_SNAPSHOT_VERSIONS = 1000  # Zincir bu kadar sürüm uzayınca yeni anlık görüntü alınır
+HISTORY_SNAPSHOT_RATIO = 1.0  # Zincirin farkları anlık görüntüsünden büyürse de yeni anlık görüntü alınır
+HISTORY_MAX_BYTES = 16 * 1024 * 1024  # Doküman başına geçmiş sınırı; aşılınca en eski zincir silinir
+HISTORY_COMPRESSION_LEVEL = 6
+
+def _read_index(path):
+    """Bölüm kayıtlarını okur; yarım yazılmış son satır (çökme) yok sayılır"""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                logger.warning("[UYARI] Geçmiş dizininde yarım kayıt atlandı: %s", path)
+                break
+            entries.append(json.loads(raw.decode("utf-8")))
+    return entries
+
+class HistoryStore:
+    """
+    Dokümanların sürüm geçmişi. Sadece günlük thread'inden kullanılır (bkz. server/journal.py),
+    bu yüzden kilit gerekmez.
+    """
+    def __init__(self, directory=HISTORY_DIR, max_bytes=HISTORY_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._indexes = {}  # filename -> bölüm kayıtları; ilk kullanımda diskten okunur
+
+    def _path(self, filename, name):
+        return os.path.join(self.directory, filename, name)
+
+    def index(self, filename):
+        index = self._indexes.get(filename)
+        if index is None:
+            index = self._indexes[filename] = _read_index(self._path(filename, "index.jsonl"))
+        return index
+
+    def _write(self, filename, entry, payload):
+        """Bölümü zincir dosyasının sonuna, kaydını index'e yazar (ikisi de fsync)"""
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), HISTORY_COMPRESSION_LEVEL)
+        os.makedirs(os.path.join(self.directory, filename), exist_ok=True)
+        path = self._path(filename, f"{entry['c']}.bin")
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        entry.update(o=offset, l=len(data), t=int(time.time()))
+        with open(self._path(filename, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.index(filename).append(entry)
+
+    def _read(self, filename, entry):
+        with open(self._path(filename, f"{entry['c']}.bin"), "rb") as f:
+            f.seek(entry["o"])
+            return json.loads(zlib.decompress(f.read(entry["l"])).decode("utf-8"))
+
+    def _write_snapshot(self, filename, version, lines):
+        self._write(filename, {"k": "s", "v": version, "c": version, "n": len(lines)}, lines)
+
+    def _chain_full(self, filename):
+        """Son zincir yeni bir anlık görüntüyü gerektirecek kadar uzadı mı"""
+        index = self.index(filename)
+        deltas = 0
+        for entry in reversed(index):
+            if entry["k"] == "s":
+                return (index[-1]["v"] - entry["v"] >= HISTORY_SNAPSHOT_VERSIONS
+                        or deltas > entry["l"] * HISTORY_SNAPSHOT_RATIO)
+            deltas += entry["l"]
+        return True
+
+    def append(self, filename, records, snapshot, base=None):
+        """
+        Kontrol noktasında, günlükten silinecek kayıtları geçmişe ekler.
+        Args:
+            filename (str): Doküman adı
+            records (list): [(sürüm, yazar, düzenlemeler)] - sürüm sırasıyla, snapshot.version'a kadar
+            snapshot (DocumentSnapshot): Kontrol noktasındaki içerik
+            base (callable, optional): Geçmiş boşken kayıtların uygulandığı (sürüm, satırlar)'ı döndürür
+        """
+        index = self.index(filename)
+        last = index[-1]["v"] if index else None
+        if last is None and base is not None:
+            start = base()
+            if start is not None and start[0] < snapshot.version:
+                self._write_snapshot(filename, *start)
+                last = start[0]
+        records = [record for record in records if last is not None and record[0] > last]
+        if records and records[0][0] == last + 1 and records[-1][0] == snapshot.version:
+            authors = sorted({author for _, author, _ in records if author})
+            self._write(filename, {"k": "d", "f": last, "v": snapshot.version, "c": self._chain(filename), "a": authors},
+                        [[version, author, edits] for version, author, edits in records])
+            if self._chain_full(filename):
+                self._write_snapshot(filename, snapshot.version, snapshot.lines())
+        elif last != snapshot.version:
+            # Geçmişte boşluk var ya da geçmiş yeni başlıyor: aradaki sürümler kurulamaz
+            self._write_snapshot(filename, snapshot.version, snapshot.lines())
+        self._prune(filename)
+
+    def _chain(self, filename):
+        return self.index(filename)[-1]["c"]
+
+    def _prune(self, filename):
+        """Geçmiş HISTORY_MAX_BYTES'ı aşarsa en eski zincirler silinir (son zincir her zaman kalır)"""
+        index = self.index(filename)
+        total = sum(entry["l"] for entry in index)
+        dropped = []
+        while total > self.max_bytes:
+            chain = index[0]["c"]
+            if chain == index[-1]["c"]:
+                break
+            dropped.append(chain)
+            total -= sum(entry["l"] for entry in index if entry["c"] == chain)
+            index = [entry for entry in index if entry["c"] != chain]
+        if not dropped:
+            return
+        path = self._path(filename, "index.jsonl")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in index)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._indexes[filename] = index
+        for chain in dropped:
+            os.remove(self._path(filename, f"{chain}.bin"))
+        logger.info("[BİLGİ] %s geçmişinden %d eski zincir silindi", filename, len(dropped))
+
+    def versions(self, filename):
+        """
+        Geri dönülebilecek kontrol noktaları: [[sürüm, zaman, yazarlar]]. Aradaki her sürüm de
+        okunabilir; en eski okunabilir sürüm ilk kaydınkidir.
+        """
+        versions = []
+        for entry in self.index(filename):
+            if versions and versions[-1][0] == entry["v"]:
+                continue  # Zinciri kapatan farkla aynı sürümde alınan anlık görüntü
+            versions.append([entry["v"], entry["t"], entry.get("a", [])])
+        return versions
+
+    def read(self, filename, version, tail=(), base=None):
+        """
+        Dokümanın verilen sürümdeki satırlarını kurar: en yakın önceki anlık görüntü yüklenir,
+        zincirdeki farklar ve ardından tail kayıtları (günlükte duran, henüz geçmişe
+        eklenmemiş [sürüm, yazar, düzenlemeler]) sırayla uygulanır.
+        Args:
+            base (callable, optional): Geçmiş bu sürümü kapsamıyorsa başlangıç (sürüm, satırlar)
+        Returns: satırlar ya da sürüm saklanmıyorsa None
+        """
+        index = self.index(filename)
+        start = None
+        for position, entry in enumerate(index):
+            if entry["k"] == "s" and entry["v"] <= version:
+                start = position
+        if start is not None:
+            entry = index[start]
+            document = Document(self._read(filename, entry), entry["v"])
+            chain = [entry for entry in index[start + 1:] if entry["k"] == "d" and entry["c"] == index[start]["c"]]
+            records = [record for entry in chain for record in self._read(filename, entry)]
+        else:
+            initial = base() if base is not None else None
+            if initial is None:
+                return None
+            document = Document(initial[1], initial[0])
+            records = []
+
+        for record_version, _, edits in list(records) + list(tail):
+            if record_version > version:
+                break
+            if record_version != document.version + 1:
+                continue  # Anlık görüntüde zaten var
+            document.apply_edits(edits)
+            document.version = record_version
+        return document.snapshot().lines() if document.version == version else None
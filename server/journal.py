@@ -0,0 +1,257 @@
+# server/journal.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from server.document import Document
+from server.file_manager import SAVE_DIR, read_file, save_file
+from server.history import HistoryStore
+from server.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.path.join(SAVE_DIR, ".journal")
+JOURNAL_FLUSH_INTERVAL = 0.005  # saniye; bu sürede gelen kayıtlar tek fsync ile yazılır
+
+# Günlük (journal) dosyası satır başına bir JSON kaydıdır:
+#   {"v": sürüm, "e": [[start, end, lines], ...], "a": yazar}  -> uygulanan düzenleme ("a" isteğe bağlı)
+#   {"c": sürüm, "d": özet, "n": satır sayısı}       -> anlık görüntü kontrol noktası
+# Kontrol noktası, saved_files/ altındaki anlık görüntünün hangi sürüme ait olduğunu
+# içeriğin SHA-1 özetiyle eşleştirir. Böylece sıkıştırma (compaction) yarıda kesilse bile
+# kurtarma sırasında hangi kayıtların zaten anlık görüntüde olduğu bilinir.
+# Sıkıştırmada silinen kayıtlar önce sürüm geçmişine eklenir (bkz. server/history.py).
+
+def content_digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _read_records(path, repair=False):
+    """
+    Günlük kayıtlarını okur. Yarım yazılmış son satır (çökme) yok sayılır;
+    repair=True ise dosya son geçerli kayda kadar kesilir ki yeni kayıtlar bozulmasın.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = 0
+    for raw in data.splitlines(keepends=True):
+        try:
+            if not raw.endswith(b"\n"):
+                raise ValueError("satır sonu yok")
+            records.append(json.loads(raw.decode("utf-8")))
+        except ValueError:
+            logger.warning("[UYARI] Günlükte yarım kayıt atlandı: %s", path)
+            if repair:
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+            break
+        offset += len(raw)
+    return records
+
+def _edit_records(records, until=None):
+    """Günlük kayıtlarındaki düzenlemeler: [(sürüm, yazar, düzenlemeler)]"""
+    return [(record["v"], record.get("a", ""), record["e"]) for record in records
+            if "v" in record and (until is None or record["v"] <= until)]
+
+def _encode(record):
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+class Journal:
+    """
+    Doküman başına yalnızca-ekleme (append-only) işlem günlüğü.
+    Kayıtlar bellekte toplanır ve JOURNAL_FLUSH_INTERVAL içinde gelenler dosya başına
+    tek fsync ile yazılır (group commit). Tüm dosya G/Ç'si tek thread'de sıralanır.
+    """
+    def __init__(self, directory=JOURNAL_DIR, flush_interval=JOURNAL_FLUSH_INTERVAL, history=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.history = history if history is not None else HistoryStore()
+        self.pending = {}  # filename -> yazılmayı bekleyen kayıt satırları
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename + ".log")
+
+    def append(self, filename, version, edits, author=None):
+        """Uygulanan düzenlemeyi günlüğe ekler (beklemez)"""
+        record = {"v": version, "e": [[start, end, list(lines)] for start, end, lines in edits]}
+        if author is not None:
+            record["a"] = author  # Yeniden yüklenen dokümanın geçmişinde yazar bilinsin
+        self.pending.setdefault(filename, []).append(_encode(record))
+        self._wakeup.set()
+
+    def _write_batch(self, batch):
+        os.makedirs(self.directory, exist_ok=True)
+        for filename, lines in batch.items():
+            with open(self.path(filename), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def run(self):
+        """Bekleyen kayıtları gruplar halinde diske yazan arka plan görevi"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await self._wakeup.wait()
+                await asyncio.sleep(self.flush_interval)
+                self._wakeup.clear()
+                batch, self.pending = self.pending, {}
+                try:
+                    with metrics.timer("journal_flush_duration_ms"):
+                        await loop.run_in_executor(self._executor, self._write_batch, batch)
+                except Exception as e:
+                    logger.error("[GÜNLÜK HATASI] %s", e)
+        finally:
+            # Kapanırken bekleyen kayıtları kaybetme
+            if self.pending:
+                batch, self.pending = self.pending, {}
+                self._write_batch(batch)
+
+    def _checkpoint(self, filename, snapshot):
+        """
+        Anlık görüntüyü kaydeder ve günlüğü sıkıştırır:
+        1. Kontrol noktası kaydı eklenir (fsync)
+        2. Bu kontrol noktasına kadarki kayıtlar sürüm geçmişine eklenir
+        3. Anlık görüntü atomik olarak saved_files/ altına yazılır
+        4. Günlük, kontrol noktası + sonraki kayıtlar olacak şekilde yeniden yazılır
+        Herhangi bir adımda çökülürse kurtarma eşleşen kontrol noktasını bulur; geçmiş bir
+        sonraki kontrol noktasında kaldığı sürümden devam eder.
+        """
+        text = snapshot.text()
+        checkpoint = {"c": snapshot.version, "d": content_digest(text), "n": len(snapshot)}
+        path = self.path(filename)
+        records = _read_records(path)
+        self._write_batch({filename: [_encode(checkpoint)]})
+        try:
+            self.history.append(filename, _edit_records(records, snapshot.version), snapshot,
+                                base=lambda: self._base(filename, records))
+        except Exception as e:
+            # Geçmiş yazılamasa da kayıt ve sıkıştırma yapılır
+            logger.error("[GEÇMİŞ HATASI] %s: %s", filename, e)
+        save_file(filename, snapshot)
+
+        kept = [record for record in _read_records(path) if record.get("v", -1) > snapshot.version]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(_encode(checkpoint))
+            f.writelines(_encode(record) for record in kept)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _base(self, filename, records):
+        """
+        Günlükteki kayıtların uygulandığı anlık görüntü (saved_files/ altındaki, henüz üzerine
+        yazılmamış dosya). Returns: (sürüm, satırlar) ya da günlükle eşleşmiyorsa None
+        """
+        text = read_file(filename) or ""
+        checkpoints = [record for record in records if "c" in record]
+        if not checkpoints:
+            return 0, text.split("\n") if text else []
+        matching = [record for record in checkpoints if record["d"] == content_digest(text)]
+        if not matching:
+            return None
+        if matching[-1].get("n") == 1 and not text:
+            return matching[-1]["c"], [""]
+        return matching[-1]["c"], text.split("\n") if text else []
+
+    def _checkpoint_all(self, snapshots, batch=None):
+        if batch:
+            # Grup yazmasını bekleyen kayıtlar: sıkıştırmadan ve geçmişe eklenmeden önce diske
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error("[GÜNLÜK HATASI] %s", e)
+        saved = []
+        for fname, snapshot in snapshots.items():
+            try:
+                self._checkpoint(fname, snapshot)
+                saved.append(fname)
+            except Exception as e:
+                logger.error("[KAYIT HATASI] %s: %s", fname, e)
+        return saved
+
+    async def checkpoint(self, snapshots):
+        """
+        snapshots: {filename: DocumentSnapshot}
+        Returns: başarıyla kaydedilen dosya adları
+        """
+        # Anlık görüntüdeki sürümlerin kayıtları henüz self.pending'de olabilir; aynı çağrıda
+        # önce yazılırlar, yoksa geçmişte o sürümler eksik kalır
+        batch = {filename: self.pending.pop(filename) for filename in snapshots if filename in self.pending}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._checkpoint_all, snapshots, batch)
+
+    def recover(self, filename):
+        """
+        Son anlık görüntüyü yükler ve üzerine günlükteki sonraki kayıtları uygular.
+        Returns: Document
+        """
+        text = read_file(filename) or ""
+        records = _read_records(self.path(filename), repair=True)
+        digest = content_digest(text)
+
+        checkpoints = [record for record in records if "c" in record]
+        matching = [record for record in checkpoints if record["d"] == digest]
+        if matching:
+            base = matching[-1]["c"]
+        elif not checkpoints:
+            # Günlük kontrol noktasından önce başlamış: kayıtlar anlık görüntünün üzerine yazılmış
+            base = 0
+        else:
+            logger.warning("[UYARI] %s anlık görüntüsü günlükle eşleşmiyor, günlük yok sayıldı", filename)
+            return Document.from_text(text)
+
+        document = Document.from_text(text, version=base)
+        if matching and matching[-1].get("n") == 1 and not text:
+            # Tek boş satırlı doküman ile boş doküman aynı metne yazılır
+            document = Document([""], version=base)
+        for record in records:
+            if "v" in record and record["v"] > document.version:
+                try:
+                    document.apply_edits(record["e"], record.get("a"))
+                except IndexError:
+                    logger.warning("[UYARI] %s günlüğü %d. sürümde tutarsız, kurtarma burada durdu", filename, record["v"])
+                    break
+                document.version = record["v"]
+        document.saved_version = base
+        return document
+
+    async def read_version(self, filename, version):
+        """
+        Dokümanın geçmiş bir sürümünün satırları (bkz. HistoryStore.read). Son kontrol
+        noktasından sonraki sürümler günlük kayıtlarından kurulur; diske henüz yazılmamış
+        kayıtlar da dahildir. Returns: satırlar ya da sürüm artık saklanmıyorsa None
+        """
+        pending = [json.loads(line) for line in self.pending.get(filename, ())]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._read_version, filename, version, pending)
+
+    def _read_version(self, filename, version, pending):
+        records = _read_records(self.path(filename)) + pending
+        return self.history.read(filename, version, _edit_records(records),
+                                 base=lambda: self._base(filename, records))
+
+    async def versions(self, filename):
+        """Dokümanın geçmişteki kontrol noktaları (bkz. HistoryStore.versions)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.history.versions, filename)
+
+    async def recover_async(self, filename):
+        """recover'ı günlük thread'inde çalıştırır; bekleyen yazmalarla sıralı kalır"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.recover, filename)
+
+    def names(self):
+        """Günlüğü olan doküman adları"""
+        if not os.path.isdir(self.directory):
+            return []
+        return [entry[:-len(".log")] for entry in os.listdir(self.directory) if entry.endswith(".log")]
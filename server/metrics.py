@@ -0,0 +1,147 @@
+# server/metrics.py
+
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# === Ölçüm Ayarları ===
+# Histogram kova sınırları (milisaniye): 0.01 ms'den ~80 sn'ye, her kova öncekinin 1.25 katı
+BUCKET_BOUNDS = tuple(0.01 * 1.25 ** i for i in range(72))
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS_HOST = "127.0.0.1"  # HTTP uç noktası sadece yerel erişime açık
+
+class Histogram:
+    """Sabit kovalı süre histogramı; kayıt O(log k), bellek sabit"""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """q (0-1) yüzdeliği; değerin düştüğü kovanın üst sınırı"""
+        if not self.count:
+            return 0.0
+        threshold = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class Metrics:
+    """
+    Sunucu ölçümleri: sayaçlar, süre histogramları ve okunduğu anda hesaplanan göstergeler.
+    Hepsi event loop üzerinde güncellenir, kilit gerekmez.
+    Metin çıktısı Prometheus metin biçimindedir (özet/summary için quantile etiketleri).
+    """
+    def __init__(self):
+        self.counters = {}  # (ad, etiketler) -> değer
+        self.histograms = {}  # (ad, etiketler) -> Histogram
+        self.gauges = {}  # ad -> değeri döndüren fonksiyon (değer veya {etiketler: değer})
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def forget(self, **labels):
+        """
+        Verilen etiketleri taşıyan sayaç ve histogramları siler.
+        Bellekten çıkan dokümanların serileri böylece birikmez.
+        """
+        wanted = set(labels.items())
+        for series in (self.counters, self.histograms):
+            for key in [key for key in series if wanted.issubset(key[1])]:
+                del series[key]
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Bloğun süresini milisaniye olarak histograma ekler"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000.0, **labels)
+
+    def gauge(self, name, func):
+        """
+        Okunduğu anda hesaplanan gösterge kaydeder.
+        func: sayı ya da {((etiket, değer), ...): sayı} döndürür
+        """
+        self.gauges[name] = func
+
+    def render(self):
+        """Tüm ölçümleri Prometheus metin biçiminde döndürür"""
+        lines = [f"uptime_seconds {time.time() - self.started:.0f}"]
+        for name, func in sorted(self.gauges.items()):
+            value = func()
+            if isinstance(value, dict):
+                for labels, item in sorted(value.items()):
+                    lines.append(f"{name}{_labels(labels)} {item}")
+            else:
+                lines.append(f"{name} {value}")
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f"{name}{_labels(labels + (('quantile', q),))} {histogram.quantile(q):.3f}")
+            lines.append(f"{name}_max{_labels(labels)} {histogram.max:.3f}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.total:.3f}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+# Prometheus metin biçiminde etiket değerindeki \\, " ve satır sonu kaçırılır
+_LABEL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{str(value).translate(_LABEL_ESCAPES)}"' for key, value in labels) + "}"
+
+metrics = Metrics()
+
+async def _handle_http(reader, writer):
+    """Her isteğe (yol fark etmeksizin) ölçümlerin metin çıktısıyla yanıt verir"""
+    try:
+        # İstek satırı ve başlıklar okunur ama kullanılmaz
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        body = metrics.render().encode("utf-8")
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                     b"Connection: close\r\n\r\n" + body)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(port, host=METRICS_HOST):
+    """Ölçümleri http://host:port/ adresinden düz metin olarak sunar"""
+    server = await asyncio.start_server(_handle_http, host, port)
+    logger.info("[BAŞLATILIYOR] Ölçümler http://%s:%d/ adresinde", host, port)
+    return server
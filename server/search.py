@@ -0,0 +1,155 @@
+# server/search.py
+
+import asyncio
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Tam metin arama: kelime -> {dosya: kelimeyi içeren satır sayısı} ters indeksi.
+# İndeks doküman düzeyindedir; aramada sadece tüm kelimeleri içeren dokümanların satırları
+# taranır ve eşleşen satırın numarası ile kısa bir kesiti döndürülür. Her düzenlemede
+# silinen satırların kelimeleri düşülür, eklenenlerinki eklenir. Başlangıçta indeks
+# arka planda saved_files/ (anlık görüntü + günlük) üzerinden kurulur.
+
+# === Arama Ayarları ===
+SEARCH_MAX_RESULTS = 100  # Bir aramanın döndüreceği en fazla satır
+SEARCH_SNIPPET_CHARS = 80  # Eşleşen satırdan gönderilecek kesitin uzunluğu
+SEARCH_MAX_TERMS = 16  # Sorgudaki en fazla kelime
+
+_TOKEN = re.compile(r"\w+")
+# "İ".lower() noktalı iki karakter olur; I/İ/ı hepsi i sayılır ("IŞIK", "ışık" ve "isik" eşleşir)
+_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+def fold(text):
+    """Aramada büyük/küçük harf ve i/ı farkı gözetilmez"""
+    return text.translate(_FOLD).lower()
+
+def tokenize(text):
+    """Metindeki kelimeler (fold edilmiş, sırayla, tekrarlarıyla)"""
+    return _TOKEN.findall(fold(text))
+
+def snippet(line, term, width=SEARCH_SNIPPET_CHARS):
+    """Satırın, kelimenin ilk geçtiği yer etrafındaki en fazla width karakterlik kesiti"""
+    if len(line) <= width:
+        return line
+    position = max(fold(line).find(term), 0)
+    start = min(max(position - width // 4, 0), len(line) - width)
+    text = line[start:start + width]
+    return ("…" if start > 0 else "") + text + ("…" if start + width < len(line) else "")
+
+class SearchIndex:
+    """
+    Dokümanların ters indeksi. Sadece event loop üzerinden kullanılır.
+    Henüz indekslenmemiş dokümanların düzenlemeleri yok sayılır; doküman kurulum sırasında
+    o anki haliyle okunur.
+    """
+    def __init__(self):
+        self.postings = {}  # kelime -> {filename: kelimeyi içeren satır sayısı}
+        self.indexed = set()  # İndekslenmiş dokümanlar
+        self.ready = None  # Başlangıç kurulumunun görevi (bkz. start)
+
+    def _add_lines(self, filename, lines, delta):
+        postings = self.postings
+        for line in lines:
+            for term in set(tokenize(line)):
+                counts = postings.get(term)
+                if counts is None:
+                    counts = postings[term] = {}
+                count = counts.get(filename, 0) + delta
+                if count > 0:
+                    counts[filename] = count
+                else:
+                    counts.pop(filename, None)
+                    if not counts:
+                        del postings[term]
+
+    def add_document(self, filename, lines):
+        """Dokümanı (yeniden) indeksler"""
+        if filename in self.indexed:
+            self.remove_document(filename)
+        self._add_lines(filename, lines, 1)
+        self.indexed.add(filename)
+
+    def remove_document(self, filename):
+        for term in [term for term, counts in self.postings.items() if filename in counts]:
+            counts = self.postings[term]
+            del counts[filename]
+            if not counts:
+                del self.postings[term]
+        self.indexed.discard(filename)
+
+    def update(self, filename, removed, edits):
+        """
+        Uygulanan düzenlemeleri indekse yansıtır.
+        Args:
+            removed (list): Her düzenlemenin sildiği satırlar (bkz. Document.apply_edits)
+            edits (list): Uygulanan (start, end, lines) düzenlemeleri
+        """
+        if filename not in self.indexed:
+            return
+        for removed, (_, _, new_lines) in zip(removed, edits):
+            self._add_lines(filename, removed, -1)
+            self._add_lines(filename, (line if line is not None else "" for line in new_lines), 1)
+
+    def candidates(self, terms):
+        """Tüm kelimeleri içeren dokümanlar, ada göre sıralı"""
+        sets = []
+        for term in set(terms):
+            counts = self.postings.get(term)
+            if not counts:
+                return []
+            sets.append(counts.keys())
+        sets.sort(key=len)
+        result = set(sets[0])
+        for keys in sets[1:]:
+            result.intersection_update(keys)
+        return sorted(result)
+
+    def start(self, names, resident, load):
+        """
+        Verilen dokümanları arka planda indeksler; aramalar bitmesini bekler.
+        Args:
+            names (iterable): İndekslenecek dosya adları
+            resident (callable): filename -> bellekteki Document ya da None
+            load (callable): filename -> Document döndüren coroutine (diskten, önbelleğe almadan)
+        """
+        self.ready = asyncio.create_task(self._build(sorted(names), resident, load))
+        return self.ready
+
+    async def _build(self, names, resident, load):
+        count = 0
+        for filename in names:
+            if filename in self.indexed:
+                continue  # Kurulum sırasında oluşturuldu
+            document = resident(filename)
+            if document is None:
+                try:
+                    document = await load(filename)
+                except Exception as e:
+                    logger.error("[HATA] %s arama için okunamadı: %s", filename, e)
+                    continue
+                # Beklerken önbelleğe yüklenip düzenlenmiş olabilir: güncel hali oradadır
+                document = resident(filename) or document
+            if filename not in self.indexed:
+                self.add_document(filename, document.snapshot().iter_lines())
+                count += 1
+            await asyncio.sleep(0)  # Büyük kurulum diğer işleri bekletmesin
+        logger.info("[BİLGİ] Arama indeksi kuruldu: %d doküman, %d kelime", count, len(self.postings))
+
+    def search(self, filename, snapshot, terms, limit):
+        """
+        Dokümanda tüm kelimeleri içeren satırlar.
+        Returns: [[filename, satır numarası (1'den), kesit]] en fazla limit tane
+        """
+        wanted = set(terms)
+        first = terms[0]
+        matches = []
+        for number, line in enumerate(snapshot.iter_lines(), 1):
+            if first not in fold(line):
+                continue  # Ucuz ön eleme
+            if wanted.issubset(tokenize(line)):
+                matches.append([filename, number, snippet(line, first)])
+                if len(matches) >= limit:
+                    break
+        return matches
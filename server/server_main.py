@@ -1,164 +1,1003 @@
 # server/server_main.py
 
+import argparse
 import asyncio
-import websockets
 import json
+import logging
+import multiprocessing
+import shutil
+import signal
+import tempfile
+import time
+import websockets
+from websockets.exceptions import ConnectionClosed
 import sys
 import os
-import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from shared.messages import parse_message, create_message, LOGIN, USER_LIST, FILE_LIST, FILE_CREATE, FILE_JOIN, FILE_UPDATE, FILE_SYNC, QUIT, ERROR
+from shared.messages import decode_edits, encode_edits, encode_patch_batch, LOGIN, USER_LIST, FILE_LIST, FILE_CREATE, FILE_JOIN, FILE_UPDATE, FILE_SYNC, FILE_RESYNC, FILE_LEAVE, FILE_PATCH, FILE_BATCH, QUIT, ERROR, STATS, SESSION, RESUME, FILE_CHUNK, FILE_COMMIT, USER_JOINED, USER_LEFT, PRESENCE, CURSOR, HISTORY, FILE_AT_VERSION, SEARCH, encode_presence, decode_cursor
+from shared.codec import Message, FrameDecoder, get_codec
+from server.dispatch import (COMMAND_HANDLERS, command, dispatch, error_message, CommandError, STOP,
+                             filename_arg, username_arg, text_arg, line_number_arg, version_arg)
+from shared.ot import transform
 from server.file_manager import background_auto_save
+from server.document import DocumentLimitError
+from server.journal import Journal
+from server.document_cache import DocumentCache
+from server.connection import ClientConnection, ForwardedConnection, POLICY_RESYNC
+from server.cluster import Cluster, unpack_message
+from server.session import SessionStore
+from server.search import SearchIndex, tokenize, SEARCH_MAX_RESULTS, SEARCH_MAX_TERMS
+from server.metrics import metrics, start_metrics_server
+
+logger = logging.getLogger(__name__)
 
 # === Sunucu Ayarları ===
 HOST = '127.0.0.1'
 PORT = 5000
 
+# Giden kuyruk ayarları (bkz. server/connection.py)
+OUTBOX_SIZE = 1024  # Bağlantı başına bekleyebilecek en fazla mesaj
+OVERFLOW_POLICY = POLICY_RESYNC  # Geride kalan client için: POLICY_RESYNC veya POLICY_DISCONNECT
+
+# permessage-deflate: büyük FILE_SYNC mesajlarını küçültür, küçük düzenlemelerde CPU harcar.
+# Kapatmak için None yapın.
+WEBSOCKET_COMPRESSION = "deflate"
+
+# Yayın birleştirme: bir dokümana BROADCAST_TICK içinde uygulanan düzenlemeler her aboneye
+# tek mesajla (FILE_BATCH) gönderilir. Böylece giden mesaj sayısı tuş vuruşuyla değil tik
+# sıklığıyla sınırlanır. 0 yapılırsa her düzenleme hemen ayrı FILE_PATCH olarak yayınlanır.
+BROADCAST_TICK = 0.02  # saniye
+BROADCAST_MAX_PENDING = 64  # Bu kadar düzenleme birikirse tik beklenmeden yayınlanır
+
+# Oturum devam ettirme (bkz. server/session.py): QUIT olmadan kopan client'ın kullanıcı adı
+# bu süre boyunca ayrılmış kalır; RESUME ile dönerse sadece kaçırdığı düzenlemeleri alır.
+SESSION_GRACE_PERIOD = 30  # saniye
+
+# Parçalı gönderim: katılımda SYNC_CHUNK_BYTES'tan büyük dokümanlar tek FILE_SYNC yerine
+# satır sınırlarında bölünmüş FILE_CHUNK mesajları ve sonda FILE_COMMIT ile gönderilir.
+# İlk parça küçük tutulur ki client ilk ekranı hemen gösterebilsin.
+SYNC_CHUNK_BYTES = 64 * 1024  # karakter
+SYNC_FIRST_CHUNK_BYTES = 8 * 1024  # karakter
+
+# Kullanıcı durumu (presence): giriş/çıkışta herkese tam USER_LIST yerine USER_JOINED/USER_LEFT
+# gönderilir (tam liste sadece yeni bağlanana). Bir dokümanı kimlerin görüntülediği ve imleçleri
+# PRESENCE_TICK boyunca toplanır, odaya tik başına tek PRESENCE mesajıyla yayınlanır.
+PRESENCE_TICK = 0.1  # saniye
+
+# Bellek kotaları (bkz. Document.memory_size): sınırı aşacak düzenleme uygulanmaz, client'a
+# ERROR döner. Toplam kota bellekteki tüm dokümanlar içindir (çoklu süreç modunda işçi başına).
+# Çıkarılabilen (abonesi olmayan) dokümanlar önbellek bütçesiyle zaten boşaltılır
+# (bkz. server/document_cache.py); bu kota açık dokümanların büyümesini sınırlar.
+MAX_DOCUMENT_LINES = 1_000_000  # Doküman başına en fazla satır (FILE_UPDATE satır numarası dahil)
+MAX_DOCUMENT_BYTES = 64 * 1024 * 1024  # Doküman başına bellek kotası
+MAX_TOTAL_DOCUMENT_BYTES = 1024 * 1024 * 1024  # Bellekteki tüm dokümanların kotası
+# Websocket mesaj sınırı (max_size): doküman boyutunda bir FILE_PATCH sığsın diye kotanın 4 katı.
+# JSON'da ASCII olmayan karakter \uXXXX kaçışıyla 6-7 bayt, bellekte 2 bayttır. Aşan mesaj
+# bağlantıyı 1009 koduyla kapatır. Clientların MAX_MESSAGE_BYTES'ı bununla aynı tutulmalı.
+MAX_MESSAGE_BYTES = 4 * MAX_DOCUMENT_BYTES
+
+# Ölçüm ve log ayarları (bkz. server/metrics.py)
+LOG_LEVEL = "INFO"  # DEBUG her düzenlemeyi loglar; yoğun yükte yavaşlatır
+METRICS_PORT = None  # Örn. 9100: ölçümler http://127.0.0.1:9100/ adresinde. STATS komutu her zaman açık.
+
+# Çoklu süreç modu (bkz. server/cluster.py): 1'den büyükse dokümanlar bu kadar işçi sürece
+# bölünür. İşçiler aynı portu SO_REUSEPORT ile paylaştığı için sadece Linux'ta çalışır.
+WORKERS = 1
+WORKER_SHUTDOWN_TIMEOUT = 15  # Kapanırken işçilerin bağlantıları kapatıp günlükleri yazması için süre (saniye)
+
+# Dokümanın sahibi başka işçideyse oraya iletilen komutlar; doğrulama sahibinde yapılır.
+# FILE_JOIN yerel odaya da katıldığı için kendi işleyicisinde iletilir.
+ROUTED_COMMANDS = {FILE_CREATE, FILE_UPDATE, FILE_PATCH, FILE_RESYNC, HISTORY, FILE_AT_VERSION}
+
 # Global state
-clients = {}  # websocket -> username
+connections = set()  # Tüm açık bağlantılar (giriş yapmamış olanlar dahil)
+clients = {}  # websocket -> ClientConnection (sadece giriş yapmış clientlar)
 usernames = set()
-files = {}  # filename -> list of lines
+journal = Journal()  # Uygulanan her düzenleme buraya da yazılır (bkz. server/journal.py)
+subscribers = {}  # filename -> dosyayı görüntüleyen ClientConnection kümesi
+pending_patches = {}  # filename -> henüz yayınlanmamış (version, author, edits) kayıtları
+presence = {}  # filename -> {username: imleç ya da None}; tüm işçilerdeki görüntüleyenler (sahibi olduğumuz dokümanlar)
+pending_presence = {}  # filename -> henüz yayınlanmamış (güncellenen kullanıcılar, ayrılanlar)
+cluster = None  # Çoklu süreç modunda bu işçinin Cluster nesnesi
+files = DocumentCache(journal, lambda filename: filename in subscribers or
+                      (cluster is not None and filename in cluster.room_peers))  # filename -> Document
+search_index = SearchIndex()  # Sahibi olduğumuz dokümanların tam metin indeksi (bkz. server/search.py)
+sessions = SessionStore(lambda session: expire_session(session), SESSION_GRACE_PERIOD)  # Açık ve askıdaki oturumlar
+
+def owns(name):
+    """Doküman ya da kullanıcı adı bu süreçte mi yönetiliyor (tek süreçte her zaman)"""
+    return cluster is None or cluster.is_local(name)
+
+def announce(kind, name):
+    """Kullanıcı/dosya listesi değişikliğini diğer işçilere bildirir"""
+    if cluster is not None:
+        cluster.post_all({"t": kind, "name": name})
 
-async def broadcast_all(message, exclude_ws=None):
+def create_sync_message(filename, document):
+    """
+    Dosyanın tam içeriğini ve sürümünü taşıyan tek FILE_SYNC mesajını oluşturur.
+    Başka mesajlarla sırası korunması gereken durumlarda (RESUME, kuyruk taşması, çok eski
+    patch) kullanılır; katılım ve FILE_RESYNC büyük dokümanları parçalı gönderir.
+    """
+    # Bekleyen düzenlemeler önce yayınlanır: odadaki hiçbir client FILE_SYNC'ten sonra
+    # bu sürümden eski bir düzenleme almaz
+    flush_patches(filename)
+    return Message(FILE_SYNC, filename, str(document.version), body=document.text())
+
+def _iter_chunk_messages(filename, snapshot):
+    """Anlık görüntüyü satır sınırlarında FILE_CHUNK mesajlarına böler; sonda FILE_COMMIT"""
+    version = str(snapshot.version)
+    start, chunk, size, limit = 0, [], 0, SYNC_FIRST_CHUNK_BYTES
+    for line in snapshot.iter_lines():
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= limit:
+            yield Message(FILE_CHUNK, filename, version, str(start), body="\n".join(chunk))
+            start += len(chunk)
+            chunk, size, limit = [], 0, SYNC_CHUNK_BYTES
+    if chunk:
+        yield Message(FILE_CHUNK, filename, version, str(start), body="\n".join(chunk))
+        start += len(chunk)
+    yield Message(FILE_COMMIT, filename, version, str(start))
+
+def create_sync_messages(filename, document):
+    """
+    Katılımda gönderilecek tam içerik: küçük dokümanlar için tek FILE_SYNC, büyükler için
+    anlık görüntüden gerektikçe üretilen FILE_CHUNK... FILE_COMMIT dizisi (bkz. send_messages).
     """
-    Tüm bağlı clientlara mesaj gönderir (belirtilen client hariç).
-    Bağlantısı kopan clientları temizler.
+    flush_patches(filename)
+    snapshot = document.snapshot()
+    if snapshot.chars <= SYNC_CHUNK_BYTES:
+        return [Message(FILE_SYNC, filename, str(snapshot.version), body=snapshot.text())]
+    metrics.inc("sync_streams_total")
+    return _iter_chunk_messages(filename, snapshot)
+
+def create_catch_up_messages(filename, document, since=None):
+    """
+    Dosyaya (yeniden) katılan client'a gönderilecek içerik. since verilmişse (RESUME) ve
+    o sürümden sonraki düzenlemeler geçmişteyse sadece onlar FILE_BATCH olarak gönderilir
+    (client zaten günceldeyse hiçbir şey); aksi halde tam içerik (create_sync_messages).
+    RESUME'da SESSION'dan önce ulaşması gerektiği için tek FILE_SYNC kullanılır.
+    """
+    if since is not None:
+        flush_patches(filename)
+        records = document.records_since(since)
+        if records is not None:
+            metrics.inc("resume_catch_up_total", mode="patches")
+            return [Message(FILE_BATCH, filename, body=encode_patch_batch(records))] if records else []
+        metrics.inc("resume_catch_up_total", mode="sync")
+        return [create_sync_message(filename, document)]
+    return create_sync_messages(filename, document)
+
+def send_messages(conn, filename, messages):
+    """
+    Dokümanla ilgili yanıt mesajlarını client'a gönderir. Parçalı içerik (FILE_CHUNK) kuyruğu
+    doldurmadan ayrı görevde gönderilir ve client dosyadan ayrılırsa yarıda kesilir;
+    diğer mesajlar doğrudan kuyruğa eklenir.
+    """
+    if isinstance(messages, list):
+        for index, message in enumerate(messages):
+            if message.command == FILE_CHUNK:
+                messages = messages[index:]
+                break
+            conn.send(message)
+        else:
+            return
+    conn.stream(messages, lambda: conn.current_file == filename)
+
+def create_resync_messages(conn):
+    """
+    Kuyruğu taşan client'ın atlanan mesajlarının yerine geçecek güncel durumu üretir.
+    """
+    messages = [Message(USER_LIST, *usernames), Message(FILE_LIST, *files.list_names())]
+    # Görüntülenen doküman abonesi olduğu için bellektedir. Başka işçideki bir doküman için
+    # FILE_SYNC gönderilmez; client sonraki düzenlemede sürüm boşluğunu görüp FILE_RESYNC ister.
+    document = files.peek(conn.current_file)
+    if document is not None:
+        messages.append(create_presence_message(conn.current_file))
+        messages.append(create_sync_message(conn.current_file, document))
+    return messages
+
+def broadcast_all(message, exclude=None):
+    """
+    Tüm bağlı clientların kuyruğuna mesaj ekler (belirtilen client hariç).
+    Beklemez; bağlantısı kopan clientlar handle_client içinde temizlenir.
+    """
+    start = time.perf_counter()
+    for conn in list(clients.values()):
+        if conn is not exclude:
+            conn.send(message)
+    metrics.observe("broadcast_duration_ms", (time.perf_counter() - start) * 1000.0, scope="all")
+
+def join_room(conn, filename):
+    """
+    Client'ı dosyanın odasına ekler. Client aynı anda tek bir dosyayı görüntüler,
+    bu yüzden önceki odasından çıkarılır.
+    """
+    leave_room(conn)
+    subscribers.setdefault(filename, set()).add(conn)
+    conn.current_file = filename
+
+def leave_room(conn, keep_presence=False):
+    """
+    Client'ı bulunduğu dosya odasından çıkarır. Boş kalan oda silinir.
+    keep_presence: Kullanıcı dokümanı görüntüleyenler arasında kalır (oturum askıya alınıyor;
+    RESUME'da yeniden katılır ya da süre dolunca expire_session çıkarır)
+    """
+    filename = conn.current_file
+    if filename is None:
+        return
+    conn.current_file = None
+    if not keep_presence:
+        update_presence(filename, conn.username, left=True)
+    room = subscribers.get(filename)
+    if room is not None:
+        room.discard(conn)
+        if not room:
+            del subscribers[filename]
+            if owns(filename):
+                # Boşta kalan doküman bütçe aşılmışsa bellekten çıkarılabilir
+                files.maybe_evict()
+            else:
+                # Bu işçide görüntüleyen kalmadı, sahibi artık düzenlemeleri buraya göndermesin
+                cluster.post(cluster.owner(filename), {"t": "room_leave", "name": filename})
+                metrics.forget(document=filename)
+
+def broadcast_room(filename, message, exclude=None):
     """
-    disconnected_clients = []
-    for ws in clients:
-        if ws != exclude_ws:
+    Mesajı sadece dosyayı görüntüleyen clientların kuyruğuna ekler.
+    Çoklu süreç modunda odada client'ı olan diğer işçilere de iletilir.
+    """
+    start = time.perf_counter()
+    for conn in list(subscribers.get(filename, ())):
+        if conn is not exclude:
+            conn.send(message)
+    if cluster is not None:
+        cluster.publish(filename, message)
+    metrics.observe("broadcast_duration_ms", (time.perf_counter() - start) * 1000.0, scope="room")
+
+def publish_patch(filename, version, author, edits):
+    """
+    Uygulanan düzenlemeyi odaya yayınlanmak üzere dokümanın bekleyen kayıtlarına ekler.
+    İlk kayıt BROADCAST_TICK sonrası için yayın zamanlar; kayıtlar sürüm sırasını korur.
+    """
+    if BROADCAST_TICK <= 0:
+        broadcast_room(filename, Message(FILE_PATCH, filename, str(version), author, body=encode_edits(edits)))
+        return
+    pending = pending_patches.get(filename)
+    if pending is None:
+        pending = pending_patches[filename] = []
+        asyncio.get_running_loop().call_later(BROADCAST_TICK, flush_patches, filename)
+    pending.append((version, author, edits))
+    if len(pending) >= BROADCAST_MAX_PENDING:
+        flush_patches(filename)
+
+def flush_patches(filename):
+    """
+    Dokümanın bekleyen düzenlemelerini odaya tek mesajla yayınlar.
+    Tek kayıt varsa eski clientlar da anlasın diye düz FILE_PATCH gönderilir.
+    """
+    pending = pending_patches.pop(filename, None)
+    if not pending:
+        return
+    if len(pending) == 1:
+        version, author, edits = pending[0]
+        message = Message(FILE_PATCH, filename, str(version), author, body=encode_edits(edits))
+    else:
+        message = Message(FILE_BATCH, filename, body=encode_patch_batch(pending))
+    metrics.observe("broadcast_batch_size", len(pending))
+    broadcast_room(filename, message)
+
+def update_presence(filename, username, cursor=None, left=False):
+    """
+    Dokümanı görüntüleyen kullanıcıyı ekler (cursor ve left verilmezse), imlecini günceller
+    ya da çıkarır. Değişiklikler PRESENCE_TICK sonunda odaya tek mesajla yayınlanır.
+    Dokümanın sahibi başka işçideyse değişiklik oraya iletilir.
+    """
+    if not owns(filename):
+        event = {"t": "presence", "name": filename, "user": username}
+        if left:
+            event["left"] = True
+        elif cursor is not None:
+            event["cursor"] = cursor
+        cluster.post(cluster.owner(filename), event)
+        return
+    room = presence.get(filename)
+    if left or cursor is not None:
+        if room is None or username not in room:
+            return  # Zaten ayrılmış (örn. katılımı başarısız oldu)
+        if left:
+            del room[username]
+            if not room:
+                del presence[filename]
+        else:
+            room[username] = cursor
+    else:
+        room = presence.setdefault(filename, {})
+        if username in room:
+            return  # RESUME ile dönen client: odadakiler için değişiklik yok
+        room[username] = None
+
+    pending = pending_presence.get(filename)
+    if pending is None:
+        pending = pending_presence[filename] = ({}, set())
+        asyncio.get_running_loop().call_later(PRESENCE_TICK, flush_presence, filename)
+    updated, removed = pending
+    if left:
+        updated.pop(username, None)
+        removed.add(username)
+    else:
+        removed.discard(username)
+        updated[username] = room[username]
+
+def flush_presence(filename):
+    """Dokümanın bekleyen kullanıcı durumu değişikliklerini odaya yayınlar"""
+    pending = pending_presence.pop(filename, None)
+    if pending is None:
+        return
+    updated, removed = pending
+    metrics.inc("presence_broadcasts_total")
+    broadcast_room(filename, Message(PRESENCE, filename, body=encode_presence(updated, sorted(removed))))
+
+def create_presence_message(filename):
+    """
+    Dokümanı görüntüleyenlerin tam listesi (odaya katılan client'a). "full" argümanı
+    client'ın önceki durumu bununla değiştirmesini, yayınlanan değişiklikleri ise üzerine uygulamasını söyler.
+    """
+    return Message(PRESENCE, filename, "full", body=encode_presence(presence.get(filename, {})))
+
+# === Komut İşleyicileri ===
+# Her işleyici server/dispatch.py tablosuna kaydedilir; argümanlar çağrılmadan önce
+# doğrulanmış ve dönüştürülmüş olur. Beklenen hatalar CommandError olarak fırlatılır.
+
+ERR_FILE_NOT_FOUND = "Dosya bulunamadı."
+
+async def _get_document(filename):
+    try:
+        return await files.get(filename)
+    except KeyError:
+        raise CommandError(ERR_FILE_NOT_FOUND) from None
+
+def _create_document(filename):
+    """Yeni dokümanı oluşturur ve güncel dosya listesini tüm clientlara (tüm işçilerde) gönderir"""
+    document = files.create(filename)
+    search_index.add_document(filename, ())
+    journal.append(filename, 0, [])
+    broadcast_all(Message(FILE_LIST, *files.list_names()))
+    announce("file_add", filename)
+    return document
+
+def apply_document_edits(conn, filename, document, edits):
+    """
+    Client'ın düzenlemelerini dokümana uygular ve arama indeksini günceller. Satır ya da
+    bellek kotasını aşan düzenleme uygulanmaz: client'ın yerelde uyguladığı düzenleme geri
+    alınsın diye tam içerik gönderilir ve CommandError fırlatılır. Returns: yeni sürüm
+    """
+    author = conn.username
+    # Bu dokümanın toplam kotadan kullanabileceği: kendi boyutu + boş kalan
+    size = document.memory_size
+    available = MAX_TOTAL_DOCUMENT_BYTES - files.resident_bytes() + size
+    removed = []
+    try:
+        version = document.apply_edits(edits, author, max_lines=MAX_DOCUMENT_LINES,
+                                       max_bytes=min(MAX_DOCUMENT_BYTES, available), removed=removed)
+    except DocumentLimitError as e:
+        metrics.inc("edits_rejected_total")
+        logger.warning("[UYARI] %s düzenlemesi reddedildi: %s (%s)", author, filename, e)
+        send_messages(conn, filename, create_sync_messages(filename, document))
+        raise CommandError(str(e)) from None
+    files.resized(document.memory_size - size)
+    search_index.update(filename, removed, edits)
+    return version
+
+async def search_documents(terms, limit):
+    """
+    Bu işçinin dokümanlarında tüm kelimeleri içeren satırlar (bkz. SearchIndex.search).
+    Bellekte olmayan aday doküman önbelleğe alınmadan diskten okunur.
+    """
+    if search_index.ready is not None:
+        await asyncio.shield(search_index.ready)
+    results = []
+    for filename in search_index.candidates(terms):
+        document = files.peek(filename)
+        if document is None:
             try:
-                await ws.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.append(ws)
+                document = await journal.recover_async(filename)
             except Exception as e:
-                print(f"[HATA] Broadcast sırasında hata: {e}")
-    
-    # Bağlantısı kopan clientları temizle
-    for ws in disconnected_clients:
-        if ws in clients:
-            username = clients[ws]
-            usernames.discard(username)
-            del clients[ws]
-    
-    # Eğer client listesi değiştiyse, kullanıcı listesini tekrar yayınla
-    if disconnected_clients:
-        user_list_msg = create_message(USER_LIST, *usernames)
-        await broadcast_all(user_list_msg)
+                logger.error("[HATA] %s arama için okunamadı: %s", filename, e)
+                continue
+            document = files.peek(filename) or document
+        results.extend(search_index.search(filename, document.snapshot(), terms, limit - len(results)))
+        if len(results) >= limit:
+            break
+    return results
+
+def expire_session(session):
+    """Askıdaki oturumun süresi doldu: kullanıcı görüntülediği dokümandan ve listeden çıkar"""
+    if session.filename is not None:
+        update_presence(session.filename, session.username, left=True)
+    release_user(session.username)
+
+def release_user(username):
+    """Kullanıcı adını serbest bırakır ve çıkışını tüm işçilere yayınlar"""
+    usernames.discard(username)
+    broadcast_all(Message(USER_LEFT, username))
+    announce("user_remove", username)
+
+async def reserve_username(username):
+    """
+    Kullanıcı adını ayırır. Çoklu süreç modunda karar adın sahibi işçidedir,
+    böylece iki işçiye aynı anda gelen aynı ad ikisinde birden kabul edilmez.
+    Returns: bool - ad boştaysa True
+    """
+    if owns(username):
+        if username in usernames:
+            return False
+        usernames.add(username)
+        return True
+    return await cluster.request(cluster.owner(username), {"op": "reserve", "name": username})
+
+async def forward_command(conn, filename, request):
+    """
+    İsteği dokümanın sahibi işçiye iletir; yanıttaki mesajlar (FILE_SYNC, ERROR) client'a gönderilir.
+    Returns: bool - komut başarılıysa True
+    """
+    request["user"] = conn.username
+    return await cluster.request(cluster.owner(filename), request,
+                                 lambda messages: send_messages(conn, filename, messages))
+
+async def join_document(conn, filename, since=None):
+    """
+    Client'ı dosyanın odasına ekler ve içeriğini gönderir (bkz. create_catch_up_messages).
+    Returns: bool - katılım başarılıysa True
+    Raises:
+        CommandError: Dosya yoksa
+    """
+    if not owns(filename):
+        # Önce yerel odaya katılınır: sahibinden FILE_SYNC'ten sonra gelen düzenlemeler kaçmaz
+        join_room(conn, filename)
+        request = {"op": "join", "name": filename}
+        if since is not None:
+            request["since"] = since
+        if not await forward_command(conn, filename, request):
+            leave_room(conn)
+            return False
+        return True
+    document = await _get_document(filename)
+    # İçerik ile odaya katılım arasında bekleme yok: sonraki yayınlar bu sürümden sonradır
+    messages = create_catch_up_messages(filename, document, since)
+    join_room(conn, filename)
+    update_presence(filename, conn.username)
+    # Kullanıcı durumu içerikten önce: sonra yayınlanan değişiklikler bu tam listenin üzerine uygulanır
+    conn.send(create_presence_message(filename))
+    send_messages(conn, filename, messages)
+    return True
+
+async def take_session(token):
+    """
+    Oturumu RESUME eden bağlantı için kayıttan alır. Eski bağlantı hâlâ açık görünüyorsa
+    (kopukluk sunucuya henüz ulaşmadıysa) kapatılır ve işleyicisinin bitmesi beklenir;
+    böylece eski bağlantıdan gelen bir düzenleme yeni bağlantının yetişmesinden sonra işlenmez.
+    Returns: (username, görüntülenen dosya ya da None); oturum yoksa None
+    """
+    worker, _, _ = token.partition(".")
+    if cluster is not None and worker.isdigit() and int(worker) != cluster.index:
+        # Oturum başka işçide açılmıştı: oradan devralınır
+        if int(worker) >= cluster.count:
+            return None
+        replies = []
+        if not await cluster.request(int(worker), {"op": "resume", "token": token}, replies.extend):
+            return None
+        username, filename = replies[0].args
+        return username, filename or None
+
+    session = sessions.take(token)
+    if session is None:
+        return None
+    old = session.conn
+    if old is not None:
+        # session.conn boşaltıldığı için eski bağlantı kapanırken kullanıcıyı düşürmez
+        session.conn = None
+        session.filename = old.current_file
+        old.websocket.transport.abort()
+        await old.done.wait()
+    return session.username, session.filename
+
+@command(LOGIN, username_arg, optional=(text_arg,), login_required=False)
+async def handle_login(conn, body, username, codec_name=None):
+    if conn.username is not None or not await reserve_username(username):
+        # Kullanıcı adı zaten kullanımda
+        raise CommandError("Bu kullanıcı adı zaten kullanımda. Lütfen başka bir ad seçin.")
+
+    conn.username = username
+    # İsteğe bağlı ikinci argüman client'ın istediği kodlayıcıdır (varsayılan JSON).
+    # Client gelen çerçeveleri türüne göre çözdüğü için ayrıca onay gerekmez.
+    conn.codec = get_codec(codec_name)
+    clients[conn.websocket] = conn
+    usernames.add(username)
+    # Tam liste sadece yeni bağlanana; diğerleri listelerine tek kullanıcı ekler
+    conn.send(Message(USER_LIST, *usernames))
+    broadcast_all(Message(USER_JOINED, username), exclude=conn)
+    announce("user_add", username)
+    session = sessions.create(username, conn)
+    conn.send(Message(SESSION, session.token, str(sessions.grace_period)))
+    logger.info("[BİLGİ] %s bağlandı", username)
+
+    # Yeni bağlanan kullanıcıya mevcut dosya listesini gönder
+    if files.names:
+        conn.send(Message(FILE_LIST, *files.list_names()))
+
+@command(RESUME, text_arg, optional=(text_arg,), login_required=False)
+async def handle_resume(conn, body, token, codec_name=None):
+    """
+    Kopan oturuma devam eder. Gövde client'ın son gördüğü sürümlerdir: {"dosya": sürüm}.
+    Görüntülenen dosyaya yeniden katılınır ve sadece kaçırılan düzenlemeler gönderilir.
+    Sırası: USER_LIST, FILE_LIST, PRESENCE, kaçırılanlar (FILE_BATCH ya da FILE_SYNC), SESSION.
+    """
+    if conn.username is not None:
+        raise CommandError("Zaten giriş yapılmış.")
+    try:
+        versions = json.loads(body) if body else {}
+    except json.JSONDecodeError:
+        versions = None
+    if not isinstance(versions, dict):
+        raise CommandError("Geçersiz sürüm listesi.")
+    taken = await take_session(token)
+    if taken is None:
+        raise CommandError("Oturumun süresi dolmuş. Lütfen yeniden giriş yapın.")
+
+    username, filename = taken
+    conn.username = username
+    conn.codec = get_codec(codec_name)
+    clients[conn.websocket] = conn
+    # Kullanıcı listesinde hiç çıkmadığı için yayın yok; kopukken değişen listeler sadece ona
+    conn.send(Message(USER_LIST, *usernames))
+    conn.send(Message(FILE_LIST, *files.list_names()))
+    error = None
+    if filename is not None:
+        since = versions.get(filename)
+        try:
+            await join_document(conn, filename, since if isinstance(since, int) and since >= 0 else None)
+        except CommandError as e:
+            # Askıdayken korunan görünürlük artık geçersiz
+            update_presence(filename, username, left=True)
+            error = e
+    session = sessions.create(username, conn)
+    conn.send(Message(SESSION, session.token, str(sessions.grace_period)))
+    metrics.inc("sessions_resumed_total")
+    logger.info("[BİLGİ] %s oturumuna devam etti", username)
+    if error is not None:
+        raise error
+
+@command(FILE_CREATE, filename_arg)
+async def handle_file_create(conn, body, filename):
+    if filename in files:
+        raise CommandError("Bu dosya adı zaten mevcut. Lütfen başka bir ad seçin.")
+    # Dosya oluşturulduktan sonra tüm clientlara güncel dosya listesi gönderilir
+    _create_document(filename)
+    logger.info("[BİLGİ] %s yeni dosya oluşturdu: %s", conn.username, filename)
+
+@command(FILE_JOIN, filename_arg)
+async def handle_file_join(conn, body, filename):
+    if await join_document(conn, filename):
+        logger.info("[BİLGİ] %s dosyaya katıldı: %s", conn.username, filename)
+
+@command(FILE_RESYNC, filename_arg)
+async def handle_file_resync(conn, body, filename):
+    # İstemci sürüm boşluğu fark etti, tam içeriği yeniden gönder
+    document = await _get_document(filename)
+    send_messages(conn, filename, create_sync_messages(filename, document))
+
+@command(FILE_LEAVE, optional=(filename_arg,))
+async def handle_file_leave(conn, body, filename=None):
+    leave_room(conn)
+    logger.info("[BİLGİ] %s dosyadan ayrıldı", conn.username)
+
+@command(CURSOR, filename_arg)
+async def handle_cursor(conn, body, filename):
+    try:
+        cursor = decode_cursor(body)
+    except ValueError as e:
+        raise CommandError(str(e)) from None
+    if conn.current_file != filename:
+        return  # Client dosyadan ayrıldıktan sonra gelen eski konum
+    update_presence(filename, conn.username, cursor)
+
+@command(FILE_UPDATE, filename_arg, line_number_arg)
+async def handle_file_update(conn, body, filename, line_num):
+    if line_num > MAX_DOCUMENT_LINES:
+        # Araya eklenecek boş satırlar oluşturulmadan reddedilir
+        raise CommandError(f"Satır numarası en fazla {MAX_DOCUMENT_LINES} olabilir.")
+    if filename not in files:
+        document = _create_document(filename) # Yeni oluşturulmuş olabilir, veya JOIN olmadan update
+    else:
+        document = await files.get(filename)
+
+    # None değerleri boş string ile değiştir
+    body = body if body is not None else ""
+    # Satır yoksa araya boş satırlar eklenir
+    edits = document.set_line_edits(line_num - 1, body)
+    version = apply_document_edits(conn, filename, document, edits)
+    journal.append(filename, version, edits, conn.username)
+
+    # Tüm dokümanı değil, sadece değişen satırı FILE_PATCH olarak gönder; böylece OT kullanan
+    # clientlar bu değişikliği de kendi bekleyen düzenlemelerine göre dönüştürebilir.
+    # Güncelleyen client da alır; kendi sürümünü ilerletmek için onay olarak kullanır.
+    publish_patch(filename, version, conn.username, edits)
+
+    logger.debug("[BİLGİ] %s dosyayı güncelledi: %s (Satır %d)", conn.username, filename, line_num)
+
+@command(FILE_PATCH, filename_arg, optional=(version_arg,))
+async def handle_file_patch(conn, body, filename, base_version=None):
+    if filename not in files:
+        raise CommandError(ERR_FILE_NOT_FOUND)
+    try:
+        edits = decode_edits(body)
+    except ValueError as e:
+        raise CommandError(f"Geçersiz düzenleme: {e}") from None
+    if not edits:
+        return
+
+    document = await _get_document(filename)
+    if base_version is not None and base_version != document.version:
+        # Client düzenlemeyi eski bir sürüme göre yaptı: aradaki düzenlemelere göre dönüştür
+        concurrent = document.edits_since(base_version)
+        if concurrent is None:
+            # Geçmişte artık yok; client tam içerikle yeniden başlasın
+            conn.send(create_sync_message(filename, document))
+            raise CommandError("Düzenleme çok eski bir sürüme göre yapılmış, doküman yeniden yüklendi.")
+        edits, _ = transform(edits, concurrent, a_first=False)
+
+    # Tüm düzenlemeler atomik uygulanır, tek sürüm ve tek yayın.
+    # Dönüşümle tamamen düşen düzenleme de sürüm alır: yankısı client için onaydır.
+    try:
+        version = apply_document_edits(conn, filename, document, edits)
+    except IndexError as e:
+        raise CommandError(f"Geçersiz düzenleme: {e}") from None
+    journal.append(filename, version, edits, conn.username)
+    publish_patch(filename, version, conn.username, edits)
+
+    logger.debug("[BİLGİ] %s dosyayı güncelledi: %s (%d düzenleme)", conn.username, filename, len(edits))
+
+@command(HISTORY, filename_arg)
+async def handle_history(conn, body, filename):
+    """
+    Dokümanın sürüm geçmişi (bkz. server/history.py): HISTORY:dosya:güncel_sürüm
+    gövdesinde [[sürüm, zaman, [yazarlar]], ...] kontrol noktaları. İlk kayıttan güncel
+    sürüme kadar her sürüm FILE_AT_VERSION ile okunabilir.
+    """
+    if filename not in files:
+        raise CommandError(ERR_FILE_NOT_FOUND)
+    document = await _get_document(filename)
+    version = document.version
+    versions = await journal.versions(filename)
+    conn.send(Message(HISTORY, filename, str(version), body=json.dumps(versions, ensure_ascii=False)))
+
+@command(FILE_AT_VERSION, filename_arg, version_arg)
+async def handle_file_at_version(conn, body, filename, version):
+    """Dokümanın geçmiş bir sürümdeki içeriği; güncel doküman değişmez"""
+    if filename not in files:
+        raise CommandError(ERR_FILE_NOT_FOUND)
+    document = await _get_document(filename)
+    if version > document.version:
+        raise CommandError("Bu sürüm henüz oluşmadı.")
+    if version == document.version:
+        text = document.text()
+    else:
+        lines = await journal.read_version(filename, version)
+        if lines is None:
+            raise CommandError("Bu sürüm artık saklanmıyor.")
+        text = "\n".join(lines)
+    metrics.inc("history_reads_total")
+    conn.send(Message(FILE_AT_VERSION, filename, str(version), body=text))
+
+@command(SEARCH)
+async def handle_search(conn, body):
+    """
+    Tüm dokümanlarda arama: gövdedeki kelimelerin hepsini içeren satırlar.
+    Yanıt SEARCH:sonuç_sayısı, gövdesinde [[dosya, satır numarası, kesit], ...] (dosya ve
+    satıra göre sıralı, en fazla SEARCH_MAX_RESULTS). Doküman içerikleri gönderilmez.
+    """
+    terms = tokenize(body or "")[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise CommandError("Aranacak kelime yok.")
+    with metrics.timer("search_duration_ms"):
+        results = await search_documents(terms, SEARCH_MAX_RESULTS)
+        if cluster is not None:
+            # Her işçi kendi dokümanlarını indeksler; sorgu hepsine birden sorulur
+            replies = []
+            await asyncio.gather(*(cluster.request(index, {"op": "search", "terms": terms}, replies.extend)
+                                   for index in range(cluster.count) if index != cluster.index))
+            for message in replies:
+                results.extend(json.loads(message.body))
+            results.sort(key=lambda result: (result[0], result[1]))
+            del results[SEARCH_MAX_RESULTS:]
+    metrics.inc("search_queries_total")
+    conn.send(Message(SEARCH, str(len(results)), body=json.dumps(results, ensure_ascii=False)))
+
+@command(STATS, login_required=False)
+async def handle_stats(conn, body):
+    # Ölçümler Prometheus metin biçiminde gövdede döner
+    conn.send(Message(STATS, body=metrics.render()))
+
+@command(QUIT, optional=(text_arg,), login_required=False)
+async def handle_quit(conn, body, username=None):
+    if conn.session is not None:
+        # Bilerek çıkan kullanıcının oturumu askıda tutulmaz
+        sessions.discard(conn.session)
+        conn.session = None
+    logger.info("[BİLGİ] %s çıkış yaptı.", conn.username)
+    return STOP
+
+async def handle_message(conn, decoder, message):
+    """
+    Tek bir çerçeveyi çözer ve komut tablosundaki işleyicisine gönderir.
+    Hatalar client'a ERROR olarak döner.
+    Returns: Bağlantı kapatılacaksa STOP
+    """
+    start = time.perf_counter()
+    label = "INVALID"  # Çözülemeyen çerçeveler ayrı etikette toplanır
+    metrics.inc("bytes_in_total", len(message), document=conn.current_file or "-")
+    try:
+        command, args, body = decoder.decode(message)
+        # Bilinmeyen komut adları etiket sayısını şişirmesin
+        label = command if command in COMMAND_HANDLERS else "UNKNOWN"
+        if (cluster is not None and command in ROUTED_COMMANDS and conn.username is not None
+                and args and isinstance(args[0], str) and not cluster.is_local(args[0])):
+            await forward_command(conn, args[0], {"op": "command", "command": command,
+                                                  "args": args, "body": body})
+            return None
+        return await dispatch(conn, command, args, body)
+    except CommandError as e:
+        conn.send(error_message(str(e)))
+    except ValueError:
+        logger.warning("[HATA] Geçersiz mesaj: %.200r", message)
+        conn.send(error_message("Geçersiz mesaj formatı."))
+    except Exception as e:
+        logger.exception("[HATA] Mesaj işleme hatası: %s (Kullanıcı: %s, Mesaj: %.200r)", e, conn.username, message)
+        conn.send(Message(ERROR, body=f"Sunucu hatası: {e}"))
+    finally:
+        metrics.observe("command_duration_ms", (time.perf_counter() - start) * 1000.0, command=label)
 
 async def handle_client(websocket):
     """
     Her bir client bağlantısını yönetir
     """
-    username = None
+    conn = ClientConnection(websocket, OUTBOX_SIZE, OVERFLOW_POLICY, create_resync_messages)
+    decoder = FrameDecoder()  # Metin biçimi ilk çerçevede belirlenir
+    connections.add(conn)
     try:
         async for message in websocket:
-            try:
-                command, args, body = parse_message(message)
-                
-                if command == LOGIN:
-                    username = args[0]
-                    if username in usernames:
-                        # Kullanıcı adı zaten kullanımda
-                        error_msg = create_message(ERROR, body="Bu kullanıcı adı zaten kullanımda. Lütfen başka bir ad seçin.")
-                        await websocket.send(error_msg)
-                        continue
-                        
-                    clients[websocket] = username
-                    usernames.add(username)
-                    user_list_msg = create_message(USER_LIST, *usernames)
-                    await broadcast_all(user_list_msg)
-                    print(f"[BİLGİ] {username} bağlandı")
-
-                    # Yeni bağlanan kullanıcıya mevcut dosya listesini gönder
-                    if files:
-                        file_list_msg = create_message(FILE_LIST, *files.keys())
-                        await websocket.send(file_list_msg)
-
-                elif command == FILE_CREATE:
-                    filename = args[0]
-                    if filename not in files:
-                        files[filename] = []
-                        print(f"[BİLGİ] {username} yeni dosya oluşturdu: {filename}")
-                        # Dosya oluşturulduktan sonra tüm clientlara güncel dosya listesini gönder
-                        file_list_msg = create_message(FILE_LIST, *files.keys())
-                        await broadcast_all(file_list_msg)
-                    else:
-                        error_msg = create_message(ERROR, body="Bu dosya adı zaten mevcut. Lütfen başka bir ad seçin.")
-                        await websocket.send(error_msg)
-
-                elif command == FILE_JOIN:
-                    filename = args[0]
-                    if filename in files:
-                        content = "\n".join(files[filename])
-                        sync_msg = create_message(FILE_SYNC, filename, body=content)
-                        await websocket.send(sync_msg)
-                        print(f"[BİLGİ] {username} dosyaya katıldı: {filename}")
-                    else:
-                        error_msg = create_message(ERROR, body="Dosya bulunamadı.")
-                        await websocket.send(error_msg)
-
-                elif command == FILE_UPDATE:
-                    filename, line_num_str = args
-                    line_num = int(line_num_str)
-                    
-                    if filename not in files:
-                        files[filename] = [] # Yeni oluşturulmuş olabilir, veya JOIN olmadan update
-                    
-                    # Satır numarasına kadar boş satırlar ekle
-                    while len(files[filename]) < line_num:
-                        files[filename].append("")
-                    
-                    # None değerleri boş string ile değiştir
-                    body = body if body is not None else ""
-                    files[filename][line_num - 1] = body
-                    
-                    # Güncellenmiş içeriği gönder
-                    updated_content = "\n".join(line if line is not None else "" for line in files[filename])
-                    sync_msg = create_message(FILE_SYNC, filename, body=updated_content)
-                    await broadcast_all(sync_msg, exclude_ws=websocket) # Güncelleyen client'a geri gönderme
-
-                    print(f"[BİLGİ] {username} dosyayı güncelledi: {filename} (Satır {line_num})")
-
-                elif command == QUIT:
-                    print(f"[BİLGİ] {username} çıkış yaptı.")
-                    break
-
-            except json.JSONDecodeError:
-                print(f"[HATA] Geçersiz JSON mesajı: {message}")
-                error_msg = create_message(ERROR, body="Geçersiz mesaj formatı.")
-                await websocket.send(error_msg)
-            except Exception as e:
-                print(f"[HATA] Mesaj işleme hatası: {e} (Kullanıcı: {username}, Mesaj: {message})")
-                error_msg = create_message(ERROR, body=f"Sunucu hatası: {e}")
-                await websocket.send(error_msg)
+            if await handle_message(conn, decoder, message) is STOP:
+                break
 
-    except websockets.exceptions.ConnectionClosed:
-        print(f"[BİLGİ] {username if username else 'Bilinmeyen kullanıcı'} bağlantıyı kapattı.")
+    except ConnectionClosed:
+        logger.info("[BİLGİ] %s bağlantıyı kapattı.", conn.username or "Bilinmeyen kullanıcı")
     except Exception as e:
-        print(f"[HATA] Client bağlantı hatası: {e}")
+        logger.error("[HATA] Client bağlantı hatası: %s", e)
     finally:
-        if username:
-            usernames.discard(username)
-            if websocket in clients:
-                del clients[websocket]
-            user_list_msg = create_message(USER_LIST, *usernames)
-            await broadcast_all(user_list_msg) # Bağlantı kapandığında kullanıcı listesini güncelle
+        filename = conn.current_file
+        connections.discard(conn)
+        # Oturum askıya alınıyor ya da RESUME ile devrediliyorsa (QUIT değilse) kullanıcı dokümanı
+        # görüntüleyenlerde kalır: kopup hemen dönen client odaya ayrıldı/katıldı yayını yaptırmaz
+        leave_room(conn, keep_presence=conn.session is not None)
+        await conn.close()
+        if conn.username:
+            clients.pop(websocket, None)
+            session = conn.session
+            if session is None:
+                # QUIT: kullanıcı listesini hemen güncelle
+                release_user(conn.username)
+            elif session.conn is conn:
+                # Beklenmedik kopukluk: oturum askıya alınır, kullanıcı listesi değişmez
+                sessions.suspend(session, filename)
+                logger.info("[BİLGİ] %s oturumu %d sn korunuyor", conn.username, sessions.grace_period)
+            # Aksi halde oturum RESUME ile yeni bağlantıya devredildi
+        conn.done.set()
+
+# === İşçiler Arası İstekler (çoklu süreç modu) ===
+
+async def handle_peer_request(peer, request):
+    """
+    Başka bir işçinin, sahibi bu işçi olan doküman ya da kullanıcı adı için isteğini işler.
+    Returns: (başarılı mı, client'a iletilecek mesajlar)
+    """
+    if request["op"] == "reserve":
+        return await reserve_username(request["name"]), []
+    if request["op"] == "resume":
+        # Oturum bu işçide açılmıştı; client başka işçiye yeniden bağlandı
+        taken = await take_session(request["token"])
+        if taken is None:
+            return False, []
+        username, filename = taken
+        return True, [Message(SESSION, username, filename or "")]
+    if request["op"] == "search":
+        results = await search_documents(request["terms"], SEARCH_MAX_RESULTS)
+        return True, [Message(SEARCH, str(len(results)), body=json.dumps(results, ensure_ascii=False))]
+
+    conn = ForwardedConnection(request["user"])
+    try:
+        if request["op"] == "join":
+            filename = request["name"]
+            document = await _get_document(filename)
+            # Abonelik ve içerik arasında bekleme yok: sonraki yayınlar sürümden sonradır
+            messages = create_catch_up_messages(filename, document, request.get("since"))
+            cluster.add_room_peer(filename, peer)
+            update_presence(filename, conn.username)
+            conn.send(create_presence_message(filename))
+            conn.stream(messages)
+        else:
+            await dispatch(conn, request["command"], request["args"], request["body"])
+        return True, conn.messages
+    except CommandError as e:
+        conn.send(error_message(str(e)))
+    except ValueError as e:
+        logger.warning("[HATA] İşçi %d geçersiz istek iletti: %s", peer, e)
+        conn.send(error_message("Geçersiz mesaj formatı."))
+    except Exception as e:
+        logger.exception("[HATA] İletilen mesaj işleme hatası: %s (Kullanıcı: %s)", e, conn.username)
+        conn.send(Message(ERROR, body=f"Sunucu hatası: {e}"))
+    return False, conn.messages
+
+def handle_peer_event(peer, event):
+    """
+    Başka bir işçiden gelen, yanıt beklemeyen kaydı uygular.
+    """
+    kind, name = event["t"], event["name"]
+    if kind == "room":
+        # Sahibi başka işçi olan dokümanın yayını: sadece bu işçideki clientlara
+        message = unpack_message(event["m"])
+        start = time.perf_counter()
+        for conn in list(subscribers.get(name, ())):
+            conn.send(message)
+        metrics.observe("broadcast_duration_ms", (time.perf_counter() - start) * 1000.0, scope="peer_room")
+    elif kind == "room_leave":
+        cluster.remove_room_peer(name, peer)
+        files.maybe_evict()
+    elif kind == "presence":
+        # Başka işçideki client'ın bu işçinin dokümanındaki durumu
+        update_presence(name, event["user"], event.get("cursor"), event.get("left", False))
+    elif kind == "user_add":
+        usernames.add(name)
+        broadcast_all(Message(USER_JOINED, name))
+    elif kind == "user_remove":
+        usernames.discard(name)
+        broadcast_all(Message(USER_LEFT, name))
+    elif kind == "file_add":
+        files.names.add(name)
+        broadcast_all(Message(FILE_LIST, *files.list_names()))
+    else:
+        logger.warning("[UYARI] İşçi %d bilinmeyen kayıt gönderdi: %s", peer, kind)
+
+def register_gauges():
+    """
+    Okunduğu anda hesaplanan ölçümleri kaydeder (bağlantılar, kuyruklar, bellek).
+    """
+    metrics.gauge("connections_open", lambda: len(connections))
+    metrics.gauge("users_logged_in", lambda: len(clients))
+    metrics.gauge("sessions_suspended", lambda: sum(1 for session in sessions.sessions.values()
+                                                    if session.conn is None))
+    metrics.gauge("outbox_depth_total", lambda: sum(conn.queue.qsize() for conn in connections))
+    metrics.gauge("outbox_depth_max", lambda: max((conn.queue.qsize() for conn in connections), default=0))
+    metrics.gauge("room_subscribers", lambda: {(("document", filename),): len(room)
+                                               for filename, room in subscribers.items()})
+    metrics.gauge("documents_known", lambda: len(files.names))
+    metrics.gauge("documents_resident", lambda: len(files.resident))
+    metrics.gauge("documents_resident_bytes", files.resident_bytes)
+    metrics.gauge("document_bytes", lambda: {(("document", filename),): document.memory_size
+                                             for filename, document in files.resident.items()})
+    metrics.gauge("patches_pending", lambda: sum(len(pending) for pending in pending_patches.values()))
+    metrics.gauge("search_index_terms", lambda: len(search_index.postings))
+    metrics.gauge("journal_pending_records", lambda: sum(len(records) for records in journal.pending.values()))
 
 async def start_websocket_server():
     """
-    WebSocket sunucusunu başlatır
+    WebSocket sunucusunu başlatır. WORKERS > 1 ise işçi süreçleri başlatıp onları bekler.
     """
-    print(f"[BAŞLATILIYOR] Sunucu {HOST}:{PORT} adresinde dinleniyor...")
-    
-    # Otomatik kaydetme işlemini ayrı bir thread'de başlat
-    # files objesi threading lock ile korunmalı, bu yüzden direkt lambda ile geçmek yerine
-    # file_manager'daki lock mekanizmasına güveniyoruz.
-    threading.Thread(target=background_auto_save, args=(lambda: files,), daemon=True).start()
+    if WORKERS > 1 and cluster is None:
+        return await run_workers()
+
+    logger.info("[BAŞLATILIYOR] Sunucu %s:%d adresinde dinleniyor...", HOST, PORT)
     
-    async with websockets.serve(handle_client, HOST, PORT):
+    # Sadece dosya adları taranır; dokümanlar ilk FILE_JOIN'de anlık görüntü ve
+    # günlükten yüklenir
+    files.scan()
+    logger.info("[BAŞLATILIYOR] %d dosya bulundu", len(files.names))
+    asyncio.create_task(journal.run())
+    # Arama indeksi arka planda kurulur; her işçi sadece sahibi olduğu dokümanları indeksler
+    search_index.start([filename for filename in files.names if owns(filename)], files.peek, journal.recover_async)
+
+    # Otomatik kaydetme event loop üzerinde çalışır: anlık görüntüler burada alınır,
+    # sadece diske yazma işlemi ayrı thread'de yapılır. Her kayıt günlüğü de sıkıştırır.
+    asyncio.create_task(background_auto_save(files.documents, journal))
+
+    register_gauges()
+    if METRICS_PORT is not None:
+        await start_metrics_server(METRICS_PORT)
+    if cluster is not None:
+        # Oturum anahtarları onları tutan işçinin sırasıyla başlar (bkz. take_session)
+        sessions.prefix = f"{cluster.index}."
+        # Clientlar kabul edilmeden önce tüm işçiler birbirine bağlanmış olmalı
+        await cluster.start(handle_peer_request, handle_peer_event)
+
+    async with websockets.serve(handle_client, HOST, PORT, compression=WEBSOCKET_COMPRESSION,
+                                max_size=MAX_MESSAGE_BYTES, reuse_port=cluster is not None):
         await asyncio.Future()  # Sunucuyu çalışır durumda tut
 
+def configure_logging(level, format="%(message)s"):
+    logging.basicConfig(level=level, format=format)
+    # websockets her bağlantıyı INFO seviyesinde loglar; sadece uyarılar gösterilsin
+    logging.getLogger("websockets").setLevel(max(logging.getLogger().level, logging.WARNING))
+
+def run_worker(index, count, socket_dir, settings):
+    """
+    Çoklu süreç modunda bir işçinin giriş noktası (multiprocessing ile ayrı süreçte çalışır).
+    Args:
+        index (int): İşçinin sırası
+        count (int): Toplam işçi sayısı
+        socket_dir (str): İşçiler arası Unix soketlerinin dizini
+        settings (tuple): (host, port, metrics_port, log_level) - ana süreçteki ayarlar
+    """
+    global cluster, HOST, PORT, METRICS_PORT
+    HOST, PORT, metrics_port, log_level = settings
+    # Her işçinin ölçümleri ayrı portta: metrics_port + işçi sırası
+    METRICS_PORT = metrics_port + index if metrics_port is not None else None
+    configure_logging(log_level, f"[işçi {index}] %(message)s")
+    cluster = Cluster(index, count, socket_dir)
+    try:
+        asyncio.run(start_websocket_server())
+    except KeyboardInterrupt:
+        pass
+
+async def run_workers():
+    """
+    WORKERS kadar işçi süreci başlatır. Biri sonlanırsa (ya da sunucu durdurulursa)
+    hepsini kapatır; işçiler kapanırken bekleyen günlük kayıtlarını yazar.
+    """
+    socket_dir = tempfile.mkdtemp(prefix="editor-workers-")
+    settings = (HOST, PORT, METRICS_PORT, logging.getLogger().level)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, args=(index, WORKERS, socket_dir, settings))
+               for index in range(WORKERS)]
+    logger.info("[BAŞLATILIYOR] %d işçi süreci başlatılıyor...", WORKERS)
+    for worker in workers:
+        worker.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        while not stop.is_set() and all(worker.is_alive() for worker in workers):
+            try:
+                await asyncio.wait_for(stop.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+        if not stop.is_set():
+            logger.error("[HATA] Bir işçi süreci sonlandı, sunucu kapatılıyor")
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGINT)
+        deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT
+        for worker in workers:
+            await loop.run_in_executor(None, worker.join, max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                worker.terminate()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Çok kullanıcılı metin editörü sunucusu")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Ölçümlerin sunulacağı yerel HTTP portu")
+    parser.add_argument("--log-level", default=LOG_LEVEL,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Dokümanların bölüneceği işçi süreç sayısı (sadece Linux)")
+    options = parser.parse_args()
+    HOST, PORT, METRICS_PORT = options.host, options.port, options.metrics_port
+    WORKERS = options.workers
+    configure_logging(options.log_level)
     asyncio.run(start_websocket_server())
@@ -0,0 +1,81 @@
+# server/session.py
+
+import asyncio
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# Oturum devam ettirme: LOGIN sonrası client'a bir oturum anahtarı (token) verilir.
+# Bağlantı QUIT olmadan koparsa kullanıcı hemen düşürülmez; oturum GRACE_PERIOD
+# boyunca askıda tutulur ve kullanıcı adı ayrılmış kalır. Client bu sürede RESUME ile
+# yeniden bağlanırsa kaldığı sürümden sonraki düzenlemeleri alır, USER_LIST değişmez.
+
+# === Oturum Ayarları ===
+GRACE_PERIOD = 30  # Kopan bağlantının oturumunun korunduğu süre (saniye)
+TOKEN_BYTES = 18  # Anahtarın rastgele bayt sayısı
+
+class Session:
+    """Giriş yapmış bir kullanıcının bağlantıdan bağımsız durumu"""
+    __slots__ = ("token", "username", "conn", "filename", "expiry")
+
+    def __init__(self, token, username, conn):
+        self.token = token
+        self.username = username
+        self.conn = conn  # Bağlı ClientConnection; askıdayken None
+        self.filename = None  # Askıya alınırken görüntülenen dosya
+        self.expiry = None  # Askıdayken süre dolumu zamanlayıcısı
+
+class SessionStore:
+    """
+    Açık ve askıdaki oturumlar. Süresi dolan oturumun kullanıcısı on_expire ile düşürülür.
+    """
+    def __init__(self, on_expire, grace_period=GRACE_PERIOD, prefix=""):
+        """
+        Args:
+            on_expire (callable): Session -> None - askıdaki oturumun süresi doldu
+            grace_period (float): Askıdaki oturumun korunduğu süre (saniye)
+            prefix (str): Anahtarların ön eki (çoklu süreç modunda oturumu tutan işçi)
+        """
+        self.on_expire = on_expire
+        self.grace_period = grace_period
+        self.prefix = prefix
+        self.sessions = {}  # token -> Session
+
+    def create(self, username, conn):
+        """Yeni oturum açar ve bağlantıya bağlar"""
+        session = Session(self.prefix + secrets.token_urlsafe(TOKEN_BYTES), username, conn)
+        self.sessions[session.token] = session
+        conn.session = session
+        return session
+
+    def get(self, token):
+        return self.sessions.get(token)
+
+    def suspend(self, session, filename):
+        """Bağlantı koptu: oturum grace_period boyunca askıda kalır"""
+        session.conn = None
+        session.filename = filename
+        session.expiry = asyncio.get_running_loop().call_later(self.grace_period, self._expire, session.token)
+
+    def take(self, token):
+        """
+        Oturumu devam ettirmek için kayıttan çıkarır (süre dolumu iptal edilir).
+        Yeni bağlantıya yeni anahtarla create ile bağlanır.
+        Returns: Session ya da bilinmiyorsa None
+        """
+        session = self.sessions.pop(token, None)
+        if session is not None and session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+        return session
+
+    def discard(self, session):
+        """Oturumu kapatır (QUIT); kullanıcı çağıran tarafından düşürülür"""
+        self.take(session.token)
+
+    def _expire(self, token):
+        session = self.sessions.pop(token, None)
+        if session is not None:
+            logger.info("[BİLGİ] %s oturumunun süresi doldu", session.username)
+            self.on_expire(session)
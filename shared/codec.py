@@ -0,0 +1,211 @@
+# shared/codec.py
+
+from typing import List, Optional, Tuple, Union
+
+from shared.messages import (create_message, parse_message, parse_json_message, parse_legacy_message, LOGIN, USER_LIST, FILE_CREATE, FILE_LIST,
+                             FILE_JOIN, FILE_UPDATE, FILE_SYNC, FILE_SAVE, QUIT, ERROR,
+                             FILE_RESYNC, FILE_LEAVE, FILE_PATCH, STATS, FILE_BATCH, SESSION, RESUME,
+                             FILE_CHUNK, FILE_COMMIT, USER_JOINED, USER_LEFT, PRESENCE, CURSOR,
+                             HISTORY, FILE_AT_VERSION, SEARCH)
+
+# === Kodlayıcı Adları ===
+CODEC_JSON = "json"
+CODEC_BINARY = "binary"
+
+# İkili çerçeve biçimi:
+#   [opcode: 1 bayt][bayraklar: 1 bayt][argüman sayısı: varint][argümanlar...][gövde: ham UTF-8]
+# Her argüman (uzunluk << 1 | sayı_mı) başlığıyla başlar. Sayı olan argümanlar (sürüm,
+# satır numarası gibi) doğrudan varint olarak, diğerleri UTF-8 bayt olarak yazılır.
+# Gövde çerçevenin sonuna kadar uzanır; bayrak biti gövde olmamasını (None) boş gövdeden ayırır.
+OPCODES = {
+    LOGIN: 1,
+    USER_LIST: 2,
+    FILE_CREATE: 3,
+    FILE_LIST: 4,
+    FILE_JOIN: 5,
+    FILE_UPDATE: 6,
+    FILE_SYNC: 7,
+    FILE_SAVE: 8,
+    QUIT: 9,
+    ERROR: 10,
+    # 11: kaldırılan FILE_DELTA, eski istemcilerle karışmasın diye yeniden kullanılmaz
+    FILE_RESYNC: 12,
+    FILE_LEAVE: 13,
+    FILE_PATCH: 14,
+    STATS: 15,
+    FILE_BATCH: 16,
+    SESSION: 17,
+    RESUME: 18,
+    FILE_CHUNK: 19,
+    FILE_COMMIT: 20,
+    USER_JOINED: 21,
+    USER_LEFT: 22,
+    PRESENCE: 23,
+    CURSOR: 24,
+    HISTORY: 25,
+    FILE_AT_VERSION: 26,
+    SEARCH: 27,
+}
+COMMANDS = {opcode: command for command, opcode in OPCODES.items()}
+OPCODE_UNKNOWN = 0  # Tabloda olmayan komut: adı ilk argüman olarak taşınır
+FLAG_HAS_BODY = 0x01
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _is_number(arg: str) -> bool:
+    """Sayı olarak yazıldığında aynı metne geri dönen argümanlar"""
+    return arg.isdigit() and arg.isascii() and (arg == "0" or arg[0] != "0")
+
+
+class JsonCodec:
+    """Varsayılan, okunabilir JSON metin çerçeveleri"""
+    name = CODEC_JSON
+
+    def encode(self, command: str, *args: str, body: Optional[str] = None) -> str:
+        return create_message(command, *args, body=body)
+
+    def decode(self, raw: str) -> Tuple[str, List[str], Optional[str]]:
+        return parse_message(raw)
+
+
+class BinaryCodec:
+    """Sık gönderilen düzenlemeler için kompakt ikili çerçeveler"""
+    name = CODEC_BINARY
+
+    def encode(self, command: str, *args: str, body: Optional[str] = None) -> bytes:
+        out = bytearray()
+        opcode = OPCODES.get(command, OPCODE_UNKNOWN)
+        if opcode == OPCODE_UNKNOWN:
+            args = (command,) + args
+        out.append(opcode)
+        out.append(FLAG_HAS_BODY if body is not None else 0)
+        _write_varint(out, len(args))
+        for arg in args:
+            arg = str(arg)
+            if _is_number(arg):
+                _write_varint(out, 1)  # uzunluk 0, sayı bayrağı
+                _write_varint(out, int(arg))
+            else:
+                encoded = arg.encode("utf-8")
+                _write_varint(out, len(encoded) << 1)
+                out += encoded
+        if body is not None:
+            out += body.encode("utf-8")
+        return bytes(out)
+
+    def decode(self, raw: bytes) -> Tuple[str, List[str], Optional[str]]:
+        opcode = raw[0]
+        flags = raw[1]
+        argc, pos = _read_varint(raw, 2)
+        args = []
+        for _ in range(argc):
+            header, pos = _read_varint(raw, pos)
+            if header & 1:
+                value, pos = _read_varint(raw, pos)
+                args.append(str(value))
+            else:
+                length = header >> 1
+                args.append(raw[pos:pos + length].decode("utf-8"))
+                pos += length
+        body = raw[pos:].decode("utf-8") if flags & FLAG_HAS_BODY else None
+
+        if opcode == OPCODE_UNKNOWN:
+            return args[0], args[1:], body
+        command = COMMANDS.get(opcode)
+        if command is None:
+            raise ValueError(f"Bilinmeyen opcode: {opcode}")
+        return command, args, body
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+CODECS = {CODEC_JSON: JSON_CODEC, CODEC_BINARY: BINARY_CODEC}
+
+def get_codec(name: Optional[str]):
+    """
+    Adı verilen kodlayıcıyı döndürür; bilinmeyen ya da boş ad için JSON.
+    """
+    return CODECS.get(name or CODEC_JSON, JSON_CODEC)
+
+# Websocket kapanış kodu: mesaj karşı tarafın max_size sınırını aştı
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+def closed_for_size(exc) -> bool:
+    """ConnectionClosed istisnası bir tarafın çok büyük mesaj alması yüzünden mi oluştu"""
+    return any(frame is not None and frame.code == CLOSE_MESSAGE_TOO_BIG
+               for frame in (getattr(exc, "rcvd", None), getattr(exc, "sent", None)))
+
+def decode_frame(raw: Union[str, bytes]) -> Tuple[str, List[str], Optional[str]]:
+    """
+    Gelen websocket çerçevesini çözer: ikili çerçeveler BinaryCodec, metin çerçeveleri
+    JSON (ve eski metin biçimi) ile. Her iki taraf da hangi kodlayıcıyla konuşursa
+    konuşsun aynı fonksiyonla okur.
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        return BINARY_CODEC.decode(raw)
+    return JSON_CODEC.decode(raw)
+
+
+class FrameDecoder:
+    """
+    Bağlantı başına çerçeve çözücü. Metin çerçevelerinin biçimi (JSON ya da eski metin
+    biçimi) ilk çerçevede bir kez belirlenir; sonraki çerçeveler doğrudan o ayrıştırıcıya
+    gider. Böylece eski biçimde konuşan client her mesajda JSON hatası fırlatıp yakalamaz.
+    İkili çerçeveler türlerinden tanınır (client LOGIN sonrası ikiliye geçebilir).
+    """
+    __slots__ = ("_parse_text",)
+
+    def __init__(self):
+        self._parse_text = None
+
+    def decode(self, raw: Union[str, bytes]) -> Tuple[str, List[str], Optional[str]]:
+        """
+        Raises:
+            ValueError: Çerçeve, bağlantının biçimine göre geçersizse
+        """
+        if isinstance(raw, (bytes, bytearray)):
+            try:
+                return BINARY_CODEC.decode(raw)
+            except IndexError:
+                raise ValueError("Eksik ikili çerçeve") from None
+
+        parse = self._parse_text
+        if parse is None:
+            parse = self._parse_text = (parse_json_message if raw.lstrip().startswith("{")
+                                        else parse_legacy_message)
+        return parse(raw)
+
+
+class Message:
+    """
+    Sunucudan gönderilecek mesaj. Her kodlayıcı için en fazla bir kez kodlanır;
+    aynı mesaj farklı kodlayıcı kullanan çok sayıda client'a yayınlanabilir.
+    """
+    __slots__ = ("command", "args", "body", "_encoded")
+
+    def __init__(self, command: str, *args: str, body: Optional[str] = None):
+        self.command = command
+        self.args = args
+        self.body = body
+        self._encoded = {}
+
+    def encode(self, codec) -> Union[str, bytes]:
+        encoded = self._encoded.get(codec.name)
+        if encoded is None:
+            encoded = self._encoded[codec.name] = codec.encode(self.command, *self.args, body=self.body)
+        return encoded
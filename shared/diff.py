@@ -0,0 +1,98 @@
+# shared/diff.py
+
+from typing import Dict, List, Optional, Tuple
+
+# Daha pahalı farklarda (çok sayıda değişiklik) Myers araması bırakılır ve
+# ortak önek/sonek dışındaki bölge tek aralık düzenlemesi olarak gönderilir.
+MAX_DIFF_COST = 2000
+
+def _myers_matches(a: List[int], b: List[int], max_cost: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Myers O((N+M)D) algoritmasıyla en uzun ortak alt diziyi bulur.
+    Args:
+        a, b: Satır kimlikleri (hash yerine tamsayı karşılaştırması için)
+        max_cost: Aranacak en fazla düzenleme sayısı
+    Returns:
+        list: Eşleşen (a_index, b_index) çiftleri, artan sırada; maliyet aşılırsa None
+    """
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, max_cost) + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+def _backtrack(trace, x, y) -> List[Tuple[int, int]]:
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+def diff_lines(old: List[str], new: List[str], max_cost: int = MAX_DIFF_COST) -> List[Tuple[int, int, List[str]]]:
+    """
+    old satırlarını new satırlarına dönüştüren en küçük aralık düzenlemelerini hesaplar.
+    Args:
+        old (List[str]): Son gönderilen/onaylanan satırlar
+        new (List[str]): Güncel satırlar
+        max_cost (int): Myers araması için düzenleme sınırı
+    Returns:
+        list: FILE_PATCH için (start, end, lines) düzenlemeleri. Sondan başa doğru
+              sıralıdır, bu yüzden sırayla uygulandığında indeksler kaymaz.
+    """
+    # Ortak önek ve sonek: tipik düzenlemelerde farkın çoğu burada biter
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+    if not old_mid and not new_mid:
+        return []
+
+    # Satırları tamsayı kimliklere çevir: karşılaştırmalar string yerine int üzerinden yapılır
+    ids: Dict[str, int] = {}
+    a = [ids.setdefault(line, len(ids)) for line in old_mid]
+    b = [ids.setdefault(line, len(ids)) for line in new_mid]
+    matches = _myers_matches(a, b, max_cost) if a and b else []
+    if matches is None:
+        matches = []
+
+    # Eşleşmeler arasındaki boşluklar düzenlemedir
+    hunks = []
+    i = j = 0
+    for ai, bj in matches + [(len(a), len(b))]:
+        if ai > i or bj > j:
+            hunks.append((prefix + i, prefix + ai, new_mid[j:bj]))
+        i, j = ai + 1, bj + 1
+
+    hunks.reverse()
+    return hunks
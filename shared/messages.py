@@ -14,6 +14,22 @@ FILE_SYNC = "FILE_SYNC"
 FILE_SAVE = "FILE_SAVE"
 QUIT = "QUIT"
 ERROR = "ERROR"  # Yeni: Hata mesajları için
+FILE_RESYNC = "FILE_RESYNC"  # Yeni: İstemcinin tam senkronizasyon talebi için
+FILE_LEAVE = "FILE_LEAVE"  # Yeni: Dosya odasından ayrılmak için
+FILE_PATCH = "FILE_PATCH"  # Yeni: Çok satırlı aralık düzenlemeleri için
+STATS = "STATS"  # Yeni: Sunucu ölçümleri (Prometheus metin biçimi) için
+FILE_BATCH = "FILE_BATCH"  # Yeni: Birleştirilmiş FILE_PATCH yayınları için
+SESSION = "SESSION"  # Yeni: Oturum anahtarı (giriş ve devam ettirme sonrası) için
+RESUME = "RESUME"  # Yeni: Kopan oturumu kaldığı sürümden devam ettirmek için
+FILE_CHUNK = "FILE_CHUNK"  # Yeni: Büyük dokümanın parça parça gönderilen satırları için
+FILE_COMMIT = "FILE_COMMIT"  # Yeni: Parçalı gönderimin tamamlandığını bildirmek için
+USER_JOINED = "USER_JOINED"  # Yeni: Tam USER_LIST yerine tek kullanıcının girişi için
+USER_LEFT = "USER_LEFT"  # Yeni: Tam USER_LIST yerine tek kullanıcının çıkışı için
+PRESENCE = "PRESENCE"  # Yeni: Dokümanı görüntüleyenler ve imleçleri için
+CURSOR = "CURSOR"  # Yeni: Client'ın imleç/seçim konumu için
+HISTORY = "HISTORY"  # Yeni: Dokümanın saklanan sürümlerinin listesi için
+FILE_AT_VERSION = "FILE_AT_VERSION"  # Yeni: Dokümanın geçmiş bir sürümdeki içeriği için
+SEARCH = "SEARCH"  # Yeni: Dokümanlarda tam metin arama için
 
 # === Mesaj Olusturucu ===
 def create_message(command: str, *args: str, body: Optional[str] = None) -> str:
@@ -43,23 +59,44 @@ def parse_message(raw_message: str) -> Tuple[str, List[str], Optional[str]]:
         tuple: (command, args, body)
     """
     try:
-        message = json.loads(raw_message)
-        return (
-            message.get("command", ""),
-            message.get("args", []),
-            message.get("body")
-        )
+        return parse_json_message(raw_message)
     except json.JSONDecodeError:
         # Eski format mesajları için geriye dönük uyumluluk
-        parts = raw_message.strip().split('\n', 1)
-        header = parts[0]
-        body = parts[1] if len(parts) == 2 else None
+        return parse_legacy_message(raw_message)
 
-        header_parts = header.split(":")
-        command = header_parts[0]
-        args = header_parts[1:]
+def parse_json_message(raw_message: str) -> Tuple[str, List[str], Optional[str]]:
+    """
+    JSON formatındaki mesajı çözer (eski biçime geri düşmez).
+    Raises:
+        ValueError: Geçersiz JSON, mesaj nesnesi değilse ya da komut, argümanlar veya gövde metin değilse
+    """
+    message = json.loads(raw_message)
+    if not isinstance(message, dict):
+        raise ValueError("Mesaj bir JSON nesnesi olmalı")
+    command = message.get("command", "")
+    args = message.get("args", [])
+    body = message.get("body")
+    if not isinstance(command, str):
+        raise ValueError("Komut adı metin olmalı")
+    if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+        raise ValueError("Mesaj argümanları metin listesi olmalı")
+    if body is not None and not isinstance(body, str):
+        raise ValueError("Mesaj gövdesi metin olmalı")
+    return command, args, body
 
-        return command, args, body
+def parse_legacy_message(raw_message: str) -> Tuple[str, List[str], Optional[str]]:
+    """
+    Eski "KOMUT:arg1:arg2\\ngövde" biçimindeki mesajı çözer.
+    """
+    parts = raw_message.strip().split('\n', 1)
+    header = parts[0]
+    body = parts[1] if len(parts) == 2 else None
+
+    header_parts = header.split(":")
+    command = header_parts[0]
+    args = header_parts[1:]
+
+    return command, args, body
 
 # === Yardımcı Fonksiyonlar ===
 def create_error_message(error_text: str) -> str:
@@ -86,6 +123,153 @@ def is_error_message(message: str) -> bool:
     except json.JSONDecodeError:
         return False
 
+# === Aralık Düzenlemeleri (FILE_PATCH) ===
+# Bir düzenleme [start, end, lines] şeklindedir: 0'dan başlayan [start, end) satır aralığı
+# verilen satırlarla değiştirilir. start == end ekleme, boş lines silme anlamına gelir.
+# Bir mesajdaki düzenlemeler sırayla, her biri bir öncekinin sonucuna uygulanır.
+
+def encode_edits(edits: List[Tuple[int, int, List[str]]]) -> str:
+    """
+    Aralık düzenlemelerini FILE_PATCH gövdesi için kodlar.
+    Args:
+        edits (list): [start, end, lines] düzenlemeleri
+    Returns:
+        str: JSON formatında düzenleme listesi
+    """
+    return json.dumps([[start, end, list(lines)] for start, end, lines in edits])
+
+def decode_edits(body: Optional[str]) -> List[Tuple[int, int, List[str]]]:
+    """
+    FILE_PATCH gövdesini çözer ve yapısını doğrular.
+    Args:
+        body (str): JSON formatında düzenleme listesi
+    Returns:
+        list: (start, end, lines) düzenlemeleri
+    Raises:
+        ValueError: Gövde geçerli bir düzenleme listesi değilse
+    """
+    try:
+        raw_edits = json.loads(body) if body else []
+    except json.JSONDecodeError:
+        raise ValueError("Geçersiz düzenleme listesi")
+    return _validate_edits(raw_edits)
+
+def _validate_edits(raw_edits) -> List[Tuple[int, int, List[str]]]:
+    if not isinstance(raw_edits, list):
+        raise ValueError("Geçersiz düzenleme listesi")
+
+    edits = []
+    for edit in raw_edits:
+        if not (isinstance(edit, list) and len(edit) == 3):
+            raise ValueError("Geçersiz düzenleme")
+        start, end, lines = edit
+        if not (isinstance(start, int) and isinstance(end, int) and 0 <= start <= end):
+            raise ValueError("Geçersiz satır aralığı")
+        if not (isinstance(lines, list) and all(isinstance(line, str) for line in lines)):
+            raise ValueError("Geçersiz satır içeriği")
+        edits.append((start, end, lines))
+    return edits
+
+def encode_patch_batch(patches: List[Tuple[int, str, List[Tuple[int, int, List[str]]]]]) -> str:
+    """
+    Aynı dokümana art arda uygulanmış düzenlemeleri FILE_BATCH gövdesi için kodlar.
+    Args:
+        patches (list): Sürüm sırasıyla (version, author, edits) kayıtları; her kayıt
+                        tek bir FILE_PATCH yayınının karşılığıdır
+    Returns:
+        str: JSON formatında [[version, author, [[start, end, lines], ...]], ...]
+    """
+    return json.dumps([[version, author, [[start, end, list(lines)] for start, end, lines in edits]]
+                       for version, author, edits in patches])
+
+def decode_patch_batch(body: Optional[str]) -> List[Tuple[int, str, List[Tuple[int, int, List[str]]]]]:
+    """
+    FILE_BATCH gövdesini çözer ve yapısını doğrular.
+    Returns:
+        list: (version, author, edits) kayıtları
+    Raises:
+        ValueError: Gövde geçerli bir kayıt listesi değilse
+    """
+    try:
+        raw_patches = json.loads(body) if body else []
+    except json.JSONDecodeError:
+        raise ValueError("Geçersiz düzenleme grubu")
+    if not isinstance(raw_patches, list):
+        raise ValueError("Geçersiz düzenleme grubu")
+
+    patches = []
+    for patch in raw_patches:
+        if not (isinstance(patch, list) and len(patch) == 3
+                and isinstance(patch[0], int) and isinstance(patch[1], str)):
+            raise ValueError("Geçersiz düzenleme grubu")
+        patches.append((patch[0], patch[1], _validate_edits(patch[2])))
+    return patches
+
+def encode_cursor(cursor: Tuple[int, int, int, int]) -> str:
+    """İmleç/seçim konumunu CURSOR gövdesine kodlar: [line, col, end_line, end_col] (0 tabanlı)"""
+    return json.dumps(list(cursor))
+
+def decode_cursor(body: Optional[str]) -> List[int]:
+    """
+    CURSOR gövdesini çözer. Seçim yoksa bitiş başlangıçla aynıdır.
+    Raises:
+        ValueError: Gövde dört negatif olmayan tam sayı değilse
+    """
+    try:
+        cursor = json.loads(body) if body else None
+    except json.JSONDecodeError:
+        raise ValueError("Geçersiz imleç konumu")
+    if not (isinstance(cursor, list) and len(cursor) == 4
+            and all(isinstance(value, int) and value >= 0 for value in cursor)):
+        raise ValueError("Geçersiz imleç konumu")
+    return cursor
+
+def encode_presence(users: Dict[str, Optional[List[int]]], left: List[str] = ()) -> str:
+    """
+    PRESENCE gövdesini kodlar.
+    Args:
+        users: Eklenen ya da imleci değişen kullanıcılar -> imleç (henüz yoksa None)
+        left: Dokümandan ayrılan kullanıcılar
+    """
+    body = {}
+    if users:
+        body["users"] = users
+    if left:
+        body["left"] = list(left)
+    return json.dumps(body, ensure_ascii=False)
+
+def decode_presence(body: Optional[str]) -> Tuple[Dict[str, Optional[List[int]]], List[str]]:
+    """
+    PRESENCE gövdesini çözer.
+    Returns: (users, left) - bkz. encode_presence
+    Raises:
+        ValueError: Gövde geçerli değilse
+    """
+    try:
+        raw = json.loads(body) if body else {}
+    except json.JSONDecodeError:
+        raise ValueError("Geçersiz kullanıcı durumu")
+    if not isinstance(raw, dict):
+        raise ValueError("Geçersiz kullanıcı durumu")
+    users, left = raw.get("users", {}), raw.get("left", [])
+    if not (isinstance(users, dict) and isinstance(left, list)):
+        raise ValueError("Geçersiz kullanıcı durumu")
+    return users, left
+
+def apply_edits(lines: List[str], edits: List[Tuple[int, int, List[str]]]) -> None:
+    """
+    Aralık düzenlemelerini satır listesine sırayla ve yerinde uygular.
+    Args:
+        lines (List[str]): Dosya satırları (yerinde değiştirilir)
+        edits (list): (start, end, lines) düzenlemeleri
+    Raises:
+        IndexError: Aralık doküman dışındaysa
+    """
+    for start, end, new_lines in edits:
+        if end > len(lines):
+            raise IndexError("Satır aralığı doküman dışında")
+        lines[start:end] = new_lines
+
 def format_file_content(content: List[str]) -> str:
     """
     Dosya içeriğini formatlar.
@@ -99,9 +283,10 @@ def format_file_content(content: List[str]) -> str:
 def parse_file_content(content: str) -> List[str]:
     """
     Formatlanmış içeriği dosya satırlarına dönüştürür.
+    format_file_content'in tam tersidir: sondaki boş satırlar korunur.
     Args:
         content (str): Formatlanmış içerik
     Returns:
         List[str]: Dosya satırları
     """
-    return content.splitlines() if content else []
+    return content.split("\n") if content else []
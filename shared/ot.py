@@ -0,0 +1,133 @@
+# shared/ot.py
+
+from typing import List, Optional, Sequence, Tuple
+
+# Satır tabanlı operasyonel dönüşüm (OT).
+# Bir düzenleme listesi FILE_PATCH biçimindedir: sırayla uygulanan (start, end, lines)
+# aralık değiştirmeleri. Aynı sürüm üzerinde yapılmış iki eşzamanlı liste A ve B için
+# transform(A, B) şunu sağlayan (A', B') çiftini üretir:
+#     apply(apply(doküman, B), A') == apply(apply(doküman, A), B')
+# Böylece sunucu eski bir sürüme göre gönderilen düzenlemeyi güncel dokümana taşır,
+# client da sunucudan gelen düzenlemeyi henüz onaylanmamış kendi düzenlemelerine göre kaydırır.
+
+Edit = Tuple[int, int, List[str]]
+
+def _transform_against(a: Edit, b: Edit, a_first: bool) -> List[Edit]:
+    """
+    a'yı hesaplar: a'nın b uygulandıktan sonraki karşılığı.
+    a'nın silmek istediği satırlardan b'nin zaten sildikleri çıkarılır; a'nın eklediği
+    satırlar konumuna göre b'nin satırlarından önce ya da sonra yer alır.
+    """
+    a_start, a_end, a_lines = a
+    b_start, b_end, b_lines = b
+    b_shift = len(b_lines) - (b_end - b_start)
+
+    edits = []
+    # b'nin aralığından sonra kalan silme kısmı (b'nin satırlarından sonra)
+    if a_end > b_end:
+        edits.append([max(a_start, b_end) + b_shift, a_end + b_shift, []])
+    # b'nin aralığından önce kalan silme kısmı (yerinde kalır)
+    if a_start < b_start:
+        edits.append([a_start, min(a_end, b_start), []])
+
+    # Eklenen satırlar: önce başlayan önce gelir, aynı konumda öncelik belirler
+    if a_start < b_start or (a_start == b_start and a_first):
+        position = a_start
+    else:
+        position = max(a_start, b_end) + b_shift
+    for edit in edits:
+        if edit[0] == position:
+            edit[2] = a_lines
+            break
+    else:
+        edits.append([position, position, a_lines])
+
+    return [(start, end, lines) for start, end, lines in edits if start != end or lines]
+
+def transform_edit(a: Edit, b: Edit, a_first: bool) -> Tuple[List[Edit], List[Edit]]:
+    """
+    İki eşzamanlı aralık düzenlemesini birbirine göre dönüştürür.
+    Args:
+        a, b: Aynı dokümana göre (start, end, lines) düzenlemeleri
+        a_first (bool): İki taraf aynı konuma satır eklerse a'nın satırları önce gelir
+    Returns:
+        tuple: (a', b') -> a' b'den sonra, b' a'dan sonra uygulanır. Çakışan aralıklarda
+               bir düzenleme ikiye bölünebilir ya da tamamen düşebilir, bu yüzden listedir.
+    """
+    return _transform_against(a, b, a_first), _transform_against(b, a, not a_first)
+
+def transform(a: Sequence[Edit], b: Sequence[Edit], a_first: bool) -> Tuple[List[Edit], List[Edit]]:
+    """
+    İki eşzamanlı düzenleme listesini dönüştürür (bkz. dosya başındaki açıklama).
+    Returns:
+        tuple: (a', b')
+    """
+    a = list(a)
+    b = list(b)
+    if len(a) == 1 and len(b) == 1:
+        return transform_edit(a[0], b[0], a_first)
+    if len(a) != 1:
+        a_result = []
+        for edit in a:
+            pieces, b = transform([edit], b, a_first)
+            a_result.extend(pieces)
+        return a_result, b
+    b_result = []
+    for edit in b:
+        a, pieces = transform(a, [edit], a_first)
+        b_result.extend(pieces)
+    return a, b_result
+
+
+class EditSession:
+    """
+    Client tarafı OT durumu. Aynı anda sunucuda en fazla bir düzenleme listesi
+    onay bekler (pending); bu sırada yapılan yerel düzenlemeler buffer'da birikir ve
+    onay gelince tek listede gönderilir. Sunucudan gelen düzenlemeler yerelde
+    uygulanmadan önce pending ve buffer'a göre dönüştürülür.
+    """
+    def __init__(self, version: int = 0):
+        self.version = version  # Sunucudan görülen son sürüm
+        self.pending: Optional[List[Edit]] = None  # Gönderildi, onay bekliyor
+        self.buffer: Optional[List[Edit]] = None  # Henüz gönderilmedi
+
+    def reset(self, version: int):
+        """Tam içerik (FILE_SYNC) geldi: bekleyen yerel düzenlemeler geçersiz"""
+        self.version = version
+        self.pending = None
+        self.buffer = None
+
+    def local(self, edits: List[Edit]) -> Optional[List[Edit]]:
+        """
+        Yerelde uygulanan düzenlemeyi kaydeder.
+        Returns: Şimdi gönderilmesi gereken düzenlemeler (self.version'a göre) ya da None
+        """
+        if self.pending is None:
+            self.pending = list(edits)
+            return self.pending
+        # Sıralı listelerin birleşimi, ardışık uygulamayla aynıdır
+        self.buffer = (self.buffer or []) + list(edits)
+        return None
+
+    def ack(self, version: int) -> Optional[List[Edit]]:
+        """
+        Kendi düzenlememizin sunucudaki yankısı geldi.
+        Returns: Şimdi gönderilmesi gereken birikmiş düzenlemeler ya da None
+        """
+        self.version = version
+        # Biriken düzenlemeler dönüşümle tamamen düşmüş olabilir: boş liste gönderilmez
+        self.pending, self.buffer = self.buffer or None, None
+        return self.pending
+
+    def remote(self, version: int, edits: List[Edit]) -> List[Edit]:
+        """
+        Başka bir client'ın düzenlemesi geldi.
+        Returns: Yerel dokümana uygulanacak dönüştürülmüş düzenlemeler
+        """
+        self.version = version
+        # Sunucu onları bizim bekleyen düzenlememizden önce uyguladı: öncelik onlarda
+        if self.pending is not None:
+            edits, self.pending = transform(edits, self.pending, a_first=True)
+        if self.buffer is not None:
+            edits, self.buffer = transform(edits, self.buffer, a_first=True)
+        return edits
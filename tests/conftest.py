@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Testler depo kökünden (server/, shared/, client/ paketleri) içe aktarır
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+# tests/test_connection.py
+
+import asyncio
+
+from server.connection import ClientConnection, POLICY_RESYNC
+
+
+class StalledWebSocket:
+    """Hiç yazamayan client: giden kuyruk dolar"""
+    async def send(self, data):
+        await asyncio.Event().wait()
+
+    async def close(self):
+        pass
+
+
+def test_overflow_resync_is_not_preceded_by_messages_sent_while_it_is_built():
+    async def scenario():
+        def resync_messages(conn):
+            # server_main'deki gibi: güncel durumu hazırlarken bekleyen düzenlemeler odaya yayınlanır
+            conn.send("stale batch")
+            return ["sync"]
+
+        conn = ClientConnection(StalledWebSocket(), maxsize=4, policy=POLICY_RESYNC,
+                                resync_messages=resync_messages)
+        await asyncio.sleep(0)  # Yazıcı ilk mesajı alıp beklemede kalsın
+        for index in range(5):  # Sonuncusu kuyruğu taşırır
+            conn.send(index)
+        queued = []
+        while not conn.queue.empty():
+            queued.append(conn.queue.get_nowait())
+        await conn.close()
+        return queued
+
+    assert asyncio.run(scenario()) == ["sync"]
@@ -0,0 +1,41 @@
+# tests/test_diff.py
+
+import random
+
+from shared.diff import diff_lines
+from shared.messages import apply_edits
+
+
+def _apply(lines, edits):
+    lines = list(lines)
+    apply_edits(lines, edits)
+    return lines
+
+
+def test_identical_lines_need_no_edits():
+    assert diff_lines(["a", "b"], ["a", "b"]) == []
+
+
+def test_single_line_change_is_a_single_edit():
+    assert diff_lines(["a", "b", "c"], ["a", "x", "c"]) == [(1, 2, ["x"])]
+    assert diff_lines(["a", "c"], ["a", "b", "c"]) == [(1, 1, ["b"])]
+    assert diff_lines(["a", "b", "c"], ["a", "c"]) == [(1, 2, [])]
+
+
+def test_edits_are_ordered_from_the_end():
+    edits = diff_lines(["a", "b", "c", "d", "e"], ["x", "b", "c", "d", "y"])
+    assert [start for start, _, _ in edits] == [4, 0]
+
+
+def test_random_diffs_reproduce_the_new_lines():
+    rnd = random.Random(7)
+    for _ in range(500):
+        old = [rnd.choice("abcde") for _ in range(rnd.randint(0, 30))]
+        new = [rnd.choice("abcdef") for _ in range(rnd.randint(0, 30))]
+        assert _apply(old, diff_lines(old, new)) == new
+
+
+def test_expensive_diff_falls_back_to_one_edit():
+    old = [str(i) for i in range(50)]
+    new = ["x" + line for line in old]
+    assert diff_lines(old, new, max_cost=5) == [(0, 50, new)]
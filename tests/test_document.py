@@ -0,0 +1,56 @@
+# tests/test_document.py
+
+import random
+
+import pytest
+
+from server.document import Document, DocumentLimitError
+from server.document_cache import DocumentCache
+from server.history import HistoryStore
+from server.journal import Journal
+
+
+def test_edits_match_a_plain_list_and_snapshots_stay_unchanged():
+    rnd = random.Random(5)
+    reference = [str(i) for i in range(300)]
+    document = Document(reference)
+    snapshots = []
+    for _ in range(500):
+        length = len(reference)
+        start = rnd.randint(0, length)
+        end = rnd.randint(start, min(length, start + rnd.choice([0, 1, 2, 80])))
+        lines = [str(rnd.random())[:rnd.randint(0, 6)] for _ in range(rnd.choice([0, 1, 2, 150]))]
+        snapshots.append((document.snapshot(), list(reference)))
+        removed = []
+        document.apply_edits([(start, end, lines)], removed=removed)
+        assert removed == [reference[start:end]]
+        reference[start:end] = lines
+    assert document.lines() == reference
+    assert document.snapshot().chars == sum(map(len, reference))
+    assert [document.line(i) for i in range(0, len(reference), 7)] == reference[::7]
+    for snapshot, lines in snapshots:
+        assert snapshot.lines() == lines
+
+
+def test_limits_reject_growth_but_allow_shrinking():
+    document = Document(["x"] * 10)
+    with pytest.raises(DocumentLimitError):
+        document.apply_edits([(0, 0, ["y"])], max_lines=10)
+    assert len(document) == 10 and document.version == 0
+    with pytest.raises(DocumentLimitError):
+        document.apply_edits([(0, 0, ["y" * 10000])], max_bytes=document.memory_size + 100)
+    document.apply_edits([(0, 5, [])], max_lines=1, max_bytes=1)
+    assert len(document) == 5
+
+
+def test_cache_keeps_a_running_total_of_resident_bytes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal = Journal(directory="saved_files/.journal", history=HistoryStore("saved_files/.history"))
+    cache = DocumentCache(journal, lambda filename: False)
+    for name in "abc":
+        cache.create(name)
+    document = cache.peek("b")
+    size = document.memory_size
+    document.apply_edits([(0, 0, ["satır"] * 1000)])
+    cache.resized(document.memory_size - size)
+    assert cache.resident_bytes() == sum(doc.memory_size for doc in cache.resident.values())
@@ -0,0 +1,31 @@
+# tests/test_file_manager.py
+
+import os
+import stat
+
+import pytest
+
+from server import file_manager
+from server.document import Document
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX dosya izinleri")
+def test_save_file_keeps_permissions(workdir):
+    file_manager.save_file("a", Document(["x"]))
+    path = workdir / file_manager.SAVE_DIR / "a"
+    assert _mode(path) == file_manager.NEW_FILE_MODE
+    os.chmod(path, 0o640)
+    file_manager.save_file("a", Document(["y"]))
+    assert _mode(path) == 0o640
+    assert file_manager.read_file("a") == "y"
+    assert os.listdir(workdir / file_manager.SAVE_DIR) == ["a"]
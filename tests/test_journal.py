@@ -0,0 +1,67 @@
+# tests/test_journal.py
+
+import asyncio
+
+import pytest
+
+from server.document import Document
+from server.history import HistoryStore
+from server.journal import Journal
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # saved_files/ göreli yoldur; her test kendi dizininde çalışır
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _edit(document, journal, filename, line):
+    edits = [(len(document), len(document), [line])]
+    version = document.apply_edits(edits, "u")
+    journal.append(filename, version, edits, "u")
+
+
+def test_recover_applies_records_after_checkpoint(workdir):
+    async def scenario():
+        journal = Journal(directory="saved_files/.journal", history=HistoryStore("saved_files/.history"))
+        runner = asyncio.create_task(journal.run())
+        document = Document(saved=False)
+        journal.append("a", 0, [])
+        for i in range(5):
+            _edit(document, journal, "a", f"satır {i}")
+        await journal.checkpoint({"a": document.snapshot()})
+        for i in range(5, 8):
+            _edit(document, journal, "a", f"satır {i}")
+        await asyncio.sleep(0.05)  # Grup yazması
+        runner.cancel()
+        return journal, document
+
+    journal, document = asyncio.run(scenario())
+    recovered = journal.recover("a")
+    assert recovered.lines() == document.lines()
+    assert recovered.version == document.version == 8
+    assert recovered.saved_version == 5
+
+
+def test_checkpoint_with_pending_records_keeps_every_version(workdir):
+    async def scenario():
+        # Grup yazması hiç çalışmaz: kontrol noktası anında tüm kayıtlar bekliyor
+        journal = Journal(directory="saved_files/.journal", history=HistoryStore("saved_files/.history"))
+        document = Document(saved=False)
+        journal.append("a", 0, [])
+        expected = {0: []}
+        for round_ in range(3):
+            for i in range(8):
+                _edit(document, journal, "a", f"{round_}.{i}")
+                expected[document.version] = document.lines()
+            assert journal.pending["a"]
+            await journal.checkpoint({"a": document.snapshot()})
+            assert "a" not in journal.pending
+        versions = [await journal.read_version("a", version) for version in sorted(expected)]
+        return journal, expected, versions
+
+    journal, expected, versions = asyncio.run(scenario())
+    assert versions == [expected[version] for version in sorted(expected)]
+    assert journal.recover("a").lines() == expected[24]
+    assert journal.history.versions("a")[0][0] == 0
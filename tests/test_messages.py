@@ -0,0 +1,39 @@
+# tests/test_messages.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from server.dispatch import CommandError, dispatch
+from shared.messages import parse_json_message
+
+
+def test_parse_json_message():
+    assert parse_json_message('{"command": "FILE_JOIN", "args": ["a"]}') == ("FILE_JOIN", ["a"], None)
+    assert parse_json_message('{"command": "SEARCH", "args": ["a"], "body": "x"}') == ("SEARCH", ["a"], "x")
+
+
+@pytest.mark.parametrize("raw", [
+    '[]',
+    '{"command": ["FILE_JOIN"]}',
+    '{"command": "FILE_JOIN", "args": "a"}',
+    '{"command": "FILE_JOIN", "args": [1]}',
+    '{"command": "FILE_PATCH", "args": ["a", "1"], "body": {"edits": []}}',
+    '{"command": "SEARCH", "args": ["a"], "body": 5}',
+])
+def test_parse_json_message_rejects_wrong_types(raw):
+    with pytest.raises(ValueError):
+        parse_json_message(raw)
+
+
+@pytest.mark.parametrize("command, body", [
+    (["FILE_JOIN"], None),
+    ("FILE_PATCH", [1, 2]),
+    ("CURSOR", {"line": 1}),
+])
+def test_dispatch_rejects_wrong_types(command, body):
+    # Eşlerden iletilen istekler çözücüden geçmez
+    conn = SimpleNamespace(username="u")
+    with pytest.raises(CommandError):
+        asyncio.run(dispatch(conn, command, [], body))
@@ -0,0 +1,22 @@
+# tests/test_metrics.py
+
+from server.metrics import Metrics
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.inc("bytes_in_total", 3, document='a"b\\c\nd')
+    assert 'bytes_in_total{document="a\\"b\\\\c\\nd"} 3' in metrics.render().splitlines()
+
+
+def test_forget_drops_only_the_documents_series():
+    metrics = Metrics()
+    metrics.inc("bytes_in_total", 1, document="a")
+    metrics.inc("bytes_in_total", 2, document="b")
+    metrics.observe("command_duration_ms", 1.0, command="FILE_PATCH")
+    metrics.observe("patch_ms", 1.0, document="a", command="FILE_PATCH")
+    metrics.forget(document="a")
+    output = metrics.render()
+    assert 'document="a"' not in output
+    assert 'bytes_in_total{document="b"} 2' in output
+    assert 'command_duration_ms_count{command="FILE_PATCH"} 1' in output
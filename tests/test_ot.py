@@ -0,0 +1,104 @@
+# tests/test_ot.py
+
+import random
+
+from shared.messages import apply_edits
+from shared.ot import EditSession, transform, transform_edit
+
+
+def _apply(lines, edits):
+    lines = list(lines)
+    apply_edits(lines, edits)
+    return lines
+
+
+def _random_edits(rnd, length, count, tag):
+    edits = []
+    for _ in range(count):
+        start = rnd.randint(0, length)
+        end = rnd.randint(start, min(length, start + 3))
+        lines = [f"{tag}{rnd.randint(0, 99)}" for _ in range(rnd.randint(0, 3))]
+        edits.append((start, end, lines))
+        length += len(lines) - (end - start)
+    return edits
+
+
+def test_transform_edit_same_position_insert_order():
+    a, b = transform_edit((1, 1, ["a"]), (1, 1, ["b"]), a_first=True)
+    base = ["x", "y"]
+    assert _apply(_apply(base, [(1, 1, ["b"])]), a) == ["x", "a", "b", "y"]
+    assert _apply(_apply(base, [(1, 1, ["a"])]), b) == ["x", "a", "b", "y"]
+
+
+def test_transform_overlapping_deletes_are_not_repeated():
+    a, b = transform([(0, 3, [])], [(1, 4, ["z"])], a_first=False)
+    base = ["0", "1", "2", "3", "4"]
+    assert _apply(_apply(base, [(1, 4, ["z"])]), a) == ["z", "4"]
+    assert _apply(_apply(base, [(0, 3, [])]), b) == ["z", "4"]
+
+
+def test_transform_converges_on_random_edit_lists():
+    rnd = random.Random(11)
+    for _ in range(2000):
+        base = [str(i) for i in range(rnd.randint(0, 8))]
+        a = _random_edits(rnd, len(base), rnd.randint(1, 3), "a")
+        b = _random_edits(rnd, len(base), rnd.randint(1, 3), "b")
+        a_first = rnd.random() < 0.5
+        a2, b2 = transform(a, b, a_first)
+        assert _apply(_apply(base, b), a2) == _apply(_apply(base, a), b2)
+
+
+def test_edit_sessions_converge_through_a_server():
+    # Sunucu server_main gibi: eski sürüme göre gelen düzenleme sonraki düzenlemelere göre kaydırılır
+    rnd = random.Random(3)
+    for _ in range(200):
+        server = [str(i) for i in range(5)]
+        history = []  # history[i] sürüm i+1'i üreten düzenlemeler
+        clients = [{"session": EditSession(), "lines": list(server), "inbox": [], "outbox": []}
+                   for _ in range(3)]
+
+        def send(index):
+            base, edits = clients[index]["outbox"].pop(0)
+            for concurrent in history[base:]:
+                edits, _ = transform(edits, concurrent, a_first=False)
+            apply_edits(server, edits)
+            history.append(edits)
+            for other, client in enumerate(clients):
+                client["inbox"].append((len(history), edits, other == index))
+
+        def receive(index):
+            client = clients[index]
+            session = client["session"]
+            version, edits, own = client["inbox"].pop(0)
+            if own:
+                outgoing = session.ack(version)
+                if outgoing is not None:
+                    client["outbox"].append((session.version, outgoing))
+            else:
+                apply_edits(client["lines"], session.remote(version, edits))
+
+        for _ in range(30):
+            index = rnd.randrange(len(clients))
+            client = clients[index]
+            action = rnd.random()
+            if action < 0.4:
+                edits = _random_edits(rnd, len(client["lines"]), rnd.randint(1, 2), f"c{index}.")
+                apply_edits(client["lines"], edits)
+                outgoing = client["session"].local(edits)
+                if outgoing is not None:
+                    client["outbox"].append((client["session"].version, outgoing))
+            elif action < 0.7 and client["outbox"]:
+                send(index)
+            elif client["inbox"]:
+                receive(index)
+
+        # Kalan her şeyi teslim et
+        while any(client["outbox"] or client["inbox"] for client in clients):
+            for index, client in enumerate(clients):
+                while client["outbox"]:
+                    send(index)
+                while client["inbox"]:
+                    receive(index)
+
+        for client in clients:
+            assert client["lines"] == server
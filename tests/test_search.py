@@ -0,0 +1,63 @@
+# tests/test_search.py
+
+import random
+
+from server.document import Document
+from server.search import SearchIndex, snippet, tokenize
+
+WORDS = ["alfa", "beta", "Gama", "delta", "çiçek", "IŞIK", "x1"]
+
+
+def _random_line(rnd):
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(0, 4)))
+
+
+def test_incremental_updates_match_a_rebuilt_index():
+    rnd = random.Random(1)
+    index = SearchIndex()
+    documents = {}
+    for filename in "abc":
+        documents[filename] = Document([_random_line(rnd) for _ in range(200)])
+        index.add_document(filename, documents[filename].lines())
+
+    for _ in range(2000):
+        filename = rnd.choice("abc")
+        document = documents[filename]
+        length = len(document)
+        edits = []
+        for _ in range(rnd.randint(1, 3)):
+            start = rnd.randint(0, length)
+            end = rnd.randint(start, min(length, start + rnd.choice([1, 3, 100])))
+            lines = [_random_line(rnd) for _ in range(rnd.choice([0, 1, 2, 100]))]
+            edits.append((start, end, lines))
+            length += len(lines) - (end - start)
+        removed = []
+        document.apply_edits(edits, removed=removed)
+        index.update(filename, removed, edits)
+
+    rebuilt = SearchIndex()
+    for filename, document in documents.items():
+        rebuilt.add_document(filename, document.lines())
+    assert index.postings == rebuilt.postings
+
+
+def test_search_returns_line_numbers_of_lines_with_every_term():
+    index = SearchIndex()
+    document = Document(["bir elma", "elma ve armut", "armut", "ELMA ARMUT"])
+    index.add_document("meyve", document.lines())
+    terms = tokenize("armut elma")
+    assert index.candidates(terms) == ["meyve"]
+    assert index.search("meyve", document.snapshot(), terms, 10) == [
+        ["meyve", 2, "elma ve armut"], ["meyve", 4, "ELMA ARMUT"]]
+    assert index.candidates(tokenize("kiraz")) == []
+
+
+def test_dotted_and_dotless_i_match():
+    assert tokenize("IŞIK") == tokenize("ışık") == tokenize("işık")
+    assert tokenize("İSTANBUL") == tokenize("istanbul") == ["istanbul"]
+
+
+def test_snippet_is_cut_around_the_term():
+    line = "x" * 200 + " hedef " + "y" * 200
+    text = snippet(line, "hedef", 40)
+    assert "hedef" in text and text.startswith("…") and text.endswith("…")